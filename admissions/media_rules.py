@@ -0,0 +1,20 @@
+# admissions/media_rules.py
+"""
+Pièces des dossiers d'admission (CNI, diplômes, relevés, photos, pièces jointes) :
+staff, agent affecté au dossier, et l'étudiant inscrit à partir du dossier (voir core.media).
+"""
+from django.db.models import Q
+
+from core.media import media_rule
+from masters.utils.roles import is_staff_admin
+from .models import Admission
+
+
+@media_rule("admissions/")
+def admission_file_access(user, name):
+    if is_staff_admin(user):
+        return True
+    admissions = Admission.objects.filter(
+        Q(diplome=name) | Q(releves=name) | Q(cni=name) | Q(photo_identite=name) | Q(attachments__file=name)
+    )
+    return admissions.filter(Q(assigned_to=user) | Q(master_enrollment__student=user)).exists()
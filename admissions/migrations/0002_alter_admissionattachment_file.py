@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admissionattachment',
+            name='file',
+            field=models.FileField(storage=core.storage.DedupStorage(), upload_to='admissions/attachments/'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.utils import timezone
 from programs.models import Program
 from campuses.models import Campus
+from core.storage import dedup_storage
 
 # --- Choix globaux ---
 GENDER = [
@@ -200,7 +201,7 @@ class WebhookEvent(models.Model):
 class AdmissionAttachment(models.Model):
     admission = models.ForeignKey(Admission, on_delete=models.CASCADE, related_name="attachments")
     label = models.CharField(max_length=120)
-    file = models.FileField(upload_to="admissions/attachments/")
+    file = models.FileField(upload_to="admissions/attachments/", storage=dedup_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
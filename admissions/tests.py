@@ -1,3 +1,44 @@
+import datetime
+
 from django.test import TestCase
 
-# Create your tests here.
+from campuses.models import Campus
+from core.testing import MediaFilesMixin
+from masters.models import Cohort, MasterEnrollment
+from programs.models import Program
+
+from .models import Admission
+
+
+class AdmissionMediaRuleTests(MediaFilesMixin, TestCase):
+    """Pièces d'un dossier : staff et étudiant inscrit depuis le dossier, personne d'autre."""
+
+    @classmethod
+    def setUpTestData(cls):
+        program = Program.objects.create(
+            title="Master Santé", slug="master-sante", cycle="MASTER", duration="2", entry_requirement="Licence"
+        )
+        campus = Campus.objects.create(name="Bamako", code="BKO")
+        today = datetime.date.today()
+        cohort = Cohort.objects.create(label="2026", start_date=today, end_date=today)
+        admission = Admission.objects.create(
+            program=program, campus=campus, nom="Etu", prenom="Etu", telephone="1", cni="admissions/cni/etu.pdf"
+        )
+        cls.student = cls.make_user("etu", "ETUDIANT")
+        cls.outsider = cls.make_user("autre", "ETUDIANT")
+        cls.secretary = cls.make_user("secretaire", "SECRETAIRE")
+        MasterEnrollment.objects.create(student=cls.student, program=program, cohort=cohort, admission=admission)
+
+    def test_cni(self):
+        name = self.media_file("admissions/cni/etu.pdf")
+        self.assertEqual(self.media_status(self.student, name), 200)
+        self.assertEqual(self.media_status(self.secretary, name), 200)
+        self.assertEqual(self.media_status(self.outsider, name), 403)
+        self.assertEqual(self.media_status(None, name), 302)
+
+    def test_traversal_through_public_prefix(self):
+        self.media_file("admissions/cni/etu.pdf")
+        for path in ("programs/../admissions/cni/etu.pdf", "programs/%2e%2e/admissions/cni/etu.pdf",
+                     "programs/..%2fadmissions/cni/etu.pdf"):
+            self.assertEqual(self.media_status(self.outsider, path), 404, path)
+            self.assertEqual(self.media_status(None, path), 404, path)
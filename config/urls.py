@@ -14,9 +14,10 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.views import protected_media
 
 urlpatterns = [
     path("", include("core.urls", namespace="core")),
@@ -34,6 +35,6 @@ urlpatterns = [
     path("master/", include("masters.urls")),
     path("messenger/", include("messenger.urls")),
 
-
-
-    ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # 🔒 Médias : contrôle d'accès + plages / X-Accel-Redirect (voir core.media)
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.+)$", protected_media, name="media"),
+    ]
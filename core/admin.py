@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import SiteSettings, SocialLink, Menu, MenuItem, SimplePage, HomeHero, SiteAnnouncement, RedirectRule
+from django.utils import timezone
+from .models import SiteSettings, SocialLink, Menu, MenuItem, SimplePage, HomeHero, SiteAnnouncement, RedirectRule, Job, OutboundEmail
+from . import jobs, mail
 
 class SocialInline(admin.TabularInline):
     model = SocialLink
@@ -44,3 +46,60 @@ class SiteAnnouncementAdmin(admin.ModelAdmin):
 class RedirectAdmin(admin.ModelAdmin):
     list_display = ("old_path","new_path","permanent","active")
     list_filter = ("permanent","active")
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id","name","status","attempts","max_attempts","run_at","created_at","latency_display","locked_by")
+    list_filter = ("status","name")
+    search_fields = ("name","idempotency_key","last_error")
+    readonly_fields = ("created_at","started_at","finished_at","locked_by","lease_until","last_error")
+    ordering = ("-created_at",)
+    change_list_template = "admin/core/job/change_list.html"
+
+    # 👉 Actions groupées
+    actions = ["retry_now"]
+
+    def latency_display(self, obj):
+        latency = obj.latency
+        return f"{latency.total_seconds():.1f} s" if latency is not None else "—"
+
+    latency_display.short_description = "Latence"
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_PENDING, run_at=timezone.now(), attempts=0, finished_at=None
+        )
+        self.message_user(request, f"{updated} tâche(s) remise(s) en file 🔄")
+
+    retry_now.short_description = "Relancer maintenant"
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context["queue_stats"] = jobs.queue_stats()
+        return super().changelist_view(request, extra_context=extra_context)
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("id","to","subject","category","status","attempts","created_at","sent_at")
+    list_filter = ("status","category")
+    search_fields = ("to","subject","last_error")
+    # 🔒 Corps jamais affiché ni modifiable (identifiants en clair avant envoi)
+    exclude = ("body","html_body")
+    readonly_fields = ("to","subject","from_email","category","status","attempts",
+                       "created_at","claimed_at","sent_at","last_error")
+    ordering = ("-created_at",)
+
+    def has_add_permission(self, request):
+        return False
+
+    # 👉 Actions groupées
+    actions = ["requeue"]
+
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_QUEUED, attempts=0
+        )
+        mail.schedule_send()
+        self.message_user(request, f"{updated} e-mail(s) remis en file 📨")
+
+    requeue.short_description = "Remettre en file d'envoi"
@@ -7,3 +7,7 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         from . import signals  # charge les signaux si tu les utilises
+        from . import jobs, mail  # noqa: F401 (mail enregistre la tâche core.send_outbox)
+        jobs.autodiscover()  # enregistre les tâches déclarées dans <app>/jobs.py
+        from . import media
+        media.autodiscover()  # règles d'accès aux fichiers (<app>/media_rules.py)
@@ -0,0 +1,188 @@
+# core/blobstore.py
+"""
+Magasin de contenus adressés par empreinte (SHA-256) : code commun au stockage
+dédupliqué des médias (core.storage.DedupStorage) et au dépôt Drive
+(masters.services.drive_service). Chacun garde sa racine et son compteur
+(MediaBlob / DriveBlob) : un même contenu envoyé aux deux est stocké deux fois,
+le Drive étant destiné à un backend distant.
+
+    <racine>/ab/cd/<sha256>
+
+  - `ContentStore.stage()` lit le flux par blocs dans un temporaire en le
+    hachant ; `commit()` le rend durable (idempotent), `discard()` l'abandonne ;
+  - `add_reference()` / `drop_reference()` tiennent le compteur `ref_count`
+    d'un modèle de contenu (MediaBlob, DriveBlob…) : le contenu n'est
+    supprimé qu'à la dernière référence ;
+  - `content_lock(sha256)` sérialise, entre processus, dépôt et suppression
+    d'un même contenu.
+
+Pourquoi un verrou de fichier : `select_for_update()` ne verrouille rien sous
+SQLite (il est ignoré), et même ailleurs il ne couvre pas la ligne qui n'existe
+pas encore. Sans verrou, une suppression peut effacer le fichier entre le
+`commit()` d'un dépôt et l'écriture de sa référence. Le verrou (fcntl.flock)
+est tenu jusqu'au COMMIT de la transaction qui écrit la référence. Si l'appel
+est imbriqué dans une transaction plus large, il est relâché en fin de bloc ;
+les suppressions écrivent alors d'abord (alias / fichier) puis relisent le
+compteur, ce qui les fait attendre le verrou d'écriture de la base.
+
+Réglage : BLOB_LOCK_DIR (MEDIA_ROOT/.locks) — dossier des fichiers verrous.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import F
+
+try:
+    import fcntl
+except ImportError:  # Windows (développement) : verrou limité au processus
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class StagedBlob:
+    """Contenu lu et haché, en attente de `commit` (fichier temporaire local)."""
+
+    def __init__(self, path: str, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+
+def iter_chunks(file_obj):
+    if hasattr(file_obj, "chunks"):  # UploadedFile / File Django
+        if hasattr(file_obj, "seek"):
+            file_obj.seek(0)
+        yield from file_obj.chunks(CHUNK_SIZE)
+        return
+    while True:
+        data = file_obj.read(CHUNK_SIZE)
+        if not data:
+            break
+        yield data
+
+
+def hash_file(path) -> tuple:
+    """(sha256, taille) d'un fichier, lu par blocs."""
+    digest, size = hashlib.sha256(), 0
+    with open(path, "rb") as fh:
+        for data in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(data)
+            size += len(data)
+    return digest.hexdigest(), size
+
+
+# ==========================================================
+# 🔒 VERROU PAR CONTENU
+# ==========================================================
+def _lock_dir() -> str:
+    return str(getattr(settings, "BLOB_LOCK_DIR", os.path.join(settings.MEDIA_ROOT, ".locks")))
+
+
+@contextmanager
+def content_lock(sha256: str):
+    """Verrou exclusif (inter-processus) sur un contenu, partagé par préfixe d'empreinte."""
+    shard = sha256[:2]
+    with _thread_locks_guard:
+        local = _thread_locks.setdefault(shard, threading.Lock())
+    with local:  # flock ne sérialise pas les threads d'un même processus
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(_lock_dir(), exist_ok=True)
+        with open(os.path.join(_lock_dir(), f"{shard}.lock"), "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+# ==========================================================
+# 💾 CONTENUS SUR DISQUE
+# ==========================================================
+class ContentStore:
+    """Contenus sur disque sous `root`, rangés par empreinte."""
+
+    def __init__(self, root, permissions_mode=None):
+        self.root = str(root)
+        self.permissions_mode = permissions_mode
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path(sha256))
+
+    def stage(self, file_obj) -> StagedBlob:
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+        digest, size = hashlib.sha256(), 0
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for data in iter_chunks(file_obj):
+                    digest.update(data)
+                    size += len(data)
+                    fh.write(data)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return StagedBlob(tmp, digest.hexdigest(), size)
+
+    def commit(self, staged: StagedBlob) -> str:
+        """Rend le contenu durable ; idempotent (déjà présent → abandon du temporaire). Retourne son chemin."""
+        path = self.path(staged.sha256)
+        if os.path.exists(path):
+            self.discard(staged)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.permissions_mode is not None:
+                os.chmod(staged.path, self.permissions_mode)
+            os.replace(staged.path, path)
+        return path
+
+    def discard(self, staged: StagedBlob) -> None:
+        try:
+            os.unlink(staged.path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, sha256: str) -> None:
+        try:
+            os.unlink(self.path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def open(self, sha256: str):
+        return open(self.path(sha256), "rb")
+
+
+# ==========================================================
+# 🔢 COMPTAGE DES RÉFÉRENCES (à appeler sous content_lock, dans une transaction)
+# ==========================================================
+def add_reference(blob_model, sha256: str, size: int, **defaults):
+    """Crée au besoin la ligne de contenu et incrémente son ref_count ; retourne la ligne."""
+    blob, _ = blob_model.objects.get_or_create(sha256=sha256, defaults={"size": size, **defaults})
+    blob_model.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+    return blob
+
+
+def drop_reference(blob_model, blob_id) -> tuple:
+    """
+    Décrémente le ref_count ; supprime la ligne à la dernière référence.
+    Retourne (contenu, références restantes) — 0 : au code appelant d'effacer le contenu.
+    """
+    blob = blob_model.objects.get(pk=blob_id)
+    if blob.ref_count > 1:
+        blob_model.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+        return blob, blob.ref_count - 1
+    blob.delete()
+    return blob, 0
@@ -0,0 +1,237 @@
+# core/jobs.py
+"""
+File de tâches persistante (table core.Job) pour les effets de bord lents
+(création de comptes, e-mails, diffusions…) exécutés hors requête.
+
+Déclaration (dans `<app>/jobs.py`, découvert automatiquement au démarrage) :
+
+    from core.jobs import job
+
+    @job("admissions.create_student_account")
+    def create_student_account(admission_id):
+        ...
+
+Mise en file (la ligne Job est créée après COMMIT de la transaction courante) :
+
+    enqueue("admissions.create_student_account", {"admission_id": 12},
+            key="admission:12:student-account")
+
+Exécution : `python manage.py run_jobs` (worker, reprises avec backoff).
+Le worker réserve une tâche à la fois, pour un bail (`lease_until`) : tant
+que le bail court, personne d'autre ne la reprend. Une tâche plus longue que
+le bail par défaut le déclare : `@job("…", lease=4000)`. Les écritures finales
+ne portent que sur une tâche encore détenue par le worker (`locked_by`).
+Réglages :
+  - JOBS_EAGER (False)          : exécute la tâche immédiatement après COMMIT (dev)
+  - JOBS_RETRY_BASE_SECONDS (30): délai de base du backoff exponentiel
+  - JOBS_STALE_AFTER (600)      : bail par défaut (s) d'une tâche RUNNING avant reprise
+"""
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+_registry = {}
+_leases = {}
+
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+def job(name: str, lease: int = None):
+    """
+    Décorateur : enregistre une fonction comme tâche sous `name`.
+    `lease` : durée (s) de réservation si la tâche peut dépasser JOBS_STALE_AFTER.
+    """
+    def decorator(func):
+        _registry[name] = func
+        if lease:
+            _leases[name] = lease
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Importe le module `jobs` de chaque application installée."""
+    autodiscover_modules("jobs")
+
+
+def registered() -> list:
+    return sorted(_registry)
+
+
+# ==========================================================
+# 📥 MISE EN FILE
+# ==========================================================
+def _create(name, payload, key, run_at, max_attempts):
+    if key and Job.objects.filter(idempotency_key=key).exists():
+        return None
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, payload=payload, idempotency_key=key,
+                run_at=run_at, max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        # Même clé insérée entre-temps : déjà en file
+        return None
+
+
+def enqueue(name: str, payload: dict = None, key: str = None, delay: int = 0, max_attempts: int = 5) -> None:
+    """
+    Met une tâche en file après COMMIT (rien n'est créé si la transaction échoue).
+    `key` : clé d'idempotence — une tâche déjà connue sous cette clé n'est pas recréée.
+    """
+    if name not in _registry:
+        raise KeyError(f"Tâche inconnue : {name}")
+    payload = payload or {}
+
+    def _on_commit():
+        created = _create(name, payload, key, timezone.now() + timedelta(seconds=delay), max_attempts)
+        if created and getattr(settings, "JOBS_EAGER", False):
+            now = timezone.now()
+            Job.objects.filter(pk=created.pk).update(
+                status=Job.STATUS_RUNNING, started_at=now, lease_until=now + lease_for(name),
+                locked_by="eager", attempts=1,
+            )
+            created.attempts, created.locked_by = 1, "eager"
+            execute(created)
+
+    transaction.on_commit(_on_commit)
+
+
+# ==========================================================
+# ⚙️ EXÉCUTION
+# ==========================================================
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lease_for(name: str) -> timedelta:
+    default = getattr(settings, "JOBS_STALE_AFTER", 600)
+    return timedelta(seconds=max(_leases.get(name, 0), default))
+
+
+def requeue_stale() -> int:
+    """
+    Reprend les tâches RUNNING dont le bail a expiré (worker arrêté brutalement) :
+    remises en attente, ou FAILED si elles ont épuisé leurs tentatives.
+    """
+    now = timezone.now()
+    expired = Job.objects.filter(status=Job.STATUS_RUNNING, lease_until__lt=now)
+    failed = expired.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.STATUS_FAILED, locked_by="", finished_at=now,
+        last_error="Bail expiré : tâche interrompue sans résultat (tentatives épuisées)",
+    )
+    requeued = expired.filter(attempts__lt=F("max_attempts")).update(
+        status=Job.STATUS_PENDING, locked_by="", run_at=now
+    )
+    return failed + requeued
+
+
+def claim(worker: str = None):
+    """
+    Réserve la plus ancienne tâche échue, ou None. La réservation est un UPDATE
+    conditionnel (status=PENDING) : deux workers ne peuvent pas prendre la même.
+    Une seule à la fois : le bail démarre quand la tâche démarre réellement.
+    """
+    worker = worker or worker_id()
+    while True:
+        now = timezone.now()
+        candidate = (
+            Job.objects
+            .filter(status=Job.STATUS_PENDING, run_at__lte=now)
+            .order_by("run_at", "id")
+            .values_list("pk", "name")
+            .first()
+        )
+        if candidate is None:
+            return None
+        pk, name = candidate
+        if Job.objects.filter(pk=pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING, started_at=now, lease_until=now + lease_for(name),
+            locked_by=worker, attempts=F("attempts") + 1,
+        ):
+            return Job.objects.get(pk=pk)
+        # Prise par un autre worker entre la lecture et l'UPDATE : suivante
+
+
+def _backoff(attempts: int) -> timedelta:
+    base = getattr(settings, "JOBS_RETRY_BASE_SECONDS", 30)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), MAX_BACKOFF_SECONDS))
+
+
+def execute(job_obj: Job) -> bool:
+    """Exécute une tâche réservée ; replanifie (backoff) ou marque FAILED en cas d'erreur."""
+    func = _registry.get(job_obj.name)
+    try:
+        if func is None:
+            raise KeyError(f"Tâche inconnue : {job_obj.name}")
+        func(**job_obj.payload)
+    except Exception:
+        error = traceback.format_exc()
+        attempts = job_obj.attempts or 1
+        if attempts >= job_obj.max_attempts:
+            fields = {"status": Job.STATUS_FAILED, "finished_at": timezone.now()}
+        else:
+            fields = {"status": Job.STATUS_PENDING, "run_at": timezone.now() + _backoff(attempts)}
+        _finish(job_obj, last_error=error, **fields)
+        print(f"[JOB] ⚠️ {job_obj.name} #{job_obj.pk} échec (tentative {attempts}/{job_obj.max_attempts})")
+        return False
+
+    _finish(job_obj, status=Job.STATUS_DONE, finished_at=timezone.now(), last_error="")
+    return True
+
+
+def _finish(job_obj: Job, **fields) -> None:
+    """Écrit le résultat seulement si la tâche est encore à nous (bail non repris)."""
+    if not Job.objects.filter(pk=job_obj.pk, status=Job.STATUS_RUNNING, locked_by=job_obj.locked_by).update(
+        locked_by="", **fields
+    ):
+        print(f"[JOB] ⚠️ {job_obj.name} #{job_obj.pk} : bail perdu, résultat ignoré")
+
+
+def run_pending(limit: int = 10, worker: str = None) -> tuple:
+    """Un passage du worker (au plus `limit` tâches) : (tâches réussies, tâches en échec)."""
+    done = failed = 0
+    for _ in range(limit):
+        job_obj = claim(worker)
+        if job_obj is None:
+            break
+        if execute(job_obj):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+# ==========================================================
+# 📊 SUPERVISION
+# ==========================================================
+def queue_stats() -> dict:
+    """Profondeur de file et latences (affichées dans l'admin)."""
+    now = timezone.now()
+    agg = Job.objects.aggregate(
+        pending=Count("id", filter=Q(status=Job.STATUS_PENDING)),
+        due=Count("id", filter=Q(status=Job.STATUS_PENDING, run_at__lte=now)),
+        running=Count("id", filter=Q(status=Job.STATUS_RUNNING)),
+        failed=Count("id", filter=Q(status=Job.STATUS_FAILED)),
+        oldest_due=Min("run_at", filter=Q(status=Job.STATUS_PENDING, run_at__lte=now)),
+    )
+    recent = (
+        Job.objects
+        .filter(started_at__isnull=False, started_at__gte=now - timedelta(hours=1))
+        .aggregate(avg_latency=Avg(F("started_at") - F("created_at")))
+    )
+    oldest = agg.pop("oldest_due")
+    avg_latency = recent["avg_latency"]
+    agg["oldest_wait_seconds"] = round((now - oldest).total_seconds(), 1) if oldest else None
+    agg["avg_latency_seconds"] = round(avg_latency.total_seconds(), 1) if avg_latency is not None else None
+    return agg
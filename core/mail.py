@@ -0,0 +1,201 @@
+# core/mail.py
+"""
+Boîte d'envoi (table core.OutboundEmail) : les e-mails sont écrits dans la
+même transaction que l'action qui les déclenche, puis envoyés par lots sur
+UNE connexion au backend (get_connection() + send_messages), avec limite de
+débit et statut par message.
+
+    queue_mail("Sujet", "Corps…", ["etudiant@exemple.org"], category="credentials")
+
+Envoi : tâche "core.send_outbox" (planifiée automatiquement, regroupée par
+fenêtre de OUTBOX_COALESCE_SECONDS) ou `python manage.py send_outbox`.
+Réglages :
+  - OUTBOX_EMAIL_BACKEND (EMAIL_BACKEND) : backend d'envoi (locmem / filebased en test)
+  - OUTBOX_BATCH_SIZE (100)              : messages réservés par lot
+  - OUTBOX_RATE_PER_SECOND (10)          : débit maximal (0 = illimité)
+  - OUTBOX_MAX_ATTEMPTS (3)              : tentatives avant FAILED
+  - OUTBOX_COALESCE_SECONDS (10)         : regroupement des tâches d'envoi
+
+Confidentialité : le corps peut contenir des identifiants (category
+"credentials"). Il est effacé dès que le message passe SENT (REDACTED_BODY)
+et n'est jamais affiché dans l'admin ; seuls les messages encore à envoyer
+(ou en échec, pour « Remettre en file ») le conservent.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .jobs import enqueue, job
+from .models import OutboundEmail
+
+SENDING_STALE_AFTER = timedelta(minutes=10)
+REDACTED_BODY = "[contenu effacé après envoi]"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ==========================================================
+# 📥 MISE EN FILE
+# ==========================================================
+def queue_mail(subject, message, recipient_list, from_email=None, html_message=None, category="") -> int:
+    """Remplace send_mail() : un OutboundEmail par destinataire. Retourne le nombre mis en file."""
+    rows = [
+        OutboundEmail(
+            to=address,
+            subject=subject,
+            body=message,
+            html_body=html_message or "",
+            from_email=from_email or "",
+            category=category,
+        )
+        for address in recipient_list
+        if address
+    ]
+    if not rows:
+        return 0
+    OutboundEmail.objects.bulk_create(rows)
+    schedule_send()
+    return len(rows)
+
+
+def schedule_send() -> None:
+    """
+    Planifie un envoi à la fin de la fenêtre courante : tous les messages
+    de la fenêtre partagent la même tâche (clé d'idempotence = fenêtre).
+    """
+    window = max(1, int(_setting("OUTBOX_COALESCE_SECONDS", 10)))
+    now = time.time()
+    bucket = int(now // window)
+    delay = int((bucket + 1) * window - now) + 1
+    enqueue("core.send_outbox", key=f"outbox:{bucket}", delay=delay)
+
+
+# ==========================================================
+# 📤 ENVOI PAR LOTS
+# ==========================================================
+def _claim(batch_size: int, exclude_ids=()) -> list:
+    ids = list(
+        OutboundEmail.objects
+        .filter(status=OutboundEmail.STATUS_QUEUED)
+        .exclude(pk__in=exclude_ids)
+        .order_by("id")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    now = timezone.now()
+    # UPDATE conditionnel : un autre expéditeur ne reprend pas les mêmes lignes
+    OutboundEmail.objects.filter(pk__in=ids, status=OutboundEmail.STATUS_QUEUED).update(
+        status=OutboundEmail.STATUS_SENDING, claimed_at=now
+    )
+    return list(
+        OutboundEmail.objects
+        .filter(pk__in=ids, status=OutboundEmail.STATUS_SENDING, claimed_at=now)
+        .order_by("id")
+    )
+
+
+def _build(row: OutboundEmail, connection) -> EmailMultiAlternatives:
+    msg = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[row.to],
+        connection=connection,
+    )
+    if row.html_body:
+        msg.attach_alternative(row.html_body, "text/html")
+    return msg
+
+
+def requeue_stale() -> int:
+    """Remet en file les messages restés SENDING (expéditeur interrompu)."""
+    limit = timezone.now() - SENDING_STALE_AFTER
+    return OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=limit).update(
+        status=OutboundEmail.STATUS_QUEUED
+    )
+
+
+def send_outbox(batch_size=None, rate_per_second=None, backend=None, max_batches=None) -> tuple:
+    """
+    Vide la boîte d'envoi : (envoyés, en échec).
+    Une seule connexion est ouverte pour l'ensemble des lots.
+    """
+    batch_size = batch_size or _setting("OUTBOX_BATCH_SIZE", 100)
+    rate = _setting("OUTBOX_RATE_PER_SECOND", 10) if rate_per_second is None else rate_per_second
+    max_attempts = _setting("OUTBOX_MAX_ATTEMPTS", 3)
+    backend = backend or _setting("OUTBOX_EMAIL_BACKEND", settings.EMAIL_BACKEND)
+    interval = 1.0 / rate if rate else 0
+
+    requeue_stale()
+    sent_total = failed_total = batches = 0
+    retry_later = []  # échecs de ce passage : pas de nouvel essai immédiat
+    connection = None
+    try:
+        while max_batches is None or batches < max_batches:
+            rows = _claim(batch_size, retry_later)
+            if not rows:
+                break
+            batches += 1
+            if connection is None:
+                try:
+                    connection = get_connection(backend=backend, fail_silently=False)
+                    connection.open()
+                except Exception:
+                    # Serveur injoignable : le lot retourne en file, la tâche sera reprise
+                    OutboundEmail.objects.filter(pk__in=[r.pk for r in rows]).update(
+                        status=OutboundEmail.STATUS_QUEUED
+                    )
+                    connection = None
+                    raise
+
+            sent_ids = []
+            for row in rows:
+                started = time.monotonic()
+                try:
+                    if connection.send_messages([_build(row, connection)]) != 1:
+                        raise RuntimeError("Message refusé par le backend")
+                    sent_ids.append(row.pk)
+                except Exception as e:
+                    failed_total += 1
+                    retry_later.append(row.pk)
+                    status = OutboundEmail.STATUS_FAILED if row.attempts + 1 >= max_attempts else OutboundEmail.STATUS_QUEUED
+                    OutboundEmail.objects.filter(pk=row.pk).update(
+                        status=status, attempts=F("attempts") + 1, last_error=str(e)[:1000]
+                    )
+                    print(f"[OUTBOX] ⚠️ {row.to} : {e}")
+                # ⏱️ Limite de débit
+                if interval:
+                    pause = interval - (time.monotonic() - started)
+                    if pause > 0:
+                        time.sleep(pause)
+
+            if sent_ids:
+                OutboundEmail.objects.filter(pk__in=sent_ids).update(
+                    status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(),
+                    attempts=F("attempts") + 1, last_error="",
+                    # 🔒 Plus besoin du contenu (mots de passe…) une fois remis
+                    body=REDACTED_BODY, html_body="",
+                )
+                sent_total += len(sent_ids)
+    finally:
+        if connection is not None:
+            connection.close()
+
+    if sent_total or failed_total:
+        print(f"[OUTBOX] {sent_total} envoyé(s), {failed_total} en échec")
+    return sent_total, failed_total
+
+
+@job("core.send_outbox")
+def send_outbox_job():
+    send_outbox()
+    # Messages remis en file après un échec : nouvelle tentative plus tard
+    if OutboundEmail.objects.filter(status=OutboundEmail.STATUS_QUEUED).exists():
+        enqueue("core.send_outbox", delay=60)
@@ -0,0 +1,59 @@
+# core/management/commands/dedupe_media.py
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from core.models import MediaAlias
+from core.blobstore import hash_file
+from core.storage import DedupStorage
+
+
+def dedup_fields():
+    """(modèle, champ) de tous les FileField branchés sur DedupStorage."""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.storage, DedupStorage):
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = "Rattache les fichiers existants au stockage dédupliqué (core.storage.DedupStorage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Calcule le gain sans rien modifier.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        adopted = missing = freed = 0
+        seen = defaultdict(list)  # --dry-run : sha256 → tailles
+
+        for model, field in dedup_fields():
+            storage = field.storage
+            names = set(
+                model._default_manager.exclude(**{field.name: ""}).exclude(**{f"{field.name}__isnull": True})
+                .values_list(field.name, flat=True).iterator()
+            )
+            known = set(MediaAlias.objects.filter(name__in=names).values_list("name", flat=True))
+
+            for name in sorted(names - known):
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                if dry_run:
+                    sha256, size = hash_file(storage.path(name))
+                    seen[sha256].append(size)
+                else:
+                    freed += storage.adopt(name)
+                adopted += 1
+            self.stdout.write(f"{model._meta.label}.{field.name} : {len(names - known)} fichier(s) à rattacher")
+
+        if dry_run:
+            freed = sum(sum(sizes[1:]) for sizes in seen.values())
+            verb = "rattachables"
+        else:
+            verb = "rattachés"
+        self.stdout.write(self.style.SUCCESS(
+            f"{adopted} fichier(s) {verb}, {missing} introuvable(s), {freed / 1024 ** 2:.1f} Mio libérés."
+        ))
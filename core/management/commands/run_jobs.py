@@ -0,0 +1,42 @@
+# core/management/commands/run_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Worker de la file de tâches (core.Job) : exécute les tâches échues, avec reprises."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Vide la file échue puis s'arrête.")
+        parser.add_argument("--batch", type=int, default=10, help="Tâches exécutées par passage (réservées une à une).")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Pause (s) quand la file est vide.")
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_id()
+        self.stdout.write(f"[WORKER {worker}] tâches : {', '.join(jobs.registered()) or 'aucune'}")
+
+        total_done = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write(f"[WORKER] {requeued} tâche(s) bloquée(s) remise(s) en file")
+
+                done, failed = jobs.run_pending(options["batch"], worker)
+                total_done += done
+                total_failed += failed
+
+                if done or failed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{total_done} tâche(s) terminée(s), {total_failed} en échec."))
@@ -0,0 +1,34 @@
+# core/management/commands/send_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import mail
+
+
+class Command(BaseCommand):
+    help = "Envoie les e-mails en file (core.OutboundEmail) par lots, sur une seule connexion."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, help="Messages par lot (défaut : OUTBOX_BATCH_SIZE).")
+        parser.add_argument("--rate", type=float, help="Messages par seconde (0 = illimité).")
+        parser.add_argument("--backend", help="Backend e-mail à utiliser (ex: django.core.mail.backends.locmem.EmailBackend).")
+        parser.add_argument("--loop", action="store_true", help="Tourne en continu.")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Pause (s) entre deux passages en mode --loop.")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = mail.send_outbox(
+                    batch_size=options["batch"], rate_per_second=options["rate"], backend=options["backend"]
+                )
+                total_sent += sent
+                total_failed += failed
+                if not options["loop"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{total_sent} e-mail(s) envoyé(s), {total_failed} en échec."))
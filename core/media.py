@@ -0,0 +1,183 @@
+# core/media.py
+"""
+Distribution des fichiers de MEDIA_ROOT avec contrôle d'accès.
+
+Règles d'accès : chaque application déclare, dans `<app>/media_rules.py`
+(découvert au démarrage), une fonction par préfixe de chemin :
+
+    from core.media import media_rule
+
+    @media_rule("masters/submissions/")
+    def submission_access(user, name):
+        return Submission.objects.filter(uploaded_file=name, student=user).exists()
+
+Le préfixe le plus long l'emporte. Sans règle : fichier réservé au staff.
+Les préfixes de MEDIA_PUBLIC_PREFIXES (images du site) sont servis à tous.
+
+Transfert :
+  - MEDIA_ACCEL_MODE = "nginx"    → en-tête X-Accel-Redirect (MEDIA_ACCEL_PREFIX + chemin),
+                                    location `internal` côté nginx ;
+  - MEDIA_ACCEL_MODE = "sendfile" → en-tête X-Sendfile (Apache mod_xsendfile, lighttpd) ;
+  - sinon, envoi par Django avec Range / If-Range / ETag / Last-Modified.
+"""
+import mimetypes
+import posixpath
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.module_loading import autodiscover_modules
+
+from .utils.http_range import RangeNotSatisfiable, parse_range
+
+DEFAULT_PUBLIC_PREFIXES = (
+    "programs/", "blog/", "gallery/", "news/", "og/", "brand/", "hero/",
+)
+BLOCK_SIZE = 64 * 1024
+
+# Flux HLS (listes de lecture / segments) : types absents de certaines tables système
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+_rules = {}
+
+
+def media_rule(prefix: str):
+    """Décorateur : `func(user, name) -> bool` décide de l'accès aux fichiers sous `prefix`."""
+    def decorator(func):
+        _rules[prefix] = func
+        return func
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules("media_rules")
+
+
+def clean_name(path: str):
+    """
+    Nom normalisé (relatif à MEDIA_ROOT) sur lequel portent à la fois les règles
+    et l'envoi, ou None si le chemin remonte (`..`, y compris `%2e%2e` décodé).
+    Normalisation lexicale : `resolve()` suit les liens symboliques (DedupStorage)
+    et ne doit pas changer le préfixe contrôlé.
+    """
+    name = path.replace("\\", "/").lstrip("/")
+    if not name or ".." in name.split("/"):
+        return None
+    name = posixpath.normpath(name)
+    return None if name in (".", "") else name
+
+
+def is_public(name: str) -> bool:
+    prefixes = getattr(settings, "MEDIA_PUBLIC_PREFIXES", DEFAULT_PUBLIC_PREFIXES)
+    return name.startswith(tuple(prefixes))
+
+
+def can_access(user, name: str) -> bool:
+    if is_public(name):
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser or user.is_staff:
+        return True
+    matches = [prefix for prefix in _rules if name.startswith(prefix)]
+    if not matches:
+        return False
+    return bool(_rules[max(matches, key=len)](user, name))
+
+
+# ==========================================================
+# 📤 ENVOI
+# ==========================================================
+def _etag(stat) -> str:
+    return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def _iter_file(path: Path, start: int, length: int):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            data = fh.read(min(BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _range_applies(request, etag: str, mtime: int) -> bool:
+    """If-Range : la plage n'est honorée que si la version du client est la bonne."""
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def serve_file(request, name: str, path: Path) -> HttpResponse:
+    """Réponse pour un fichier déjà autorisé (`name` relatif à MEDIA_ROOT)."""
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    mode = getattr(settings, "MEDIA_ACCEL_MODE", None)
+    if mode == "nginx":
+        resp = HttpResponse(content_type=content_type)
+        resp["X-Accel-Redirect"] = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/") + quote(name)
+        return resp
+    if mode == "sendfile":
+        resp = HttpResponse(content_type=content_type)
+        resp["X-Sendfile"] = str(path)
+        return resp
+
+    stat = path.stat()
+    etag = _etag(stat)
+    last_modified = http_date(stat.st_mtime)
+
+    # Requêtes conditionnelles
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            resp = HttpResponseNotModified()
+            resp["ETag"] = etag
+            return resp
+    else:
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        if since is not None and int(stat.st_mtime) <= since:
+            resp = HttpResponseNotModified()
+            resp["ETag"] = etag
+            return resp
+
+    size = stat.st_size
+    byte_range = None
+    if _range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            resp = HttpResponse(status=416)
+            resp["Content-Range"] = f"bytes */{size}"
+            return resp
+
+    if byte_range is None:
+        resp = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        resp = StreamingHttpResponse(_iter_file(path, start, end - start + 1), status=206, content_type=content_type)
+        resp["Content-Length"] = str(end - start + 1)
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    resp["Accept-Ranges"] = "bytes"
+    resp["ETag"] = etag
+    resp["Last-Modified"] = last_modified
+    resp["Cache-Control"] = "public, max-age=86400" if is_public(name) else "private, max-age=3600"
+    return resp
+
+
+def resolve(name: str):
+    """Chemin absolu sous MEDIA_ROOT, ou None (fichier absent / sortie de MEDIA_ROOT)."""
+    root = Path(settings.MEDIA_ROOT).resolve()
+    path = (root / name).resolve()
+    if root not in path.parents or not path.is_file():
+        return None
+    return path
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def redact_sent(apps, schema_editor):
+    """Efface le corps des e-mails déjà envoyés (identifiants en clair)."""
+    OutboundEmail = apps.get_model("core", "OutboundEmail")
+    OutboundEmail.objects.filter(status="SENT").update(body="[contenu effacé après envoi]", html_body="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_mediablob_mediaalias'),
+    ]
+
+    operations = [
+        migrations.RunPython(redact_sent, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:21
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def lease_running(apps, schema_editor):
+    """Bail des tâches déjà RUNNING : démarrage + JOBS_STALE_AFTER (ancienne règle de reprise)."""
+    Job = apps.get_model("core", "Job")
+    stale_after = timedelta(seconds=getattr(settings, "JOBS_STALE_AFTER", 600))
+    Job.objects.filter(status="RUNNING", started_at__isnull=False).update(lease_until=F("started_at") + stale_after)
+    Job.objects.filter(status="RUNNING", started_at__isnull=True).update(status="PENDING", locked_by="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_redact_sent_email_bodies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(lease_running, migrations.RunPython.noop),
+    ]
@@ -151,3 +151,108 @@ class RedirectRule(models.Model):
 
     def __str__(self):
         return f"{self.old_path} -> {self.new_path}"
+
+# --- File de tâches (exécutées hors requête par `manage.py run_jobs`) ---
+class Job(models.Model):
+    STATUS_PENDING = "PENDING"
+    STATUS_RUNNING = "RUNNING"
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En attente"),
+        (STATUS_RUNNING, "En cours"),
+        (STATUS_DONE, "Terminée"),
+        (STATUS_FAILED, "Échouée"),
+    ]
+
+    name = models.CharField(max_length=120, db_index=True)           # ex: admissions.create_student_account
+    payload = models.JSONField(default=dict, blank=True)
+    # Clé d'idempotence : une même clé n'est mise en file qu'une seule fois
+    idempotency_key = models.CharField(max_length=190, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    # Fin de réservation d'une tâche RUNNING : au-delà, le worker est présumé perdu
+    lease_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["run_at", "id"]
+        indexes = [models.Index(fields=["status", "run_at"])]
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} [{self.status}]"
+
+    @property
+    def latency(self):
+        """Attente entre la mise en file et le démarrage."""
+        if self.started_at:
+            return self.started_at - self.created_at
+        return None
+
+# --- Boîte d'envoi des e-mails (vidée par lots par `manage.py send_outbox`) ---
+class OutboundEmail(models.Model):
+    STATUS_QUEUED = "QUEUED"
+    STATUS_SENDING = "SENDING"
+    STATUS_SENT = "SENT"
+    STATUS_FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "En file"),
+        (STATUS_SENDING, "En cours d'envoi"),
+        (STATUS_SENT, "Envoyé"),
+        (STATUS_FAILED, "Échec"),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)  # vide → DEFAULT_FROM_EMAIL
+    category = models.CharField(max_length=50, blank=True)      # ex: welcome, credentials
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["status", "id"])]
+        verbose_name = "E-mail sortant"
+        verbose_name_plural = "E-mails sortants"
+
+    def __str__(self):
+        return f"{self.to} — {self.subject[:40]} [{self.status}]"
+
+# --- Stockage dédupliqué des fichiers envoyés (core.storage.DedupStorage) ---
+class MediaBlob(models.Model):
+    """Contenu unique (SHA-256) ; ref_count = nombre de noms (MediaAlias) qui y renvoient."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Contenu média"
+        verbose_name_plural = "Contenus médias"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} réf.)"
+
+
+class MediaAlias(models.Model):
+    """Nom de fichier (relatif à MEDIA_ROOT), lien dur ou symbolique vers le contenu."""
+    name = models.CharField(max_length=255, unique=True)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name="aliases")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,146 @@
+# core/storage.py
+"""
+Stockage dédupliqué des fichiers envoyés (PDF, scans, pièces jointes…).
+
+Chaque contenu est rangé une seule fois, par empreinte SHA-256 :
+
+    MEDIA_ROOT/.blobs/ab/cd/<sha256>
+
+Le nom d'origine (`masters/resources/syllabus.pdf`) est un alias : lien dur
+vers le contenu (ou lien symbolique, DEDUP_LINK_MODE = "symlink", si le
+système de fichiers ne gère pas les liens durs). Les URL, règles d'accès
+(core.media) et chemins restent inchangés.
+
+Comptage des références en base (core.MediaBlob / MediaAlias) : `delete()`
+retire l'alias et ne supprime le contenu qu'à la dernière référence —
+django_cleanup ne fait donc plus qu'un unlink et un UPDATE.
+En mode lien dur, st_nlink du contenu vaut ref_count + 1.
+
+Fichiers antérieurs : `manage.py dedupe_media` les rattache (voir `adopt`).
+
+Contenus, verrou et comptage : core.blobstore (partagé avec le dépôt Drive).
+
+Réglages :
+  - DEDUP_BLOB_DIR (".blobs")      : dossier des contenus, sous MEDIA_ROOT
+  - DEDUP_LINK_MODE ("hardlink")   : "hardlink" ou "symlink"
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+from .blobstore import ContentStore, add_reference, content_lock, drop_reference, hash_file
+
+
+@deconstructible
+class DedupStorage(FileSystemStorage):
+
+    @property
+    def blob_root(self) -> str:
+        return os.path.join(self.location, getattr(settings, "DEDUP_BLOB_DIR", ".blobs"))
+
+    @property
+    def link_mode(self) -> str:
+        return getattr(settings, "DEDUP_LINK_MODE", "hardlink")
+
+    @property
+    def store(self) -> ContentStore:
+        return ContentStore(self.blob_root, self.file_permissions_mode)
+
+    def blob_path(self, sha256: str) -> str:
+        return self.store.path(sha256)
+
+    def _link(self, blob: str, full_path: str) -> None:
+        """Crée l'alias ; FileExistsError si le nom est déjà pris."""
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.link_mode == "symlink":
+            os.symlink(blob, full_path)
+        else:
+            os.link(blob, full_path)
+
+    def _reference(self, name: str, sha256: str, size: int):
+        from .models import MediaAlias, MediaBlob
+
+        blob = add_reference(MediaBlob, sha256, size)
+        MediaAlias.objects.create(name=name, blob=blob)
+
+    # ------------------------------------------------------
+    # API Storage
+    # ------------------------------------------------------
+    def _save(self, name, content):
+        store = self.store
+        staged = store.stage(content)
+        try:
+            # Verrou tenu jusqu'au COMMIT : une suppression concurrente du même
+            # contenu attend que la référence soit écrite
+            with content_lock(staged.sha256), transaction.atomic():
+                blob = store.commit(staged)
+                while True:
+                    try:
+                        self._link(blob, self.path(name))
+                        break
+                    except FileExistsError:
+                        name = self.get_available_name(name)
+                self._reference(name.replace("\\", "/"), staged.sha256, staged.size)
+        finally:
+            store.discard(staged)
+        return name.replace("\\", "/")
+
+    def delete(self, name):
+        from .models import MediaAlias, MediaBlob
+
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        alias = MediaAlias.objects.select_related("blob").filter(name=name).first()
+        if alias is None:
+            # Fichier d'avant la déduplication : suppression classique
+            return super().delete(name)
+        with content_lock(alias.blob.sha256), transaction.atomic():
+            alias = MediaAlias.objects.filter(pk=alias.pk).first()
+            if alias is None:  # supprimé entre-temps
+                return
+            alias.delete()
+            super().delete(name)
+            blob, remaining = drop_reference(MediaBlob, alias.blob_id)
+            if not remaining:
+                self.store.delete(blob.sha256)
+
+    # ------------------------------------------------------
+    # Rattachement des fichiers existants
+    # ------------------------------------------------------
+    def adopt(self, name: str) -> int:
+        """
+        Rattache un fichier existant (non dédupliqué) à son contenu.
+        Retourne les octets libérés (taille du fichier si le contenu existait déjà).
+        """
+        from .models import MediaAlias
+
+        if MediaAlias.objects.filter(name=name).exists():
+            return 0
+        full_path = self.path(name)
+        sha256, size = hash_file(full_path)
+        blob = self.blob_path(sha256)
+
+        with content_lock(sha256), transaction.atomic():
+            if os.path.exists(blob):
+                # Contenu déjà connu : l'alias remplace la copie (remplacement atomique)
+                tmp = f"{full_path}.dedup-tmp"
+                self._link(blob, tmp)
+                os.replace(tmp, full_path)
+                freed = size
+            else:
+                # Premier exemplaire : il devient le contenu, sans recopie
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                if self.link_mode == "symlink":
+                    os.replace(full_path, blob)
+                    os.symlink(blob, full_path)
+                else:
+                    os.link(full_path, blob)
+                freed = 0
+            self._reference(name, sha256, size)
+        return freed
+
+
+dedup_storage = DedupStorage()
@@ -0,0 +1,92 @@
+# core/testing.py
+"""Outils de test partagés par les applications (aucun TestCase ici : rien n'est rejoué)."""
+import os
+import re
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+
+class MediaFilesMixin:
+    """
+    MEDIA_ROOT temporaire et requêtes sur la vue protégée (core.views.protected_media).
+    Codes attendus : 200 autorisé, 403 refusé, 302 anonyme (connexion), 404 introuvable.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_MODE=None)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def media_file(self, name: str, data: bytes = b"contenu") -> str:
+        path = os.path.join(self.media_root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        return name
+
+    def media_status(self, user, path: str) -> int:
+        if user is None:
+            self.client.logout()
+        else:
+            self.client.force_login(user)
+        return self.client.get(f"/media/{path}").status_code
+
+    @staticmethod
+    def make_user(username: str, role: str):
+        from masters.models import UserProfile
+
+        user = get_user_model().objects.create_user(username=username, password="x", role=role)
+        UserProfile.objects.filter(user=user).update(must_change_password=False)
+        return user
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """Serveur amont minimal : Range, ETag et If-Range (RFC 9110) ; /missing → 404."""
+    body = b""
+    etag = ""
+    requests_seen = []
+
+    @classmethod
+    def start(cls, testcase, body=b"abcdefghij", etag='"v1"') -> str:
+        """Démarre le serveur pour la durée du test ; retourne l'URL de /video.mp4."""
+        cls.body, cls.etag, cls.requests_seen = body, etag, []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), cls)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        testcase.addCleanup(server.server_close)
+        testcase.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}/video.mp4"
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_seen.append(dict(self.headers))
+        if self.path.endswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (if_range is None or if_range == cls.etag):
+            start, end = int(match.group(1)), min(int(match.group(2)), len(cls.body) - 1)
+            payload = cls.body[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(cls.body)}")
+        else:
+            payload = cls.body
+            self.send_response(200)
+        self.send_header("ETag", cls.etag)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
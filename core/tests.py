@@ -1,3 +1,204 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+import requests
+
+from django.contrib.admin.sites import site
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from masters.models import DriveBlob
+from masters.services.drive_service import LocalDriveBackend, drive_delete, drive_upload
+
+from . import jobs, media
+from .mail import REDACTED_BODY, queue_mail, send_outbox
+from .models import Job, MediaAlias, MediaBlob, OutboundEmail
+from .storage import DedupStorage
+from .testing import Upstream
+from .utils.http_range import ChunkCache, RangeNotSatisfiable, RangeProxy, UpstreamError, parse_range
+
+
+@override_settings(OUTBOX_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OutboxTests(TestCase):
+    def test_body_is_redacted_once_sent(self):
+        from django.core import mail
+
+        queue_mail("Vos identifiants", "Mot de passe : s3cret", ["etu@exemple.org"],
+                   html_message="<p>s3cret</p>", category="credentials")
+        self.assertEqual(send_outbox(rate_per_second=0), (1, 0))
+
+        self.assertIn("s3cret", mail.outbox[0].body)
+        row = OutboundEmail.objects.get()
+        self.assertEqual(row.status, OutboundEmail.STATUS_SENT)
+        self.assertEqual(row.body, REDACTED_BODY)
+        self.assertEqual(row.html_body, "")
+
+    def test_admin_hides_body(self):
+        admin = site._registry[OutboundEmail]
+        request = RequestFactory().get("/")
+        form = admin.get_form(request)
+        self.assertNotIn("body", form.base_fields)
+        self.assertNotIn("html_body", form.base_fields)
+
+
+class ContentStoreTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_dedup_storage_shares_content_until_last_alias(self):
+        storage = DedupStorage(location=self.root)
+        a = storage.save("docs/a.pdf", ContentFile(b"%PDF meme contenu"))
+        b = storage.save("docs/b.pdf", ContentFile(b"%PDF meme contenu"))
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(MediaAlias.objects.count(), 2)
+
+        storage.delete(a)
+        self.assertTrue(os.path.exists(storage.blob_path(blob.sha256)))
+        with storage.open(b) as fh:
+            self.assertEqual(fh.read(), b"%PDF meme contenu")
+
+        storage.delete(b)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(os.path.exists(storage.blob_path(blob.sha256)))
+
+    def test_drive_backend_dedups_its_own_uploads(self):
+        # Même code (core.blobstore), racine et compteur propres au Drive
+        backend = LocalDriveBackend(root=os.path.join(self.root, "drive"))
+        first = drive_upload(ContentFile(b"video", name="l1.mp4"), "Module", None, backend=backend)
+        second = drive_upload(ContentFile(b"video", name="l2.mp4"), "Module", None, backend=backend)
+        self.assertEqual(DriveBlob.objects.get().ref_count, 2)
+        self.assertTrue(backend.path(first["sha256"]).startswith(os.path.join(self.root, "drive") + os.sep))
+        self.assertFalse(MediaBlob.objects.exists())
+
+        self.assertTrue(drive_delete(first["url"], backend=backend))
+        self.assertTrue(backend.exists(first["sha256"]))
+        self.assertTrue(drive_delete(second["url"], backend=backend))
+        self.assertFalse(backend.exists(first["sha256"]))
+        self.assertFalse(drive_delete(second["url"], backend=backend))
+
+
+@jobs.job("core.tests.noop")
+def _noop_job():
+    pass
+
+
+@jobs.job("core.tests.long", lease=5000)
+def _long_job():
+    pass
+
+
+class JobQueueTests(TestCase):
+    def _job(self, name="core.tests.noop", **fields):
+        return Job.objects.create(name=name, run_at=timezone.now() - timedelta(seconds=1), **fields)
+
+    def test_claim_reserves_one_job_at_a_time(self):
+        first, second = self._job(), self._job()
+        claimed = jobs.claim("w1")
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (first.pk, Job.STATUS_RUNNING, 1))
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.started_at), (Job.STATUS_PENDING, None))
+
+    def test_lease_follows_job_declaration(self):
+        self._job(name="core.tests.long")
+        claimed = jobs.claim("w1")
+        self.assertGreater(claimed.lease_until - claimed.started_at, timedelta(seconds=4999))
+
+    def test_requeue_stale_respects_lease_and_attempts(self):
+        now = timezone.now()
+        running = dict(status=Job.STATUS_RUNNING, locked_by="w1", started_at=now - timedelta(hours=1))
+        leased = self._job(lease_until=now + timedelta(minutes=5), attempts=1, **running)
+        expired = self._job(lease_until=now - timedelta(seconds=1), attempts=1, **running)
+        exhausted = self._job(lease_until=now - timedelta(seconds=1), attempts=5, max_attempts=5, **running)
+
+        self.assertEqual(jobs.requeue_stale(), 2)
+        statuses = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[leased.pk], Job.STATUS_RUNNING)
+        self.assertEqual(statuses[expired.pk], Job.STATUS_PENDING)
+        self.assertEqual(statuses[exhausted.pk], Job.STATUS_FAILED)
+
+    def test_result_ignored_once_lease_is_lost(self):
+        self._job()
+        mine = jobs.claim("w1")
+        Job.objects.filter(pk=mine.pk).update(lease_until=timezone.now() - timedelta(seconds=1))
+        jobs.requeue_stale()
+        theirs = jobs.claim("w2")
+
+        self.assertTrue(jobs.execute(mine))
+        theirs.refresh_from_db()
+        self.assertEqual((theirs.status, theirs.locked_by), (Job.STATUS_RUNNING, "w2"))
+        self.assertTrue(jobs.execute(theirs))
+        theirs.refresh_from_db()
+        self.assertEqual((theirs.status, theirs.attempts), (Job.STATUS_DONE, 2))
+
+
+class MediaNameTests(SimpleTestCase):
+    def test_parent_segments_are_rejected(self):
+        for path in ("programs/../admissions/cni/x.pdf", "../x", "programs/..", "a\\..\\b"):
+            self.assertIsNone(media.clean_name(path), path)
+        self.assertEqual(media.clean_name("/programs//./a.jpg"), "programs/a.jpg")
+        self.assertEqual(media.clean_name("programs/..x/a.jpg"), "programs/..x/a.jpg")
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range("bytes=2-5", 10), (2, 5))
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=4-", 10), (4, 9))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=10-", 10)
+
+    def test_empty_resource_has_no_satisfiable_range(self):
+        self.assertIsNone(parse_range(None, 0))
+        for header in ("bytes=-5", "bytes=0-", "bytes=0-0"):
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 0)
+
+
+class RangeProxyRevalidationTests(SimpleTestCase):
+    def setUp(self):
+        self.url = Upstream.start(self)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.cache = ChunkCache(root=root)
+
+    def _proxy(self, meta_ttl):
+        return RangeProxy(cache=self.cache, chunk_size=4, session=requests.Session(), meta_ttl=meta_ttl)
+
+    def _read(self, proxy, start=0, end=9):
+        return b"".join(proxy.iter_range(self.url, start, end))
+
+    def test_validator_stored_and_cache_served_while_fresh(self):
+        proxy = self._proxy(meta_ttl=3600)
+        self.assertEqual(proxy.info(self.url)["etag"], '"v1"')
+        self.assertEqual(self._read(proxy), b"abcdefghij")
+        seen = len(Upstream.requests_seen)
+        self.assertEqual(self._read(proxy), b"abcdefghij")
+        self.assertEqual(len(Upstream.requests_seen), seen)  # tout vient du cache
+
+    def test_changed_upstream_drops_the_entry(self):
+        proxy = self._proxy(meta_ttl=0)  # revalidation à chaque bloc
+        self.assertEqual(self._read(proxy), b"abcdefghij")
+        self.assertEqual(Upstream.requests_seen[-1].get("If-Range"), '"v1"')
+
+        Upstream.body, Upstream.etag = b"ABCDEFGHIJKLMN", '"v2"'
+        info = proxy.info(self.url)
+        self.assertEqual((info["etag"], info["size"]), ('"v2"', 14))
+        self.assertEqual(self._read(proxy, 0, 13), b"ABCDEFGHIJKLMN")
+
+    def test_change_during_a_read_is_not_spliced(self):
+        proxy = self._proxy(meta_ttl=0)
+        proxy.info(self.url)
+        chunks = proxy.iter_range(self.url, 0, 9)
+        self.assertEqual(next(chunks), b"abcd")
+        Upstream.body, Upstream.etag = b"ABCDEFGHIJ", '"v2"'
+        with self.assertRaises(UpstreamError):
+            list(chunks)
@@ -0,0 +1,352 @@
+# core/utils/http_range.py
+"""
+Requêtes HTTP partielles (Range) et proxy amont avec cache disque.
+
+- `parse_range(header, size)` : en-tête `Range: bytes=…` → (début, fin) inclus.
+- `upstream_session()`        : requests.Session partagée (pool de connexions).
+- `ChunkCache`                : cache disque LRU de blocs de taille fixe, par URL.
+- `RangeProxy`                : lit n'importe quelle plage d'une ressource amont
+                                en passant par le cache (un bloc = une requête
+                                `Range` amont, une seule fois).
+
+    proxy = RangeProxy()
+    info = proxy.info(url)                      # taille, type, support des plages
+    for data in proxy.iter_range(url, 0, 1023):
+        ...
+
+Revalidation : meta.json garde le validateur amont (ETag fort, sinon
+Last-Modified). Passé RANGE_CACHE_META_TTL, le bloc demandé est relu avec
+`If-Range` : 206 → la ressource n'a pas changé (le cache redevient frais),
+200 → elle a changé : l'entrée entière (méta + blocs) est supprimée puis
+rechargée. Une lecture en cours ne mélange jamais deux versions.
+
+Réglages :
+  - UPSTREAM_POOL_SIZE (20)                     : connexions conservées par hôte
+  - UPSTREAM_TIMEOUT (15)                       : délai réseau (s)
+  - RANGE_CACHE_DIR (BASE_DIR/cache/range_proxy): racine du cache disque
+  - RANGE_CACHE_CHUNK_SIZE (1 Mio)              : taille des blocs
+  - RANGE_CACHE_MAX_BYTES (2 Gio)               : taille maximale du cache (LRU)
+  - RANGE_CACHE_META_TTL (300)                  : fraîcheur (s) avant revalidation amont
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+USER_AGENT = "ESFe/1.0"
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Plage demandée hors de la ressource (réponse 416)."""
+
+
+class UpstreamError(Exception):
+    """Ressource amont injoignable ou réponse inattendue."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ==========================================================
+# 📐 EN-TÊTE RANGE
+# ==========================================================
+def parse_range(header, size: int):
+    """
+    `Range: bytes=a-b | a- | -n` → (début, fin) inclus, ou None (pas de plage,
+    plages multiples ou syntaxe inconnue : on renvoie la ressource entière).
+    Lève RangeNotSatisfiable si la plage est hors de la ressource (toujours le
+    cas pour une ressource vide).
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        raise RangeNotSatisfiable(header)
+    if not first:
+        # Suffixe : les n derniers octets
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+# ==========================================================
+# 🔌 SESSION AMONT (POOL)
+# ==========================================================
+_session = None
+_session_lock = threading.Lock()
+
+
+def upstream_session() -> requests.Session:
+    """Session partagée par le processus : connexions keep-alive réutilisées."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool = _setting("UPSTREAM_POOL_SIZE", 20)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=2)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+
+# ==========================================================
+# 💾 CACHE DISQUE DE BLOCS (LRU)
+# ==========================================================
+class ChunkCache:
+    """
+    <racine>/<sha256(clé)>/meta.json + <index>.chunk
+    L'ordre LRU suit la date de modification des fichiers (rafraîchie à chaque
+    lecture). Écritures atomiques (fichier temporaire + os.replace).
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or _setting("RANGE_CACHE_DIR", Path(settings.BASE_DIR) / "cache" / "range_proxy"))
+        self.max_bytes = max_bytes if max_bytes is not None else _setting("RANGE_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+        self._lock = threading.Lock()
+        self._size = None  # octets en cache (calculé au premier besoin)
+
+    def _dir(self, key: str) -> Path:
+        return self.root / hashlib.sha256(key.encode()).hexdigest()
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def get_meta(self, key: str):
+        try:
+            return json.loads((self._dir(key) / "meta.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def set_meta(self, key: str, meta: dict) -> None:
+        self._write(self._dir(key) / "meta.json", json.dumps(meta).encode())
+
+    def drop(self, key: str) -> None:
+        """Supprime l'entrée (méta + blocs) : la ressource amont a changé."""
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+        with self._lock:
+            self._size = None  # recompté au prochain `put`
+
+    def get(self, key: str, index: int):
+        path = self._dir(key) / f"{index}.chunk"
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # LRU : bloc récemment utilisé
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, index: int, data: bytes) -> None:
+        path = self._dir(key) / f"{index}.chunk"
+        self._write(path, data)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _chunks(self):
+        if not self.root.exists():
+            return
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for chunk in os.scandir(entry.path):
+                if chunk.name.endswith(".chunk"):
+                    yield chunk
+
+    def _scan_size(self) -> int:
+        return sum(chunk.stat().st_size for chunk in self._chunks())
+
+    def _evict(self) -> None:
+        """Supprime les blocs les moins récemment utilisés jusqu'à 90 % de la limite."""
+        chunks = sorted(
+            ((c.stat().st_mtime, c.stat().st_size, c.path) for c in self._chunks()),
+        )
+        total = sum(size for _, size, _ in chunks)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in chunks:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+
+# ==========================================================
+# 🎞️ PROXY AMONT PAR PLAGES
+# ==========================================================
+def _validator(meta) -> str:
+    """Valeur utilisable dans `If-Range` : ETag fort, sinon Last-Modified (ou "")."""
+    if not meta:
+        return ""
+    etag = meta.get("etag") or ""
+    if etag and not etag.startswith("W/"):
+        return etag
+    return meta.get("last_modified") or ""
+
+
+def _identity(meta) -> tuple:
+    """Ce qui identifie une version de la ressource amont."""
+    return (meta.get("etag"), meta.get("last_modified"), meta.get("size")) if meta else None
+
+
+class RangeProxy:
+    def __init__(self, cache: ChunkCache = None, chunk_size: int = None, session=None, meta_ttl: int = None):
+        self.cache = cache or ChunkCache()
+        self.chunk_size = chunk_size or _setting("RANGE_CACHE_CHUNK_SIZE", 1024 * 1024)
+        self._session = session
+        self.timeout = _setting("UPSTREAM_TIMEOUT", 15)
+        self.meta_ttl = meta_ttl if meta_ttl is not None else _setting("RANGE_CACHE_META_TTL", 300)
+
+    @property
+    def session(self):
+        return self._session or upstream_session()
+
+    def _fetch(self, url: str, index: int, if_range: str = ""):
+        """
+        Un bloc amont via `Range` : (données, méta). Si l'amont répond 200
+        (plages ignorées, ou `If-Range` non satisfait), rien n'est lu :
+        (None, méta avec ranges=False). Lève UpstreamError.
+        """
+        start = index * self.chunk_size
+        end = start + self.chunk_size - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        if if_range:
+            headers["If-Range"] = if_range
+        try:
+            r = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        except requests.RequestException as e:
+            raise UpstreamError(str(e)) from e
+        try:
+            meta = {
+                "content_type": r.headers.get("Content-Type", ""),
+                "etag": r.headers.get("ETag", ""),
+                "last_modified": r.headers.get("Last-Modified", ""),
+                "checked_at": time.time(),
+            }
+            if r.status_code == 206:
+                match = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+                if not match or match.group(3) == "*":
+                    raise UpstreamError("Content-Range amont invalide")
+                meta.update(size=int(match.group(3)), ranges=True)
+                return r.content, meta
+            if r.status_code == 200:
+                length = r.headers.get("Content-Length")
+                meta.update(size=int(length) if length else None, ranges=False)
+                return None, meta
+            raise UpstreamError(f"Réponse amont {r.status_code}")
+        except requests.RequestException as e:
+            raise UpstreamError(str(e)) from e
+        finally:
+            r.close()
+
+    def _key(self, url: str) -> str:
+        # La taille de bloc fait partie de la clé : la changer n'invalide rien à tort
+        return f"{self.chunk_size}:{url}"
+
+    def _is_fresh(self, meta) -> bool:
+        return meta is not None and time.time() - meta.get("checked_at", 0) < self.meta_ttl
+
+    def _chunk(self, url: str, index: int):
+        key = self._key(url)
+        meta = self.cache.get_meta(key)
+        if self._is_fresh(meta):
+            data = self.cache.get(key, index)
+            if data is not None:
+                return data
+
+        # Bloc absent ou méta périmée : lecture amont, conditionnée à la version en cache
+        validator = _validator(meta)
+        data, fetched = self._fetch(url, index, if_range=validator)
+        if meta is not None and (
+            (validator and data is None) or _identity(fetched) != _identity(meta)
+        ):
+            # La ressource a changé : aucun bloc de l'ancienne version ne doit resservir
+            self.cache.drop(key)
+            if validator and data is None:
+                data, fetched = self._fetch(url, index)
+        self.cache.set_meta(key, fetched)
+        if data is not None:
+            self.cache.put(key, index, data)
+        return data
+
+    def info(self, url: str) -> dict:
+        """{size, content_type, ranges, etag, last_modified} ; récupère (et met en cache) le bloc 0 si besoin."""
+        key = self._key(url)
+        meta = self.cache.get_meta(key)
+        if not self._is_fresh(meta):
+            self._chunk(url, 0)
+            meta = self.cache.get_meta(key)
+        return meta
+
+    def iter_range(self, url: str, start: int, end: int):
+        """Octets [start, end] (inclus), bloc par bloc, depuis le cache si possible."""
+        key = self._key(url)
+        version = _identity(self.cache.get_meta(key))
+        first, last = start // self.chunk_size, end // self.chunk_size
+        for index in range(first, last + 1):
+            data = self._chunk(url, index)
+            if data is None:
+                raise UpstreamError("L'amont ne gère plus les plages")
+            current = _identity(self.cache.get_meta(key))
+            if version is None:
+                version = current
+            elif current != version:
+                raise UpstreamError("La ressource amont a changé pendant la lecture")
+            offset = index * self.chunk_size
+            yield data[max(start - offset, 0):end - offset + 1]
+
+    def iter_all(self, url: str, block_size: int = 64 * 1024):
+        """Amont sans plages : simple relais en flux, sans cache."""
+        try:
+            r = self.session.get(url, stream=True, timeout=self.timeout)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            raise UpstreamError(str(e)) from e
+        try:
+            yield from r.iter_content(chunk_size=block_size)
+        finally:
+            r.close()
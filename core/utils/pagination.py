@@ -0,0 +1,265 @@
+# core/utils/pagination.py
+"""
+Pagination par curseur (keyset) réutilisable.
+
+Au lieu de `COUNT(*)` + `OFFSET`, on filtre sur les valeurs de tri du dernier
+élément affiché : le coût d'une page ne dépend plus de sa profondeur.
+
+    items, meta = keyset_paginate(qs, page=1, page_size=20, cursor=request.GET.get("cursor"))
+
+- L'ordre utilisé est celui du QuerySet (ou Meta.ordering), complété par `pk`
+  pour garantir un ordre total. Les clés doivent être des colonnes (ou
+  annotations) et non des relations.
+- Les curseurs sont opaques et signés (django.core.signing).
+- `meta` garde le contrat historique {page, page_size, total, pages, has_next,
+  has_prev} et ajoute {next_cursor, prev_cursor}.
+- Le total est un COUNT mis en cache (clé = hash du SQL), ou None si count=False.
+- Sans curseur, une page > 1 retombe sur OFFSET (liens ?page=N existants).
+"""
+import datetime
+import hashlib
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import models
+from django.db.models import F, Q
+
+CURSOR_SALT = "core.pagination.cursor"
+COUNT_CACHE_TIMEOUT = 60
+MAX_PAGE_SIZE = 100
+
+
+# ==========================================================
+# 🔑 ENCODAGE DES VALEURS DE CURSEUR
+# ==========================================================
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ["d", value.isoformat()]
+    if isinstance(value, datetime.time):
+        return ["t", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    if isinstance(value, uuid.UUID):
+        return ["uuid", str(value)]
+    if isinstance(value, models.Model):
+        return ["v", value.pk]
+    return ["v", value]
+
+
+def _decode_value(data):
+    kind, raw = data
+    if kind == "dt":
+        return datetime.datetime.fromisoformat(raw)
+    if kind == "d":
+        return datetime.date.fromisoformat(raw)
+    if kind == "t":
+        return datetime.time.fromisoformat(raw)
+    if kind == "dec":
+        return Decimal(raw)
+    if kind == "uuid":
+        return uuid.UUID(raw)
+    return raw
+
+
+def _ordering_signature(keys) -> str:
+    raw = "|".join(f"{'-' if desc else ''}{name}" for name, desc in keys)
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def encode_cursor(keys, values, page: int, backward: bool = False) -> str:
+    payload = {
+        "o": _ordering_signature(keys),
+        "p": page,
+        "b": 1 if backward else 0,
+        "v": [_encode_value(v) for v in values],
+    }
+    return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token: str, keys) -> Optional[Dict[str, Any]]:
+    """Retourne {page, backward, values} ou None si le curseur est invalide / d'une autre liste."""
+    if not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+        if payload.get("o") != _ordering_signature(keys) or len(payload["v"]) != len(keys):
+            return None
+        return {
+            "page": max(1, int(payload.get("p", 1))),
+            "backward": bool(payload.get("b")),
+            "values": [_decode_value(v) for v in payload["v"]],
+        }
+    except (signing.BadSignature, ValueError, TypeError, KeyError):
+        return None
+
+
+# ==========================================================
+# 🧭 CLÉS DE TRI
+# ==========================================================
+def _ordering_keys(qs) -> List[Tuple[str, bool]]:
+    """[(chemin, desc)] d'après le QuerySet, complété par pk."""
+    ordering = list(qs.query.order_by) or list(qs.model._meta.ordering or [])
+    keys = []
+    for item in ordering:
+        if not isinstance(item, str) or item == "?":
+            raise ValueError(f"Tri non supporté pour la pagination par curseur : {item!r}")
+        desc = item.startswith("-")
+        name = item.lstrip("-+")
+        if name == "pk" or name == qs.model._meta.pk.name:
+            name = "pk"
+        keys.append((name, desc))
+    if not any(name == "pk" for name, _ in keys):
+        keys.append(("pk", False))
+    return keys
+
+
+def _is_nullable(model, path: str) -> bool:
+    """Faux seulement si le champ est une colonne NOT NULL atteinte par des FK non nulles."""
+    if path == "pk":
+        return False
+    opts = model._meta
+    try:
+        for part in path.split("__"):
+            field = opts.get_field(part)
+            if field.null:
+                return True
+            if field.is_relation:
+                if field.many_to_many or field.one_to_many or not field.concrete:
+                    return True
+                opts = field.related_model._meta
+        return False
+    except FieldDoesNotExist:
+        return True  # annotation : on reste prudent
+
+
+def _item_value(obj, path: str):
+    if path == "pk":
+        return obj.pk
+    value = obj
+    for part in path.split("__"):
+        value = getattr(value, part, None)
+        if value is None:
+            return None
+    return value.pk if isinstance(value, models.Model) else value
+
+
+def _ordered(qs, keys, reverse: bool = False):
+    """Ordre d'affichage : NULL toujours en dernier ; `reverse` inverse tout (page précédente)."""
+    nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+    exprs = []
+    for name, desc in keys:
+        if desc != reverse:
+            exprs.append(F(name).desc(**nulls))
+        else:
+            exprs.append(F(name).asc(**nulls))
+    return qs.order_by(*exprs)
+
+
+def _strict(name, desc, value, nullable, forward) -> Q:
+    """Lignes strictement après (forward) / avant la valeur sur cette clé, NULL en dernier."""
+    if value is None:
+        return Q(pk__in=[]) if forward else Q(**{f"{name}__isnull": False})
+    if forward:
+        q = Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+        if nullable:
+            q |= Q(**{f"{name}__isnull": True})
+        return q
+    return Q(**{f"{name}__{'gt' if desc else 'lt'}": value})
+
+
+def _equal(name, value) -> Q:
+    return Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+
+
+def _seek_filter(model, keys, values, forward: bool) -> Q:
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for (name, desc), value in zip(keys, values):
+        condition |= prefix & _strict(name, desc, value, _is_nullable(model, name), forward)
+        prefix &= _equal(name, value)
+    return condition
+
+
+# ==========================================================
+# 🔢 TOTAL (COUNT mis en cache)
+# ==========================================================
+def cached_count(qs, timeout: int = COUNT_CACHE_TIMEOUT) -> int:
+    try:
+        sql, params = qs.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = "pagination:count:" + hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = qs.count()
+        cache.set(key, total, timeout)
+    return total
+
+
+# ==========================================================
+# 📄 PAGINATION
+# ==========================================================
+def keyset_paginate(
+    qs,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    count: bool = True,
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Renvoie (items, meta) pour une page du QuerySet.
+    meta: {page, page_size, total, pages, has_next, has_prev, next_cursor, prev_cursor}
+    """
+    page_size = max(1, min(page_size or 20, MAX_PAGE_SIZE))
+    keys = _ordering_keys(qs)
+    state = decode_cursor(cursor, keys) if cursor else None
+
+    if state:
+        page = state["page"]
+        forward = not state["backward"]
+        filtered = qs.filter(_seek_filter(qs.model, keys, state["values"], forward))
+        rows = list(_ordered(filtered, keys, reverse=not forward)[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if forward:
+            items, has_next, has_prev = rows, has_more, page > 1
+        else:
+            items, has_next, has_prev = rows[::-1], True, has_more or page > 1
+    else:
+        # Première page (ou lien ?page=N historique → OFFSET)
+        page = max(1, page or 1)
+        start = (page - 1) * page_size
+        rows = list(_ordered(qs, keys)[start: start + page_size + 1])
+        has_next = len(rows) > page_size
+        items = rows[:page_size]
+        has_prev = page > 1
+
+    total = cached_count(qs) if count else None
+    pages = None
+    if total is not None:
+        pages = (total // page_size) + (1 if total % page_size else 0)
+        pages = max(pages, page if items else 0)
+
+    next_cursor = prev_cursor = ""
+    if items and has_next:
+        next_cursor = encode_cursor(keys, [_item_value(items[-1], k) for k, _ in keys], page + 1)
+    if items and has_prev:
+        prev_cursor = encode_cursor(keys, [_item_value(items[0], k) for k, _ in keys], page - 1, backward=True)
+
+    meta = {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "pages": pages,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+    return items, meta
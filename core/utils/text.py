@@ -0,0 +1,17 @@
+# core/utils/text.py
+"""
+Normalisation de texte pour la recherche : minuscules, sans accents,
+espaces simples ("Aïssata  DIALLO" → "aissata diallo").
+"""
+import re
+import unicodedata
+
+_SPACES = re.compile(r"\s+")
+
+
+def fold(value) -> str:
+    if not value:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _SPACES.sub(" ", text.casefold()).strip()
@@ -10,7 +10,11 @@ from collections import defaultdict
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse, NoReverseMatch
 from django.apps import apps
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
 
+from . import media
 from .models import HomeHero, SimplePage
 from programs.models import Program, Cycle
 
@@ -169,3 +173,20 @@ def sitemap_page(request):
         "seo_title": "Plan du site",
         "seo_description": "Consultez le plan du site ESFé Mali — toutes les rubriques accessibles en un coup d'œil.",
     })
+
+
+def protected_media(request, path):
+    """
+    Fichiers de MEDIA_ROOT : contrôle d'accès par objet (voir core.media et
+    <app>/media_rules.py), puis délégation au serveur frontal (X-Accel-Redirect /
+    X-Sendfile) ou envoi par plages (vidéos : lecture et seek).
+    """
+    name = media.clean_name(path)
+    file_path = media.resolve(name) if name else None
+    if file_path is None:
+        raise Http404("Fichier introuvable")
+    if not media.can_access(request.user, name):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        raise PermissionDenied
+    return media.serve_file(request, name, file_path)
@@ -4,7 +4,8 @@ from .models import (
     LessonResource, LessonDiscussion, LessonQuiz, LessonQuizQuestion, LessonQuizAnswer,
     MasterEnrollment, InstructorAssignment,
     Assignment, Submission, Exam, ExamGrade,
-    LessonProgress, ModuleProgress, SemesterResult, GradeAudit, UserProfile
+    LessonProgress, ModuleProgress, SemesterResult, GradeAudit, UserProfile,
+    MasterKpiSnapshot,
 )
 
 
@@ -52,9 +53,20 @@ class ChapterAdmin(admin.ModelAdmin):
 
 @admin.register(Lesson)
 class LessonAdmin(admin.ModelAdmin):
-    list_display = ("chapter", "title", "is_published", "order", "duration_seconds")
-    list_filter = ("chapter__module__semester", "is_published")
+    list_display = ("chapter", "title", "is_published", "order", "duration_seconds", "hls_status")
+    list_filter = ("chapter__module__semester", "is_published", "hls_status")
     search_fields = ("title", "chapter__title")
+    readonly_fields = ("hls_status", "hls_error")
+    actions = ["retranscode_hls"]
+
+    @admin.action(description="Relancer le transcodage HLS")
+    def retranscode_hls(self, request, queryset):
+        from .services import video_pipeline
+
+        lessons = queryset.exclude(video_file="")
+        for lesson in lessons:
+            video_pipeline.schedule(lesson, force=True)
+        self.message_user(request, f"{lessons.count()} leçon(s) remise(s) en file.")
 
 
 # ----- Ressources, Discussions & Quiz -----
@@ -183,6 +195,18 @@ class GradeAuditAdmin(admin.ModelAdmin):
     ordering = ("-created_at",)
 
 
+@admin.register(MasterKpiSnapshot)
+class MasterKpiSnapshotAdmin(admin.ModelAdmin):
+    list_display = (
+        "students_count", "enrollments_count", "teachers_count", "modules_count",
+        "exams_count", "results_graded", "rebuilt_at", "updated_at",
+    )
+    readonly_fields = [f.name for f in MasterKpiSnapshot._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ("user", "must_change_password")
@@ -12,6 +12,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.http import HttpResponse
 from masters.utils.import_export_tools import ImportExportManager
+from masters.utils.roles import is_director
 from programs.models import Program
 from masters.models import (
     MasterEnrollment, InstructorAssignment, ModuleUE, Exam, SemesterResult,
@@ -19,19 +20,6 @@ from masters.models import (
 import traceback
 
 
-# ----------------------------------------------------------
-# 🔒 Vérification rôle Directeur
-# ----------------------------------------------------------
-def is_director(user):
-    if not user.is_authenticated:
-        return False
-    role = (getattr(user, "role", "") or "").upper().strip()
-    if role in {"DIRECTEUR_ETUDES", "DIRECTEUR D'ÉTUDES", "DIRECTEUR DES ETUDES", "DIRECTEUR"}:
-        return True
-    names = {g.name.lower() for g in user.groups.all()}
-    return "directeur" in names or "staff_admin" in names
-
-
 # ==========================================================
 # 📥 1️⃣ Importer un fichier (Excel / CSV / JSON)
 # ==========================================================
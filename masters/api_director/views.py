@@ -5,6 +5,8 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Count, Avg, Sum, Q
 from programs.models import Program
+from ..services import kpi_snapshot
+from ..utils.roles import is_director
 from ..models import (
     ModuleUE, InstructorAssignment, MasterEnrollment, Exam, SemesterResult, Cohort
 )
@@ -14,19 +16,6 @@ from .serializers import (
 )
 
 
-# ----------------------------------------------------------
-# Vérifie que l’utilisateur est un Directeur des Études
-# ----------------------------------------------------------
-def is_director(user):
-    if not user.is_authenticated:
-        return False
-    role = (getattr(user, "role", "") or "").upper()
-    if role in ["DIRECTEUR_ETUDES", "DIRECTEUR D'ÉTUDES", "DIRECTEUR DES ETUDES", "DIRECTEUR"]:
-        return True
-    groups = {g.name.lower() for g in user.groups.all()}
-    return "directeur" in groups or "staff_admin" in groups
-
-
 # ----------------------------------------------------------
 # 🧭 1️⃣ Aperçu général (Overview)
 # ----------------------------------------------------------
@@ -37,22 +26,15 @@ class DirectorOverviewAPI(APIView):
         if not is_director(request.user):
             return Response({"error": "⛔ Accès refusé"}, status=403)
 
-        nb_programs = Program.objects.filter(cycle="MASTER").count()
-        nb_modules = ModuleUE.objects.count()
-        nb_students = MasterEnrollment.objects.values("student").distinct().count()
-        nb_teachers = InstructorAssignment.objects.values("instructor").distinct().count()
-        nb_exams = Exam.objects.count()
-
-        avg_success = SemesterResult.objects.aggregate(avg=Avg("average_20"))["avg"] or 0
-        avg_success = round(float(avg_success), 2)
+        snapshot = kpi_snapshot.get_snapshot()
 
         data = {
-            "programs": nb_programs,
-            "modules": nb_modules,
-            "students": nb_students,
-            "teachers": nb_teachers,
-            "exams": nb_exams,
-            "avg_success": avg_success,
+            "programs": snapshot.programs_count,
+            "modules": snapshot.modules_count,
+            "students": snapshot.students_count,
+            "teachers": snapshot.teachers_count,
+            "exams": snapshot.exams_count,
+            "avg_success": snapshot.avg_success,
             "recent_exams": list(
                 Exam.objects.order_by("-start_at").values("title", "start_at")[:5]
             ),
@@ -3,11 +3,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from masters.models import ModuleUE, Chapter, Lesson, InstructorAssignment
+from masters.utils.roles import is_instructor
 from .serializers import ModuleSerializer, ChapterSerializer, LessonSerializer
 
-def is_instructor(user):
-    return user.groups.filter(name__iexact="Enseignants").exists() or user.role == "ENSEIGNANT"
-
 # -------- MODULES --------
 class ModuleListCreateView(generics.ListCreateAPIView):
     serializer_class = ModuleSerializer
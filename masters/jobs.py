@@ -0,0 +1,54 @@
+# masters/jobs.py
+"""
+Tâches de la file core.Job pour l'espace Master (exécutées par `manage.py run_jobs`).
+"""
+from admissions.models import Admission
+from core.jobs import job
+from .models import MasterEnrollment
+from .services import lesson_fanout, video_pipeline
+
+
+# ============================================================
+# 🔁 SYNCHRO ADMISSION → MASTER (double sécurité)
+# ============================================================
+@job("masters.sync_admission")
+def sync_admission(admission_id):
+    """
+    - si l'Admission PAIEMENT_OK concerne un programme non-MASTER, on ignore ;
+    - sinon, on vérifie la cohérence et on relie les contenus Master.
+    """
+    from .signals import link_modules_and_lessons
+
+    instance = Admission.objects.select_related("program").filter(pk=admission_id).first()
+    if not instance or instance.status != "PAIEMENT_OK":
+        return
+
+    program = instance.program
+    if getattr(program, "cycle", "").upper() != "MASTER":
+        print(f"[SKIP] Admission {instance.id} ignorée — {program.title} n’est pas un programme MASTER.")
+        return
+
+    enrollment = MasterEnrollment.objects.filter(admission=instance).first()
+    if not enrollment:
+        print(f"[WARN] Admission {instance.id} PAIEMENT_OK sans inscription Master correspondante.")
+        return
+
+    # Lien des modules/leçons (idempotent)
+    link_modules_and_lessons(enrollment)
+
+
+# ============================================================
+# 📚 DIFFUSION D'UNE LEÇON PUBLIÉE
+# ============================================================
+@job("masters.lesson_fanout")
+def lesson_fanout_job(lesson_id):
+    lesson_fanout.fan_out_lesson(lesson_id)
+
+
+# ============================================================
+# 🎞️ VIDÉO DE LEÇON : TRANSCODAGE HLS
+# ============================================================
+# Réservée au-delà de la durée maximale des ffmpeg : jamais reprise pendant qu'elle tourne
+@job("masters.transcode_lesson_video", lease=video_pipeline.max_duration() + 600)
+def transcode_lesson_video(lesson_id):
+    video_pipeline.transcode_lesson(lesson_id)
@@ -0,0 +1,31 @@
+# masters/management/commands/rebuild_master_kpis.py
+from django.core.management.base import BaseCommand
+
+from masters.services import kpi_snapshot
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le snapshot des KPI Master (dashboards Directeur / Staff)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Affiche seulement les compteurs qui ont dérivé, sans reconstruire.",
+        )
+
+    def handle(self, *args, **options):
+        diff = kpi_snapshot.drift()
+
+        if options["check"]:
+            if not diff:
+                self.stdout.write(self.style.SUCCESS("Snapshot KPI à jour."))
+                return
+            for name, (stored, real) in diff.items():
+                self.stdout.write(f"{name}: snapshot={stored} réel={real}")
+            return
+
+        snapshot = kpi_snapshot.rebuild()
+        for name, (stored, real) in diff.items():
+            self.stdout.write(f"[CORRIGÉ] {name}: {stored} → {real}")
+        self.stdout.write(self.style.SUCCESS(f"Snapshot KPI reconstruit ({snapshot.rebuilt_at:%d/%m/%Y %H:%M})."))
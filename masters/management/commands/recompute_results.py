@@ -0,0 +1,70 @@
+# masters/management/commands/recompute_results.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from masters.models import ResultRecompute, Semester
+from masters.services import results_engine
+
+
+def _recompute_worker(semester_id: int, full: bool) -> tuple:
+    """Exécuté dans un processus fils (fork) : un semestre complet ou ses seules lignes marquées."""
+    try:
+        if full:
+            semester = Semester.objects.get(pk=semester_id)
+            return semester_id, results_engine.recompute_semester(semester)
+        return semester_id, results_engine.recompute_dirty([semester_id])
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcule les résultats semestriels (moyenne, crédits, décision). "
+        "Par défaut : seulement les couples en file (ResultRecompute)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recalcule tous les semestres non verrouillés.")
+        parser.add_argument("--semester", type=int, action="append", help="Limite à ce(s) semestre(s) (id).")
+        parser.add_argument("--program", type=int, help="Limite aux semestres de ce programme (id).")
+        parser.add_argument("--workers", type=int, default=1, help="Nombre de processus (un semestre par tâche).")
+
+    def handle(self, *args, **options):
+        full = options["all"]
+        semesters = Semester.objects.filter(is_locked=False)
+        if options["semester"]:
+            semesters = semesters.filter(pk__in=options["semester"])
+        if options["program"]:
+            semesters = semesters.filter(program_id=options["program"])
+        if not full:
+            dirty = ResultRecompute.objects.values("semester_id")
+            semesters = semesters.filter(pk__in=dirty)
+
+        semester_ids = list(semesters.order_by("pk").values_list("pk", flat=True))
+        if not semester_ids:
+            self.stdout.write(self.style.SUCCESS("Aucun résultat à recalculer."))
+            return
+
+        workers = max(1, options["workers"])
+        total = 0
+        if workers == 1 or "fork" not in multiprocessing.get_all_start_methods():
+            for semester_id in semester_ids:
+                _, written = _recompute_worker(semester_id, full)
+                total += written
+        else:
+            # Les connexions ne doivent pas être partagées entre processus forkés
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [pool.submit(_recompute_worker, semester_id, full) for semester_id in semester_ids]
+                for future in as_completed(futures):
+                    semester_id, written = future.result()
+                    total += written
+                    self.stdout.write(f"[SEMESTRE {semester_id}] {written} résultat(s) écrit(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} résultat(s) recalculé(s) sur {len(semester_ids)} semestre(s)."
+        ))
@@ -0,0 +1,23 @@
+# masters/management/commands/reconcile_module_progress.py
+from django.core.management.base import BaseCommand
+
+from masters.models import ModuleProgress
+from masters.services import progress
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de leçons et le pourcentage de tous les ModuleProgress (une requête)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--module", type=int, action="append", help="Limite à ce(s) module(s) (id).")
+        parser.add_argument("--enrollment", type=int, action="append", help="Limite à cette/ces inscription(s) (id).")
+
+    def handle(self, *args, **options):
+        qs = ModuleProgress.objects.all()
+        if options["module"]:
+            qs = qs.filter(module_id__in=options["module"])
+        if options["enrollment"]:
+            qs = qs.filter(enrollment_id__in=options["enrollment"])
+
+        updated = progress.reconcile(qs)
+        self.stdout.write(self.style.SUCCESS(f"{updated} progression(s) de module recalculée(s)."))
@@ -0,0 +1,61 @@
+# masters/media_rules.py
+"""
+Accès aux fichiers Master (voir core.media) :
+  - vidéos / ressources de leçon : staff, enseignant affecté au module,
+    étudiant inscrit (ACTIVE) au programme/cohorte du module si la leçon est publiée ;
+  - renditions HLS / poster (masters/hls/<leçon>/…) : mêmes règles que la vidéo ;
+  - copies rendues : l'étudiant auteur, l'enseignant du module, le staff.
+"""
+from django.db.models import Q
+
+from core.media import media_rule
+from .models import InstructorAssignment, Lesson, MasterEnrollment, ModuleUE, Submission
+from .utils.roles import is_staff_admin
+
+
+def _teaches(user, modules) -> bool:
+    return InstructorAssignment.objects.filter(instructor=user, is_active=True, module__in=modules).exists()
+
+
+def _enrolled(user, modules) -> bool:
+    pairs = Q()
+    for program_id, cohort_id in modules.values_list("semester__program_id", "semester__cohort_id"):
+        pairs |= Q(program_id=program_id, cohort_id=cohort_id)
+    if not pairs:
+        return False
+    return MasterEnrollment.objects.filter(pairs, student=user, status="ACTIVE").exists()
+
+
+def _lessons_access(user, lessons) -> bool:
+    if is_staff_admin(user):
+        return True
+    if _teaches(user, ModuleUE.objects.filter(chapters__lessons__in=lessons)):
+        return True
+    published = ModuleUE.objects.filter(chapters__lessons__in=lessons.filter(is_published=True))
+    return _enrolled(user, published)
+
+
+@media_rule("masters/videos/")
+@media_rule("masters/resources/")
+def lesson_file_access(user, name):
+    lessons = Lesson.objects.filter(Q(video_file=name) | Q(resource_file=name) | Q(resources__file=name))
+    return _lessons_access(user, lessons)
+
+
+@media_rule("masters/hls/")
+def lesson_hls_access(user, name):
+    # masters/hls/<lesson_id>/<version>/…
+    lesson_id = name.split("/")[2]
+    if not lesson_id.isdigit():
+        return False
+    return _lessons_access(user, Lesson.objects.filter(pk=int(lesson_id)))
+
+
+@media_rule("masters/submissions/")
+def submission_file_access(user, name):
+    if is_staff_admin(user):
+        return True
+    submissions = Submission.objects.filter(uploaded_file=name)
+    if submissions.filter(student=user).exists():
+        return True
+    return _teaches(user, ModuleUE.objects.filter(assignments__submissions__in=submissions))
@@ -1,81 +1,129 @@
 # masters/middleware.py
+from django.conf import settings
 from django.shortcuts import redirect
-from django.urls import resolve, reverse
+from django.urls import reverse
+
 from .utils.roles import user_role  # ✅ on utilise la fonction unifiée
 
+# Racine du portail Master (cf. config/urls.py → path("master/", ...))
+MASTER_ROOT = getattr(settings, "MASTERS_URL_PREFIX", "/master/")
+
+# Clé de session alimentée à la connexion (voir masters.signals → user_logged_in)
+MUST_CHANGE_PASSWORD_SESSION_KEY = "masters_must_change_password"
+
+# =======================================================
+# 🗺️ TABLE DES POLITIQUES D'ACCÈS
+# préfixe (relatif à MASTER_ROOT) → rôles autorisés (None = libre)
+# =======================================================
+ROUTE_POLICIES = (
+    ("messenger/", None),                     # 🟢 App Messenger intégrée
+    ("login/", None),
+    ("logout/", None),
+    ("student/", {"student", "instructor"}),
+    ("teacher/", {"instructor"}),
+    ("staff/", {"staff_admin"}),
+    ("director/", {"staff_admin"}),
+    ("manage/", {"staff_admin"}),
+    ("finance/", {"staff_admin"}),
+    ("api/student/", {"student", "instructor"}),
+    ("api/teacher/", {"instructor"}),
+    ("api/director/", {"staff_admin"}),
+)
+
+# Routes qui ne déclenchent pas la redirection "changement de mot de passe obligatoire"
+PASSWORD_EXEMPT_PREFIXES = ("login/", "logout/", "force-password-change/", "messenger/")
+
+# Redirection en cas de refus, selon le rôle
+DENIED_REDIRECTS = {
+    "student": "masters:student_dashboard",
+}
+DEFAULT_DENIED_REDIRECT = "masters:dashboard"
+
+_POLICY = "__policy__"
+
+
+def _segments(relative_path):
+    return [s for s in relative_path.split("/") if s]
+
+
+def compile_policies(policies):
+    """Compile la table en trie de segments : {segment: {..., _POLICY: roles}}."""
+    trie = {}
+    for prefix, roles in policies:
+        node = trie
+        for segment in _segments(prefix):
+            node = node.setdefault(segment, {})
+        node[_POLICY] = frozenset(roles) if roles is not None else None
+    return trie
+
+
+def match_policy(trie, relative_path):
+    """
+    Retourne (trouvé, rôles autorisés) pour le préfixe le plus long.
+    `rôles autorisés` vaut None pour une route libre.
+    """
+    node, found, policy = trie, False, None
+    for segment in _segments(relative_path):
+        node = node.get(segment)
+        if node is None:
+            break
+        if _POLICY in node:
+            found, policy = True, node[_POLICY]
+    return found, policy
+
+
+def must_change_password(request):
+    """Lit le drapeau en session ; ne consulte le profil qu'une fois pour les sessions antérieures."""
+    session = request.session
+    flag = session.get(MUST_CHANGE_PASSWORD_SESSION_KEY)
+    if flag is None:
+        profile = getattr(request.user, "userprofile", None)
+        flag = bool(getattr(profile, "must_change_password", False))
+        session[MUST_CHANGE_PASSWORD_SESSION_KEY] = flag
+    return flag
+
 
 class MasterAccessMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.root = MASTER_ROOT
+        self.trie = compile_policies(ROUTE_POLICIES)
+        self.password_exempt = compile_policies((p, None) for p in PASSWORD_EXEMPT_PREFIXES)
+        self.force_password_url = reverse("masters:force_password_change")
+        self.denied_urls = {role: reverse(name) for role, name in DENIED_REDIRECTS.items()}
+        self.default_denied_url = reverse(DEFAULT_DENIED_REDIRECT)
 
     def __call__(self, request):
-        user = request.user
-        path = request.path.lower()
+        path = request.path_info.lower()
 
         # =======================================================
-        # 0️⃣ LAISSER PASSER LES ROUTES PUBLIQUES ET INTERNES SPÉCIALES
+        # 0️⃣ HORS PORTAIL MASTER → AUCUN CONTRÔLE
         # =======================================================
-        if (
-            path.startswith("/masters/messenger/") or  # 🟢 App Messenger intégrée
-            path.startswith("/ws/") or                 # 🟢 WebSockets (Channels)
-            path.startswith("/admin/") or              # 🟢 Admin Django
-            path.startswith("/static/") or             # 🟢 Fichiers statiques
-            path.startswith("/media/")                 # 🟢 Fichiers médias (ex: enregistrements)
-        ):
+        if not path.startswith(self.root):
             return self.get_response(request)
 
-        # =======================================================
-        # 1️⃣ OBLIGATION DE CHANGEMENT DE MOT DE PASSE
-        # =======================================================
-        if (
-            user.is_authenticated
-            and hasattr(user, "userprofile")
-            and getattr(user.userprofile, "must_change_password", False)
-            and not request.path.startswith(reverse("masters:force_password_change"))
-            and not request.path.startswith("/admin")
-        ):
-            return redirect("masters:force_password_change")
+        user = request.user
+        if not user.is_authenticated:
+            return self.get_response(request)
+
+        relative = path[len(self.root):]
 
         # =======================================================
-        # 2️⃣ REDIRECTION AUTO À L’ENTRÉE DU PORTAIL MASTER
+        # 1️⃣ OBLIGATION DE CHANGEMENT DE MOT DE PASSE
         # =======================================================
-        try:
-            if user.is_authenticated and resolve(request.path_info).url_name == "portal":
-                role = user_role(user)
-                if role == "student":
-                    return redirect("masters:student_dashboard")
-                elif role == "instructor":
-                    return redirect("masters:dashboard")
-                elif role == "staff_admin":
-                    return redirect("masters:dashboard")
-        except Exception:
-            pass
+        if not match_policy(self.password_exempt, relative)[0] and must_change_password(request):
+            return redirect(self.force_password_url)
 
         # =======================================================
-        # 3️⃣ PROTECTION DES ROUTES SELON LE RÔLE
+        # 2️⃣ PROTECTION DES ROUTES SELON LE RÔLE
         # =======================================================
-        if user.is_authenticated:
+        found, allowed = match_policy(self.trie, relative)
+        if found and allowed is not None and not user.is_superuser:
             role = user_role(user)
-
-            # Étudiant : accès uniquement à son espace
-            if role == "student" and (
-                "/teacher/" in path or "/manage/" in path or "/finance/" in path
-            ):
-                return redirect("masters:student_dashboard")
-
-            # Enseignant : pas d’accès aux zones staff
-            if role == "instructor" and (
-                "/manage/" in path or "/finance/" in path or "/staff/" in path
-            ):
-                return redirect("masters:dashboard")
-
-            # Staff : pas d’accès aux zones étudiants ou enseignants
-            if role == "staff_admin" and (
-                "/student/" in path or "/teacher/" in path
-            ):
-                return redirect("masters:dashboard")
+            if role not in allowed:
+                return redirect(self.denied_urls.get(role, self.default_denied_url))
 
         # =======================================================
-        # 4️⃣ CONTINUER LA CHAÎNE DE MIDDLEWARES
+        # 3️⃣ CONTINUER LA CHAÎNE DE MIDDLEWARES
         # =======================================================
         return self.get_response(request)
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0003_lessondiscussion_lessonquiz_lessonquizanswer_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MasterKpiSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('programs_count', models.PositiveIntegerField(default=0)),
+                ('semesters_count', models.PositiveIntegerField(default=0)),
+                ('modules_count', models.PositiveIntegerField(default=0)),
+                ('enrollments_count', models.PositiveIntegerField(default=0)),
+                ('students_count', models.PositiveIntegerField(default=0)),
+                ('teachers_count', models.PositiveIntegerField(default=0)),
+                ('exams_count', models.PositiveIntegerField(default=0)),
+                ('results_graded', models.PositiveIntegerField(default=0)),
+                ('results_avg_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('results_decided', models.PositiveIntegerField(default=0)),
+                ('results_admitted', models.PositiveIntegerField(default=0)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot KPI Master',
+                'verbose_name_plural': 'Snapshot KPI Master',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0004_masterkpisnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semesterresult',
+            name='needs_recompute',
+            field=models.BooleanField(db_index=True, default=False, help_text='Notes modifiées depuis le dernier calcul (voir services/results_engine.py).'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:36
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_lesson_counters(apps, schema_editor):
+    """Initialise les compteurs ; le pourcentage suivra via `manage.py reconcile_module_progress`."""
+    Lesson = apps.get_model("masters", "Lesson")
+    LessonProgress = apps.get_model("masters", "LessonProgress")
+    ModuleProgress = apps.get_model("masters", "ModuleProgress")
+    total = Subquery(
+        Lesson.objects.filter(chapter__module_id=OuterRef("module_id"), is_published=True)
+        .order_by().values("chapter__module_id").annotate(n=Count("id")).values("n")[:1],
+        output_field=IntegerField(),
+    )
+    completed = Subquery(
+        LessonProgress.objects.filter(
+            enrollment_id=OuterRef("enrollment_id"),
+            lesson__chapter__module_id=OuterRef("module_id"),
+            lesson__is_published=True,
+            completed_at__isnull=False,
+        )
+        .order_by().values("enrollment_id").annotate(n=Count("id")).values("n")[:1],
+        output_field=IntegerField(),
+    )
+    ModuleProgress.objects.update(
+        lessons_total=Coalesce(total, Value(0)),
+        lessons_completed=Coalesce(completed, Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0005_semesterresult_needs_recompute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moduleprogress',
+            name='lessons_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='moduleprogress',
+            name='lessons_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_lesson_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0006_moduleprogress_lesson_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_playlist',
+            field=models.FileField(blank=True, editable=False, upload_to='masters/hls/'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_status',
+            field=models.CharField(choices=[('NONE', 'Aucune'), ('PENDING', 'En attente'), ('PROCESSING', 'En cours'), ('READY', 'Prête'), ('FAILED', 'Échec')], default='NONE', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='poster',
+            field=models.FileField(blank=True, editable=False, upload_to='masters/hls/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0008_drive_blobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='resource_file',
+            field=models.FileField(blank=True, storage=core.storage.DedupStorage(), upload_to='masters/resources/'),
+        ),
+        migrations.AlterField(
+            model_name='lessonresource',
+            name='file',
+            field=models.FileField(storage=core.storage.DedupStorage(), upload_to='masters/resources/'),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='uploaded_file',
+            field=models.FileField(blank=True, storage=core.storage.DedupStorage(), upload_to='masters/submissions/'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def move_dirty_flags(apps, schema_editor):
+    """needs_recompute → file ResultRecompute ; les lignes vides jamais calculées disparaissent."""
+    SemesterResult = apps.get_model("masters", "SemesterResult")
+    ResultRecompute = apps.get_model("masters", "ResultRecompute")
+    dirty = SemesterResult.objects.filter(needs_recompute=True, is_locked=False)
+    now = timezone.now()
+    ResultRecompute.objects.bulk_create(
+        [
+            ResultRecompute(enrollment_id=e, semester_id=s, marked_at=now)
+            for e, s in dirty.values_list("enrollment_id", "semester_id")
+        ],
+        batch_size=500, ignore_conflicts=True,
+    )
+    dirty.filter(computed_at__isnull=True, average_20__isnull=True, decision__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0009_alter_lesson_resource_file_alter_lessonresource_file_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultRecompute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marked_at', models.DateTimeField()),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masters.masterenrollment')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masters.semester')),
+            ],
+            options={
+                'unique_together': {('enrollment', 'semester')},
+            },
+        ),
+        migrations.RunPython(move_dirty_flags, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='semesterresult',
+            name='needs_recompute',
+        ),
+    ]
@@ -9,6 +9,7 @@ from django.utils import timezone
 from django.utils.text import slugify
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
+from core.storage import dedup_storage
 
 User = settings.AUTH_USER_MODEL
 
@@ -186,15 +187,37 @@ class Lesson(models.Model):
     duration_seconds = models.PositiveIntegerField(default=0)
     video_file = models.FileField(upload_to="masters/videos/", blank=True)
     external_url = models.URLField(blank=True)
-    resource_file = models.FileField(upload_to="masters/resources/", blank=True)
+    resource_file = models.FileField(upload_to="masters/resources/", blank=True, storage=dedup_storage)
     is_published = models.BooleanField(default=False)
 
+    # 🎞️ Diffusion HLS (240p/360p/720p) produite par masters.services.video_pipeline
+    HLS_NONE, HLS_PENDING, HLS_PROCESSING, HLS_READY, HLS_FAILED = "NONE", "PENDING", "PROCESSING", "READY", "FAILED"
+    HLS_STATUS = (
+        (HLS_NONE, "Aucune"),
+        (HLS_PENDING, "En attente"),
+        (HLS_PROCESSING, "En cours"),
+        (HLS_READY, "Prête"),
+        (HLS_FAILED, "Échec"),
+    )
+    hls_status = models.CharField(max_length=10, choices=HLS_STATUS, default=HLS_NONE, editable=False)
+    hls_playlist = models.FileField(upload_to="masters/hls/", blank=True, editable=False)
+    poster = models.FileField(upload_to="masters/hls/", blank=True, editable=False)
+    hls_error = models.TextField(blank=True, editable=False)
+
     class Meta:
         ordering = ["chapter_id", "order", "id"]
 
     def __str__(self):
         return f"{self.chapter.module.code} • {self.title}"
 
+    @property
+    def hls_url(self):
+        return self.hls_playlist.url if self.hls_status == self.HLS_READY and self.hls_playlist else None
+
+    @property
+    def poster_url(self):
+        return self.poster.url if self.poster else None
+
 
 # ==========================================================
 # 🆕 ENRICHISSEMENTS : Ressources, Discussions, Quiz
@@ -203,7 +226,7 @@ class Lesson(models.Model):
 class LessonResource(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="resources")
     title = models.CharField(max_length=200)
-    file = models.FileField(upload_to="masters/resources/")
+    file = models.FileField(upload_to="masters/resources/", storage=dedup_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -329,7 +352,7 @@ class Submission(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="master_submissions")
     submitted_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=SUBMISSION_STATUS, default="DRAFT")
-    uploaded_file = models.FileField(upload_to="masters/submissions/", blank=True)
+    uploaded_file = models.FileField(upload_to="masters/submissions/", blank=True, storage=dedup_storage)
     answer_text = models.TextField(blank=True)
     score_raw = models.DecimalField(max_digits=7, decimal_places=3, null=True, blank=True)
     note_20 = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
@@ -402,11 +425,29 @@ class LessonProgress(models.Model):
     class Meta:
         unique_together = (("enrollment", "lesson"),)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # valeur chargée : permet aux signaux de détecter la transition "terminée" sans requête
+        instance._loaded_completed_at = instance.__dict__.get("completed_at")
+        return instance
+
+    def mark_completed(self) -> bool:
+        """Marque la leçon terminée (idempotent). ModuleProgress est ajusté par signal."""
+        if self.completed_at:
+            return False
+        self.completed_at = timezone.now()
+        self.save(update_fields=["completed_at"])
+        return True
+
 
 class ModuleProgress(models.Model):
     enrollment = models.ForeignKey(MasterEnrollment, on_delete=models.CASCADE, related_name="module_progress")
     module = models.ForeignKey(ModuleUE, on_delete=models.CASCADE, related_name="progress")
     percent = models.DecimalField(max_digits=5, decimal_places=2, default=0.0)
+    # Compteurs maintenus incrémentalement (voir services/progress.py)
+    lessons_completed = models.PositiveIntegerField(default=0)
+    lessons_total = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -431,6 +472,20 @@ class SemesterResult(models.Model):
         return f"{self.enrollment} • {self.semester} → {self.average_20 or '-'}"
 
 
+class ResultRecompute(models.Model):
+    """
+    Couple (inscription, semestre) dont les notes ont changé depuis le dernier calcul
+    (voir services/results_engine.py). Table à part : aucune ligne SemesterResult
+    vide n'est créée avant le calcul, les KPI ne voient que des résultats réels.
+    """
+    enrollment = models.ForeignKey(MasterEnrollment, on_delete=models.CASCADE, related_name="+")
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name="+")
+    marked_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = (("enrollment", "semester"),)
+
+
 class GradeAudit(models.Model):
     actor = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
     context = models.CharField(max_length=32)
@@ -443,6 +498,80 @@ class GradeAudit(models.Model):
         ordering = ["-created_at"]
 
 
+# ==========================================================
+# INDICATEURS (snapshot KPI Directeur / Staff)
+# ==========================================================
+
+class MasterKpiSnapshot(models.Model):
+    """
+    Compteurs globaux Master, maintenus par incréments (signaux) et
+    reconstruits intégralement par `manage.py rebuild_master_kpis`.
+    Une seule ligne (pk=1) : lue en une requête par les dashboards.
+    """
+    programs_count = models.PositiveIntegerField(default=0)
+    semesters_count = models.PositiveIntegerField(default=0)
+    modules_count = models.PositiveIntegerField(default=0)
+    enrollments_count = models.PositiveIntegerField(default=0)
+    students_count = models.PositiveIntegerField(default=0)
+    teachers_count = models.PositiveIntegerField(default=0)
+    exams_count = models.PositiveIntegerField(default=0)
+
+    results_graded = models.PositiveIntegerField(default=0)  # average_20 renseignée
+    results_avg_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    results_decided = models.PositiveIntegerField(default=0)  # decision renseignée
+    results_admitted = models.PositiveIntegerField(default=0)  # decision = ADM
+
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Snapshot KPI Master"
+        verbose_name_plural = "Snapshot KPI Master"
+
+    def __str__(self):
+        return f"KPI Master (reconstruit le {self.rebuilt_at or '—'})"
+
+    @property
+    def avg_success(self) -> float:
+        if not self.results_graded:
+            return 0.0
+        return round(float(self.results_avg_sum) / self.results_graded, 2)
+
+    @property
+    def success_rate(self) -> float:
+        if not self.results_decided:
+            return 0.0
+        return round((self.results_admitted / self.results_decided) * 100.0, 2)
+
+
+# ==========================================================
+# STOCKAGE DRIVE (contenus dédupliqués, voir services/drive_service.py)
+# ==========================================================
+
+class DriveBlob(models.Model):
+    """Contenu unique (SHA-256) chez le backend Drive ; supprimé quand plus aucun fichier n'y renvoie."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    remote_id = models.CharField(max_length=255)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} réf.)"
+
+
+class DriveFile(models.Model):
+    """Fichier déposé (lien public) : une référence vers un DriveBlob."""
+    file_id = models.CharField(max_length=64, unique=True)
+    blob = models.ForeignKey(DriveBlob, on_delete=models.PROTECT, related_name="files")
+    name = models.CharField(max_length=255, blank=True)
+    uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name or self.file_id
+
+
 # ==========================================================
 # PROFIL UTILISATEUR (mot de passe forcé)
 # ==========================================================
@@ -1,34 +1,111 @@
+# masters/services/drive_service.py
+"""
+Dépôt des vidéos de leçons sur "Drive", par un backend interchangeable.
+
+  - l'envoi est lu par blocs (jamais chargé en mémoire) et haché au fil de
+    l'eau (SHA-256) ;
+  - un contenu identique n'est stocké qu'une fois (DriveBlob), chaque dépôt
+    est une référence (DriveFile) : `drive_delete` ne supprime le contenu que
+    lorsque plus aucun fichier n'y renvoie.
+
+Backend : DRIVE_BACKEND (chemin pointé, défaut LocalDriveBackend). Le backend
+local range les contenus sous DRIVE_LOCAL_ROOT (défaut MEDIA_ROOT/mock_drive)
+et sert de doublure au futur backend Google Drive (même interface).
+
+Lecture, hachage, verrou par contenu et comptage : core.blobstore (code
+partagé avec le stockage dédupliqué des médias, core.storage ; racine et
+compteur distincts).
+"""
 import os
+import re
+from pathlib import Path
 from uuid import uuid4
 
-# Dossier simulé pour le stockage local (tu peux changer)
-MOCK_STORAGE = "media/mock_drive"
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from core.blobstore import ContentStore, add_reference, content_lock, drop_reference
+
+from ..models import DriveBlob, DriveFile
+
+_FILE_ID = re.compile(r"/file/d/([^/?#]+)")
+
+
+# ==========================================================
+# 💾 BACKENDS
+# ==========================================================
+class LocalDriveBackend(ContentStore):
+    """Stockage adressé par contenu sur disque : <racine>/ab/cd/<sha256> ; remote_id = sha256."""
+
+    def __init__(self, root=None):
+        super().__init__(root or getattr(settings, "DRIVE_LOCAL_ROOT", Path(settings.MEDIA_ROOT) / "mock_drive"))
+
+    def commit(self, staged) -> str:
+        super().commit(staged)
+        return staged.sha256
+
+    def url(self, file_id: str) -> str:
+        # Même forme que les liens Drive : `drive_delete` retrouve l'identifiant
+        return f"https://drive.google.com/file/d/{file_id}/view"
 
-os.makedirs(MOCK_STORAGE, exist_ok=True)
 
-def drive_upload(file_obj, module_title, user):
-    """
-    Simulation d’un upload vers Google Drive.
-    En prod : utilisera l’API Drive (pydrive2 ou google-api-python-client).
-    """
-    # Génère un identifiant unique et un faux lien public
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend = getattr(settings, "DRIVE_BACKEND", "masters.services.drive_service.LocalDriveBackend")
+        _backend = import_string(backend)()
+    return _backend
+
+
+# ==========================================================
+# 📤 DÉPÔT / SUPPRESSION
+# ==========================================================
+def drive_upload(file_obj, module_title, user, backend=None):
+    """Dépose `file_obj` (lu par blocs) et retourne {"id", "url", "sha256", "size"}."""
+    backend = backend or get_backend()
+    staged = backend.stage(file_obj)
     file_id = str(uuid4())
-    fake_url = f"https://drive.google.com/file/d/{file_id}/view"
-
-    # Sauvegarde locale (mock)
-    if hasattr(file_obj, "read"):
-        safe_name = f"{file_id}_{getattr(file_obj, 'name', 'video.mp4')}"
-        path = os.path.join(MOCK_STORAGE, safe_name)
-        with open(path, "wb") as f:
-            f.write(file_obj.read())
-
-    print(f"[MOCK DRIVE] Upload: {module_title} by {user} -> {fake_url}")
-    return {"id": file_id, "url": fake_url}
-
-def drive_delete(drive_url):
-    """
-    Simulation de suppression depuis Google Drive.
-    En prod : utilisera l’API Drive pour supprimer par fileId.
-    """
-    print(f"[MOCK DRIVE] Delete: {drive_url}")
+
+    try:
+        # Verrou tenu jusqu'au COMMIT : une suppression concurrente du même
+        # contenu ne peut pas l'effacer avant que la référence soit écrite
+        with content_lock(staged.sha256), transaction.atomic():
+            remote_id = backend.commit(staged)
+            blob = add_reference(DriveBlob, staged.sha256, staged.size, remote_id=remote_id)
+            DriveFile.objects.create(
+                file_id=file_id,
+                blob=blob,
+                name=os.path.basename(getattr(file_obj, "name", "") or "")[:255],
+                uploaded_by=user if getattr(user, "pk", None) else None,
+            )
+    except BaseException:
+        backend.discard(staged)
+        raise
+
+    url = backend.url(file_id)
+    print(f"[DRIVE] Upload: {module_title} by {user} -> {url} ({staged.sha256[:12]})")
+    return {"id": file_id, "url": url, "sha256": staged.sha256, "size": staged.size}
+
+
+def drive_delete(drive_url, backend=None):
+    """Retire la référence ; le contenu n'est supprimé qu'à la dernière. False si lien inconnu."""
+    backend = backend or get_backend()
+    match = _FILE_ID.search(drive_url or "")
+    file_id = match.group(1) if match else (drive_url or "").strip()
+
+    drive_file = DriveFile.objects.select_related("blob").filter(file_id=file_id).first()
+    if drive_file is None:
+        return False
+    with content_lock(drive_file.blob.sha256), transaction.atomic():
+        if not DriveFile.objects.filter(pk=drive_file.pk).delete()[0]:
+            return False  # supprimé entre-temps
+        blob, remaining = drop_reference(DriveBlob, drive_file.blob_id)
+        if not remaining:
+            backend.delete(blob.remote_id)
+
+    print(f"[DRIVE] Delete: {drive_url} (réf. restantes : {remaining})")
     return True
@@ -0,0 +1,144 @@
+# masters/services/grade_matrix.py
+"""
+Matrice des notes d'une inscription : semestre × module.
+
+Chargement en un nombre fixe de requêtes, quel que soit le nombre de semestres :
+  1. résultats semestriels (SemesterResult)
+  2. modules actifs des semestres concernés
+  3. soumissions notées (Submission GRADED) de l'étudiant
+  4. examens des semestres et notes (ExamGrade) de l'étudiant
+
+Les moyennes suivent les règles du moteur de résultats (results_engine) :
+devoirs pondérés par Assignment.coefficient, meilleure ou dernière tentative
+d'examen selon rattrapage_take_max, rattrapage. Le détail affiché concorde
+donc avec SemesterResult.
+
+Utilisée par le fragment étudiant "results", `_student_context` et
+`api_student_overview` pour afficher les mêmes chiffres partout.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..models import Exam, ModuleUE, Submission, ExamGrade, SemesterResult
+from . import results_engine
+
+
+def _mean(values) -> Optional[float]:
+    values = [float(v) for v in values if v is not None]
+    return round(sum(values) / len(values), 2) if values else None
+
+
+@dataclass
+class GradeMatrix:
+    results: List[SemesterResult] = field(default_factory=list)
+    modules_by_semester: Dict[int, List[ModuleUE]] = field(default_factory=dict)
+    # module_id → [(note /20, coefficient du devoir)]
+    module_notes: Dict[int, List[Tuple[float, float]]] = field(default_factory=dict)
+    # semester_id → bloc examen (rattrapage compris), règles du moteur
+    exam_blocks: Dict[int, Optional[float]] = field(default_factory=dict)
+
+    # --------------------------------------------------------
+    # Cellules
+    # --------------------------------------------------------
+    def module_average(self, module_id: int) -> Optional[float]:
+        average = results_engine.weighted_mean(self.module_notes.get(module_id, []))
+        return None if average is None else round(average, 2)
+
+    def exam_average(self, semester_id: int) -> Optional[float]:
+        block = self.exam_blocks.get(semester_id)
+        return None if block is None else round(block, 2)
+
+    # --------------------------------------------------------
+    # Vues prêtes pour les templates / API
+    # --------------------------------------------------------
+    @property
+    def semester_blocks(self) -> List[dict]:
+        return [
+            {
+                "sr": sr,
+                "rows": [
+                    {"module": m, "final_note": self.module_average(m.id)}
+                    for m in self.modules_by_semester.get(sr.semester_id, [])
+                ],
+                "exam_average": self.exam_average(sr.semester_id),
+            }
+            for sr in self.results
+        ]
+
+    @property
+    def summary(self) -> dict:
+        decision_finale = next(
+            (sr.get_decision_display() for sr in reversed(self.results) if sr.decision), None
+        )
+        return {
+            "avg_global": _mean(sr.average_20 for sr in self.results),
+            "credits_total": round(sum(float(sr.credits_earned or 0) for sr in self.results), 2),
+            "decision_finale": decision_finale,
+        }
+
+
+def build_grade_matrix(enrollment, with_grades: bool = True) -> GradeMatrix:
+    """
+    Construit la matrice semestre × module pour une inscription Master.
+    `with_grades=False` ne charge que les résultats (suffisant pour `summary`).
+    """
+    student_id = enrollment.student_id
+
+    results = list(
+        SemesterResult.objects
+        .filter(enrollment=enrollment)
+        .select_related("semester__program__master_meta", "semester__cohort")
+        .order_by("semester__order", "semester__name")
+    )
+
+    semester_ids = {sr.semester_id for sr in results}
+    if not semester_ids or not with_grades:
+        return GradeMatrix(results=results)
+
+    modules_by_semester: Dict[int, List[ModuleUE]] = {}
+    modules = (
+        ModuleUE.objects
+        .filter(semester_id__in=semester_ids, is_active=True)
+        .order_by("semester_id", "order", "id")
+    )
+    for m in modules:
+        modules_by_semester.setdefault(m.semester_id, []).append(m)
+
+    module_notes: Dict[int, List[Tuple[float, float]]] = {}
+    graded = (
+        Submission.objects
+        .filter(
+            student_id=student_id, status="GRADED", note_20__isnull=False,
+            assignment__module__semester_id__in=semester_ids,
+        )
+        .values_list("assignment__module_id", "note_20", "assignment__coefficient")
+    )
+    for module_id, note, coefficient in graded:
+        module_notes.setdefault(module_id, []).append((float(note), float(coefficient)))
+
+    exams_by_semester: Dict[int, List[tuple]] = defaultdict(list)
+    for exam_id, semester_id, kind, coefficient in Exam.objects.filter(semester_id__in=semester_ids).values_list(
+        "id", "semester_id", "eval_kind", "coefficient"
+    ):
+        exams_by_semester[semester_id].append((exam_id, kind, float(coefficient)))
+
+    attempts: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+    for exam_id, attempt_no, note in ExamGrade.objects.filter(
+        student_id=student_id, exam__semester_id__in=semester_ids
+    ).values_list("exam_id", "attempt_no", "note_20"):
+        attempts[exam_id].append((attempt_no, float(note)))
+
+    exam_blocks: Dict[int, Optional[float]] = {}
+    for sr in results:
+        exams = exams_by_semester.get(sr.semester_id, [])
+        best = results_engine.take_max(sr.semester)
+        notes = {e: results_engine.exam_note(attempts[e], best) for e, _, _ in exams if attempts.get(e)}
+        exam_blocks[sr.semester_id] = results_engine.exam_block(notes, exams, best) if exams else None
+
+    return GradeMatrix(
+        results=results,
+        modules_by_semester=modules_by_semester,
+        module_notes=module_notes,
+        exam_blocks=exam_blocks,
+    )
@@ -0,0 +1,192 @@
+# masters/services/kpi_snapshot.py
+"""
+Snapshot des KPI Master (Directeur / Staff).
+
+Les dashboards lisent une seule ligne `MasterKpiSnapshot` au lieu de relancer
+7 à 10 COUNT/DISTINCT/AVG sur toutes les tables. La ligne est tenue à jour par
+les signaux (voir masters/signals.py) et reconstruite par
+`manage.py rebuild_master_kpis` en cas de dérive (bulk_update, shell, SQL brut…).
+"""
+import threading
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import (
+    Semester, ModuleUE, MasterEnrollment, InstructorAssignment,
+    Exam, SemesterResult, MasterKpiSnapshot, CYCLE_MASTER,
+)
+
+SNAPSHOT_PK = 1
+
+# Compteurs DISTINCT à recompter au COMMIT, par transaction (voir settle_distinct_on_commit)
+_pending = threading.local()
+
+COUNTER_FIELDS = (
+    "programs_count", "semesters_count", "modules_count", "enrollments_count",
+    "students_count", "teachers_count", "exams_count",
+    "results_graded", "results_decided", "results_admitted",
+)
+
+
+# ==========================================================
+# CALCUL COMPLET
+# ==========================================================
+def compute_programs_count() -> int:
+    from programs.models import Program
+    return Program.objects.filter(cycle=CYCLE_MASTER).count()
+
+
+def compute_results_kpis() -> dict:
+    agg = SemesterResult.objects.aggregate(
+        graded=Count("id", filter=Q(average_20__isnull=False)),
+        avg_sum=Sum("average_20"),
+        decided=Count("id", filter=Q(decision__isnull=False)),
+        admitted=Count("id", filter=Q(decision="ADM")),
+    )
+    return {
+        "results_graded": agg["graded"] or 0,
+        "results_avg_sum": agg["avg_sum"] or Decimal("0"),
+        "results_decided": agg["decided"] or 0,
+        "results_admitted": agg["admitted"] or 0,
+    }
+
+
+def compute_all() -> dict:
+    """Recalcule tous les compteurs depuis les tables (requêtes complètes)."""
+    values = {
+        "programs_count": compute_programs_count(),
+        "semesters_count": Semester.objects.count(),
+        "modules_count": ModuleUE.objects.count(),
+        "enrollments_count": MasterEnrollment.objects.count(),
+        "students_count": MasterEnrollment.objects.values("student").distinct().count(),
+        "teachers_count": InstructorAssignment.objects.values("instructor").distinct().count(),
+        "exams_count": Exam.objects.count(),
+    }
+    values.update(compute_results_kpis())
+    return values
+
+
+def _transaction_keys() -> set:
+    """
+    Registre de la transaction en cours, repérée par son bloc atomic le plus
+    externe : un nouveau bloc (après COMMIT ou ROLLBACK) repart d'un registre vide.
+    """
+    block = connection.atomic_blocks[0]
+    if getattr(_pending, "block", None) is not block:
+        _pending.block, _pending.keys = block, set()
+    return _pending.keys
+
+
+def rebuild() -> MasterKpiSnapshot:
+    """Reconstruit intégralement le snapshot (commande de secours en cas de dérive)."""
+    values = compute_all()
+    values["rebuilt_at"] = timezone.now()
+    snapshot, _ = MasterKpiSnapshot.objects.update_or_create(pk=SNAPSHOT_PK, defaults=values)
+    return snapshot
+
+
+def drift() -> dict:
+    """Retourne {champ: (snapshot, réel)} pour les compteurs divergents."""
+    snapshot = MasterKpiSnapshot.objects.filter(pk=SNAPSHOT_PK).first()
+    real = compute_all()
+    if snapshot is None:
+        return {name: (None, value) for name, value in real.items()}
+    return {
+        name: (getattr(snapshot, name), value)
+        for name, value in real.items()
+        if getattr(snapshot, name) != value
+    }
+
+
+# ==========================================================
+# LECTURE (1 requête)
+# ==========================================================
+def get_snapshot() -> MasterKpiSnapshot:
+    snapshot = MasterKpiSnapshot.objects.filter(pk=SNAPSHOT_PK).first()
+    if snapshot is None:
+        snapshot = rebuild()
+    return snapshot
+
+
+# ==========================================================
+# INCRÉMENTS (appelés par les signaux)
+# ==========================================================
+def bump(**deltas) -> None:
+    """
+    Applique des incréments atomiques (F()) sur le snapshot.
+    Si le snapshot n'existe pas encore, on le construit (il inclut déjà l'écriture en cours).
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    updates = {}
+    for name, delta in deltas.items():
+        if name in COUNTER_FIELDS:
+            updates[name] = Greatest(F(name) + delta, Value(0))
+        else:
+            updates[name] = F(name) + delta
+    updates["updated_at"] = timezone.now()
+    if not MasterKpiSnapshot.objects.filter(pk=SNAPSHOT_PK).update(**updates):
+        rebuild()
+
+
+def refresh_programs_count() -> None:
+    """Les programmes sont peu nombreux : on recompte plutôt que de suivre les changements de cycle."""
+    updated = MasterKpiSnapshot.objects.filter(pk=SNAPSHOT_PK).update(
+        programs_count=compute_programs_count(), updated_at=timezone.now()
+    )
+    if not updated:
+        rebuild()
+
+
+def refresh_results_counters() -> None:
+    """Après une écriture en masse (bulk_update) des résultats : recompte les seuls KPI résultats."""
+    values = compute_results_kpis()
+    values["updated_at"] = timezone.now()
+    if not MasterKpiSnapshot.objects.filter(pk=SNAPSHOT_PK).update(**values):
+        rebuild()
+
+
+def settle_distinct_on_commit(field: str, model, column: str) -> None:
+    """
+    Après suppression, recompte un compteur DISTINCT (étudiants, enseignants)
+    au COMMIT, une seule fois par transaction : les suppressions en cascade
+    envoient un post_delete par ligne, et un décrément ne saurait pas si un
+    `rebuild()` de la même transaction a déjà vu la suppression.
+
+    Chaque appel inscrit le compteur au registre de la transaction et programme
+    un recompte on_commit ; le premier exécuté le retire du registre, les suivants
+    n'ont plus rien à faire. Un rollback (même d'un savepoint) retire ses recomptes :
+    un appel ultérieur en reprogramme un.
+    """
+    key = (field, model, column)
+    keys = None
+    if connection.in_atomic_block:
+        keys = _transaction_keys()
+        keys.add(key)
+    transaction.on_commit(lambda: _recount_distinct(key, keys))
+
+
+def _recount_distinct(key, keys) -> None:
+    if keys is not None:
+        if key not in keys:
+            return
+        keys.discard(key)
+    field, model, column = key
+    count = model.objects.values(column).distinct().count()
+    if not MasterKpiSnapshot.objects.filter(pk=SNAPSHOT_PK).update(**{field: count, "updated_at": timezone.now()}):
+        rebuild()
+
+
+def result_contribution(average_20, decision) -> dict:
+    """Contribution d'une ligne SemesterResult aux compteurs de résultats."""
+    return {
+        "results_graded": 1 if average_20 is not None else 0,
+        "results_avg_sum": Decimal(str(average_20)) if average_20 is not None else Decimal("0"),
+        "results_decided": 1 if decision else 0,
+        "results_admitted": 1 if decision == "ADM" else 0,
+    }
@@ -0,0 +1,89 @@
+# masters/services/lesson_fanout.py
+"""
+Diffusion d'une leçon publiée aux inscriptions existantes.
+
+Quand une leçon est publiée (création, publication ou déplacement vers un
+autre module), les étudiants ACTIFS du programme/cohorte du module doivent
+recevoir leur LessonProgress (et le ModuleProgress s'il manque).
+
+Le travail est fait hors du cycle requête/réponse : `schedule()` est appelé
+par le signal post_save de Lesson et met la tâche "masters.lesson_fanout"
+en file (core.Job) après COMMIT. Les inscriptions sont parcourues par lots
+(keyset sur pk) avec insertions en masse.
+"""
+from django.db import transaction
+
+from core.jobs import enqueue
+
+from ..models import Lesson, LessonProgress, MasterEnrollment, ModuleProgress
+from . import progress
+
+FANOUT_CHUNK_SIZE = 500
+
+
+def fan_out_lesson(lesson_id: int, chunk_size: int = FANOUT_CHUNK_SIZE) -> int:
+    """Crée les LessonProgress manquants de la leçon pour les inscriptions actives. Retourne le nombre créé."""
+    lesson = (
+        Lesson.objects
+        .filter(pk=lesson_id, is_published=True, chapter__module__is_active=True)
+        .values(
+            "chapter__module_id",
+            "chapter__module__semester__program_id",
+            "chapter__module__semester__cohort_id",
+        )
+        .first()
+    )
+    if not lesson:
+        return 0
+
+    module_id = lesson["chapter__module_id"]
+    enrollments = (
+        MasterEnrollment.objects
+        .filter(
+            program_id=lesson["chapter__module__semester__program_id"],
+            cohort_id=lesson["chapter__module__semester__cohort_id"],
+            status="ACTIVE",
+        )
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+    created, last_pk = 0, 0
+    while True:
+        ids = list(enrollments.filter(pk__gt=last_pk)[:chunk_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+
+        with transaction.atomic():
+            linked = set(
+                ModuleProgress.objects
+                .filter(module_id=module_id, enrollment_id__in=ids)
+                .values_list("enrollment_id", flat=True)
+            )
+            new_modules = [e for e in ids if e not in linked]
+            if new_modules:
+                ModuleProgress.objects.bulk_create(
+                    [ModuleProgress(enrollment_id=e, module_id=module_id, percent=0) for e in new_modules],
+                    ignore_conflicts=True,
+                )
+                progress.reconcile(
+                    ModuleProgress.objects.filter(module_id=module_id, enrollment_id__in=new_modules)
+                )
+
+            existing = set(
+                LessonProgress.objects
+                .filter(lesson_id=lesson_id, enrollment_id__in=ids)
+                .values_list("enrollment_id", flat=True)
+            )
+            rows = [LessonProgress(enrollment_id=e, lesson_id=lesson_id) for e in ids if e not in existing]
+            LessonProgress.objects.bulk_create(rows, ignore_conflicts=True)
+            created += len(rows)
+
+    print(f"[FANOUT] Leçon #{lesson_id} → {created} progression(s) créée(s).")
+    return created
+
+
+def schedule(lesson_id: int) -> None:
+    """Met la diffusion en file (créée après COMMIT, exécutée par `manage.py run_jobs`)."""
+    enqueue("masters.lesson_fanout", {"lesson_id": lesson_id})
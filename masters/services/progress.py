@@ -0,0 +1,127 @@
+# masters/services/progress.py
+"""
+Progression des modules (ModuleProgress) maintenue incrémentalement.
+
+Chaque ligne (inscription, module) porte deux compteurs :
+  - lessons_completed : leçons publiées du module terminées par l'étudiant
+  - lessons_total     : leçons publiées du module
+et `percent` en est dérivé dans la même requête UPDATE.
+
+Événements (voir masters/signals.py) :
+  - LessonProgress terminée / dé-terminée / supprimée → ±1 sur une ligne
+  - Lesson publiée / dépubliée / supprimée / déplacée → ajustement en masse
+    de toutes les lignes du module
+Filet de sécurité : `manage.py reconcile_module_progress` (reconcile()).
+"""
+from decimal import Decimal
+
+from django.db.models import (
+    Case, Count, DecimalField, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from ..models import Lesson, LessonProgress, ModuleProgress
+
+PERCENT_FIELD = DecimalField(max_digits=5, decimal_places=2)
+
+
+def percent_expression(completed, total):
+    """percent = 100 × completed / total, borné à 100 ; 0 si aucune leçon publiée."""
+    ratio = Cast(Least(completed, total), FloatField()) * Value(100.0) / Cast(total, FloatField())
+    return Case(
+        When(GreaterThan(total, 0), then=Cast(ratio, PERCENT_FIELD)),
+        default=Value(Decimal("0")),
+        output_field=PERCENT_FIELD,
+    )
+
+
+def adjust(filters: Q, completed: int = 0, total: int = 0) -> int:
+    """Ajuste les compteurs (et le pourcentage) des lignes ciblées en une requête."""
+    if not (completed or total):
+        return 0
+    completed_expr = Greatest(F("lessons_completed") + completed, Value(0))
+    total_expr = Greatest(F("lessons_total") + total, Value(0))
+    return ModuleProgress.objects.filter(filters).update(
+        lessons_completed=completed_expr,
+        lessons_total=total_expr,
+        percent=percent_expression(completed_expr, total_expr),
+        updated_at=timezone.now(),
+    )
+
+
+# ==========================================================
+# 🎯 ÉVÉNEMENTS LEÇON ↔ ÉTUDIANT
+# ==========================================================
+def _published_module(lesson_id: int):
+    row = Lesson.objects.filter(pk=lesson_id).values("is_published", "chapter__module_id").first()
+    if not row or not row["is_published"]:
+        return None
+    return row["chapter__module_id"]
+
+
+def lesson_completion_changed(enrollment_id: int, lesson_id: int, delta: int) -> None:
+    """Une leçon vient d'être terminée (+1) ou ne l'est plus (-1) pour une inscription."""
+    module_id = _published_module(lesson_id)
+    if module_id is None:
+        return
+    target = Q(enrollment_id=enrollment_id, module_id=module_id)
+    if not adjust(target, completed=delta) and delta > 0:
+        # Ligne absente (inscription non liée) : on la crée puis on la recalcule
+        ModuleProgress.objects.get_or_create(enrollment_id=enrollment_id, module_id=module_id)
+        reconcile(ModuleProgress.objects.filter(target))
+
+
+# ==========================================================
+# 📚 ÉVÉNEMENTS PUBLICATION (en masse)
+# ==========================================================
+def lesson_publication_changed(lesson_id: int, module_id: int, published: bool) -> None:
+    """
+    Une leçon entre (+1) ou sort (-1) des leçons publiées du module :
+    dénominateur de toutes les lignes du module, numérateur de ceux qui l'avaient terminée.
+    """
+    delta = 1 if published else -1
+    completed_by = LessonProgress.objects.filter(
+        lesson_id=lesson_id, completed_at__isnull=False
+    ).values("enrollment_id")
+    adjust(Q(module_id=module_id) & ~Q(enrollment_id__in=completed_by), total=delta)
+    adjust(Q(module_id=module_id, enrollment_id__in=completed_by), completed=delta, total=delta)
+
+
+# ==========================================================
+# 🔁 RECONSTRUCTION (commande de secours)
+# ==========================================================
+def reconcile(queryset=None) -> int:
+    """
+    Recalcule compteurs et pourcentage depuis les tables, en une requête UPDATE
+    (sous-requêtes agrégées corrélées).
+    """
+    queryset = queryset if queryset is not None else ModuleProgress.objects.all()
+    total_sq = Subquery(
+        Lesson.objects
+        .filter(chapter__module_id=OuterRef("module_id"), is_published=True)
+        .order_by().values("chapter__module_id")
+        .annotate(n=Count("id")).values("n")[:1],
+        output_field=IntegerField(),
+    )
+    completed_sq = Subquery(
+        LessonProgress.objects
+        .filter(
+            enrollment_id=OuterRef("enrollment_id"),
+            lesson__chapter__module_id=OuterRef("module_id"),
+            lesson__is_published=True,
+            completed_at__isnull=False,
+        )
+        .order_by().values("enrollment_id")
+        .annotate(n=Count("id")).values("n")[:1],
+        output_field=IntegerField(),
+    )
+    total = Coalesce(total_sq, Value(0))
+    completed = Coalesce(completed_sq, Value(0))
+    return queryset.update(
+        lessons_total=total,
+        lessons_completed=completed,
+        percent=percent_expression(completed, total),
+        updated_at=timezone.now(),
+    )
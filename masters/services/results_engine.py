@@ -0,0 +1,286 @@
+# masters/services/results_engine.py
+"""
+Moteur de calcul des résultats semestriels (SemesterResult).
+
+Pour un semestre, toute la cohorte est calculée d'un bloc (requêtes groupées,
+calcul en Python pur) ; les mêmes règles servent à la matrice des notes
+étudiant (grade_matrix) :
+
+  - Contrôle continu : moyenne par module pondérée par Assignment.coefficient
+    (Submission GRADED avec note_20).
+  - Examens : une note par examen = meilleure tentative si
+    MasterProgram.rattrapage_take_max, sinon dernière tentative (attempt_no).
+    Bloc examen pondéré par Exam.coefficient.
+  - Rattrapage (Exam.eval_kind = "RA") : remplace le bloc examen, ou en prend
+    le maximum si rattrapage_take_max.
+  - Moyenne semestre : modules (ModuleUE.coefficient) + bloc examen
+    (somme des coefficients des examens), sur les seules composantes notées.
+  - Crédits : crédits des modules ≥ 10, ou tous les crédits si semestre ≥ 10
+    (compensation).
+  - Décision : ADM ≥ 10, RAT ≥ 8, AJ sinon.
+
+Les semestres verrouillés (Semester.is_locked) et les résultats verrouillés
+(SemesterResult.is_locked) ne sont jamais modifiés.
+
+Les changements de notes inscrivent seulement les couples (inscription, semestre)
+concernés dans la file ResultRecompute (voir masters/signals.py) ;
+`recompute_dirty()` ne recalcule que ceux-là. Reconstruction complète :
+`manage.py recompute_results --all`.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    Semester, ModuleUE, Assignment, Submission, Exam, ExamGrade,
+    MasterEnrollment, SemesterResult, ResultRecompute,
+)
+from . import kpi_snapshot, results_kpis
+
+PASS_MARK = 10.0
+RATTRAPAGE_MARK = 8.0
+RATTRAPAGE_KIND = "RA"
+
+TWO_PLACES = Decimal("0.01")
+
+
+# ==========================================================
+# 🔧 RÈGLES DE CALCUL (partagées avec grade_matrix)
+# ==========================================================
+def take_max(semester: Semester) -> bool:
+    meta = getattr(semester.program, "master_meta", None)
+    return True if meta is None else bool(meta.rattrapage_take_max)
+
+
+def weighted_mean(pairs: Iterable[Tuple[Optional[float], float]]) -> Optional[float]:
+    """Moyenne de (note, poids) en ignorant les notes absentes ; None si aucune."""
+    num = den = 0.0
+    for note, weight in pairs:
+        if note is None:
+            continue
+        num += note * weight
+        den += weight
+    return num / den if den > 0 else None
+
+
+def exam_note(attempts: Iterable[Tuple[int, float]], best: bool) -> Optional[float]:
+    """Note retenue pour un examen : meilleure tentative, ou dernière (attempt_no)."""
+    attempts = list(attempts)
+    if not attempts:
+        return None
+    if best:
+        return max(note for _, note in attempts)
+    return max(attempts, key=lambda a: a[0])[1]
+
+
+def exam_block(notes: Dict[int, float], exams: List[tuple], best: bool) -> Optional[float]:
+    """
+    Bloc examen d'un étudiant. notes : {exam_id: note}, exams : [(id, eval_kind, coefficient)].
+    Le rattrapage remplace le bloc (ou en prend le maximum si `best`).
+    """
+    regular = weighted_mean((notes.get(e), c) for e, kind, c in exams if kind != RATTRAPAGE_KIND)
+    rattrapage = weighted_mean((notes.get(e), c) for e, kind, c in exams if kind == RATTRAPAGE_KIND)
+    if rattrapage is None:
+        return regular
+    if best and regular is not None:
+        return max(regular, rattrapage)
+    return rattrapage
+
+
+def exam_weight(exams: List[tuple]) -> float:
+    return sum(c for _, kind, c in exams if kind != RATTRAPAGE_KIND) or sum(c for _, _, c in exams)
+
+
+def _to_decimal(value: Optional[float]) -> Optional[Decimal]:
+    if value is None:
+        return None
+    return Decimal(str(float(value))).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def _decision(average: Optional[float]) -> Optional[str]:
+    if average is None:
+        return None
+    if average >= PASS_MARK:
+        return "ADM"
+    if average >= RATTRAPAGE_MARK:
+        return "RAT"
+    return "AJ"
+
+
+# ==========================================================
+# 🧮 CALCUL D'UN SEMESTRE
+# ==========================================================
+def compute_semester(semester: Semester, enrollment_ids: Optional[Iterable[int]] = None) -> Dict[int, dict]:
+    """
+    Calcule (sans écrire) les résultats du semestre.
+    Retourne {enrollment_id: {average_20, credits_earned, decision}}.
+    """
+    enrollments = MasterEnrollment.objects.filter(program_id=semester.program_id, cohort_id=semester.cohort_id)
+    if enrollment_ids is not None:
+        enrollments = enrollments.filter(pk__in=list(enrollment_ids))
+    rows = list(enrollments.values_list("id", "student_id"))
+    if not rows:
+        return {}
+    student_ids = [s for _, s in rows]
+
+    # --- Modules & contrôle continu ------------------------------------
+    modules = [
+        (m, float(coef), float(credits))
+        for m, coef, credits in ModuleUE.objects.filter(semester=semester, is_active=True)
+        .values_list("id", "coefficient", "credits")
+    ]
+    assignment_module = {}
+    assignment_coef = {}
+    for a, m, coef in Assignment.objects.filter(module_id__in=[m for m, _, _ in modules]).values_list(
+        "id", "module_id", "coefficient"
+    ):
+        assignment_module[a], assignment_coef[a] = m, float(coef)
+
+    cc = defaultdict(lambda: defaultdict(list))  # student → module → [(note, poids)]
+    for assignment_id, student_id, note in Submission.objects.filter(
+        assignment_id__in=assignment_module, student_id__in=student_ids,
+        status="GRADED", note_20__isnull=False,
+    ).values_list("assignment_id", "student_id", "note_20"):
+        cc[student_id][assignment_module[assignment_id]].append((float(note), assignment_coef[assignment_id]))
+
+    # --- Examens -------------------------------------------------------
+    best = take_max(semester)
+    exams = [(e, kind, float(coef)) for e, kind, coef in Exam.objects.filter(semester=semester).values_list(
+        "id", "eval_kind", "coefficient"
+    )]
+    attempts = defaultdict(lambda: defaultdict(list))  # student → exam → [(attempt_no, note)]
+    for exam_id, student_id, attempt_no, note in ExamGrade.objects.filter(
+        exam_id__in=[e for e, _, _ in exams], student_id__in=student_ids,
+    ).values_list("exam_id", "student_id", "attempt_no", "note_20"):
+        attempts[student_id][exam_id].append((attempt_no, float(note)))
+    block_weight = exam_weight(exams)
+    total_credits = sum(credits for _, _, credits in modules)
+
+    results = {}
+    for enrollment_id, student_id in rows:
+        module_avg = {m: weighted_mean(cc[student_id].get(m, [])) for m, _, _ in modules}
+        components = [(module_avg[m], coef) for m, coef, _ in modules]
+        if exams:
+            notes = {e: exam_note(a, best) for e, a in attempts[student_id].items()}
+            components.append((exam_block(notes, exams, best), block_weight))
+        average = weighted_mean(components)
+
+        if average is not None and average >= PASS_MARK:
+            credits = total_credits  # compensation
+        else:
+            credits = sum(c for m, _, c in modules if module_avg[m] is not None and module_avg[m] >= PASS_MARK)
+        results[enrollment_id] = {
+            "average_20": _to_decimal(average),
+            "credits_earned": _to_decimal(credits) or Decimal("0.00"),
+            "decision": _decision(average),
+        }
+    return results
+
+
+# ==========================================================
+# 💾 ÉCRITURE
+# ==========================================================
+@transaction.atomic
+def recompute_semester(semester: Semester, enrollment_ids: Optional[Iterable[int]] = None) -> int:
+    """Calcule puis écrit (bulk) les résultats d'un semestre. Retourne le nombre de lignes écrites."""
+    semester = Semester.objects.select_related("program__master_meta").get(pk=semester.pk)
+    scope = SemesterResult.objects.filter(semester=semester)
+    if enrollment_ids is not None:
+        enrollment_ids = list(enrollment_ids)
+        scope = scope.filter(enrollment_id__in=enrollment_ids)
+
+    if semester.is_locked:
+        return 0
+
+    computed = compute_semester(semester, enrollment_ids)
+    existing = {r.enrollment_id: r for r in scope.select_for_update()}
+    now = timezone.now()
+
+    to_update: List[SemesterResult] = []
+    to_create: List[SemesterResult] = []
+    for enrollment_id, values in computed.items():
+        result = existing.get(enrollment_id)
+        if result is None:
+            if values["average_20"] is None:
+                continue  # rien de noté : pas de ligne vide
+            to_create.append(SemesterResult(
+                enrollment_id=enrollment_id, semester=semester, computed_at=now, **values
+            ))
+            continue
+        if result.is_locked:
+            continue
+        for name, value in values.items():
+            setattr(result, name, value)
+        result.computed_at = now
+        to_update.append(result)
+
+    if to_update:
+        SemesterResult.objects.bulk_update(
+            to_update, ["average_20", "credits_earned", "decision", "computed_at"], batch_size=500
+        )
+    if to_create:
+        SemesterResult.objects.bulk_create(to_create, batch_size=500)
+
+    written = len(to_update) + len(to_create)
+    if written:
+        # bulk_* n'envoie pas de signaux : on resynchronise les KPI résultats
+        transaction.on_commit(kpi_snapshot.refresh_results_counters)
+        transaction.on_commit(results_kpis.invalidate)
+    return written
+
+
+def recompute_dirty(semester_ids: Optional[Iterable[int]] = None) -> int:
+    """Recalcule uniquement les couples (inscription, semestre) de la file ResultRecompute."""
+    started = timezone.now()
+    queue = ResultRecompute.objects.all()
+    if semester_ids is not None:
+        queue = queue.filter(semester_id__in=list(semester_ids))
+    entries = list(queue.values_list("pk", "semester_id", "enrollment_id"))
+    by_semester: Dict[int, List[int]] = defaultdict(list)
+    for _, semester_id, enrollment_id in entries:
+        by_semester[semester_id].append(enrollment_id)
+
+    written = 0
+    for semester in Semester.objects.filter(pk__in=by_semester):
+        written += recompute_semester(semester, by_semester[semester.pk])
+    # Marques posées pendant le calcul (marked_at plus récent) : conservées pour le prochain passage
+    ResultRecompute.objects.filter(pk__in=[pk for pk, _, _ in entries], marked_at__lte=started).delete()
+    return written
+
+
+# ==========================================================
+# 🏷️ MARQUAGE INCRÉMENTAL (appelé par les signaux)
+# ==========================================================
+def _enqueue(enrollment_ids, semester_id: int) -> None:
+    ResultRecompute.objects.bulk_create(
+        [ResultRecompute(enrollment_id=e, semester_id=semester_id, marked_at=timezone.now()) for e in enrollment_ids],
+        update_conflicts=True, unique_fields=["enrollment", "semester"], update_fields=["marked_at"],
+    )
+
+
+def mark_dirty(student_id: int, semester_id: int) -> None:
+    """Inscrit le couple (étudiant, semestre) dans la file de recalcul (aucune ligne SemesterResult créée)."""
+    semester = Semester.objects.filter(pk=semester_id).values("program_id", "cohort_id", "is_locked").first()
+    if not semester or semester["is_locked"]:
+        return
+    enrollment_ids = list(MasterEnrollment.objects.filter(
+        student_id=student_id, program_id=semester["program_id"], cohort_id=semester["cohort_id"]
+    ).values_list("id", flat=True))
+    if enrollment_ids:
+        _enqueue(enrollment_ids, semester_id)
+
+
+def mark_semester_dirty(semester_id: int) -> None:
+    """Coefficients / crédits modifiés : toute la cohorte du semestre est à recalculer."""
+    semester = Semester.objects.filter(pk=semester_id).values("program_id", "cohort_id", "is_locked").first()
+    if not semester or semester["is_locked"]:
+        return
+    _enqueue(
+        MasterEnrollment.objects.filter(
+            program_id=semester["program_id"], cohort_id=semester["cohort_id"]
+        ).values_list("id", flat=True),
+        semester_id,
+    )
@@ -0,0 +1,82 @@
+# masters/services/results_kpis.py
+"""
+KPI des résultats semestriels pour un jeu de filtres (programme, cohorte, décision…).
+
+Un seul `aggregate()` avec des `Count(filter=Q(...))` / `Avg` remplace les
+COUNT / COUNT(ADM) / AVG successifs sur le même QuerySet filtré.
+Le résultat est mis en cache par combinaison de filtres ; la clé contient une
+"génération" incrémentée à chaque écriture de SemesterResult (voir masters/signals.py),
+ce qui invalide toutes les combinaisons d'un coup.
+
+Les blocs KPI non filtrés (dashboards Staff / Directeur) lisent déjà
+MasterKpiSnapshot (voir kpi_snapshot.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from ..models import SemesterResult, DECISION
+
+CACHE_TIMEOUT = getattr(settings, "MASTERS_RESULTS_KPIS_TIMEOUT", 5 * 60)
+GENERATION_KEY = "masters:results_kpis:generation"
+
+FILTER_FIELDS = {
+    "program_id": "enrollment__program_id",
+    "cohort_id": "enrollment__cohort_id",
+    "semester_id": "semester_id",
+    "decision": "decision",
+}
+
+
+def _generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(GENERATION_KEY, generation, None)
+    return generation
+
+
+def invalidate() -> None:
+    """Appelé à chaque écriture de SemesterResult."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+
+
+def aggregate_results(qs) -> dict:
+    """Tous les KPI d'un QuerySet de SemesterResult en une requête."""
+    agg = qs.aggregate(
+        total=Count("id"),
+        graded=Count("id", filter=Q(average_20__isnull=False)),
+        avg_global=Avg("average_20"),
+        **{f"n_{code}": Count("id", filter=Q(decision=code)) for code, _ in DECISION},
+    )
+    total = agg["total"] or 0
+    admitted = agg["n_ADM"] or 0
+    return {
+        "total": total,
+        "graded": agg["graded"] or 0,
+        "admitted": admitted,
+        "by_decision": {code: agg[f"n_{code}"] or 0 for code, _ in DECISION},
+        "success_rate": round((admitted / total) * 100.0, 2) if total else 0.0,
+        "avg_global": round(float(agg["avg_global"] or 0.0), 2),
+    }
+
+
+def results_kpis(**filters) -> dict:
+    """
+    KPI des résultats pour une combinaison de filtres
+    (program_id, cohort_id, semester_id, decision), mis en cache.
+    """
+    active = {name: filters.get(name) for name in FILTER_FIELDS if filters.get(name)}
+    key = "masters:results_kpis:{}:{}".format(
+        _generation(),
+        "&".join(f"{name}={value}" for name, value in sorted(active.items())) or "all",
+    )
+    kpis = cache.get(key)
+    if kpis is None:
+        qs = SemesterResult.objects.filter(**{FILTER_FIELDS[name]: value for name, value in active.items()})
+        kpis = aggregate_results(qs)
+        cache.set(key, kpis, CACHE_TIMEOUT)
+    return kpis
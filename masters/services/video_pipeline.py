@@ -0,0 +1,284 @@
+# masters/services/video_pipeline.py
+"""
+Transcodage HLS des vidéos de leçons (ffmpeg / ffprobe locaux).
+
+Après l'envoi d'une vidéo (signal post_save de Lesson), `schedule()` met la
+tâche "masters.transcode_lesson_video" en file : elle s'exécute dans le
+worker `manage.py run_jobs`, jamais dans un worker web. Elle produit, sous
+MEDIA_ROOT/masters/hls/<leçon>/<version>/ :
+  - une rendition HLS par qualité (240p / 360p / 720p, sans dépasser la source),
+  - master.m3u8 (liste maîtresse) et poster.jpg,
+puis renseigne Lesson.hls_playlist / poster et, s'il est vide, duration_seconds.
+
+Échec (ffmpeg absent, source illisible…) : la leçon passe FAILED avec son
+erreur, puis TranscodeError remonte à la file, qui relance la tâche jusqu'à
+max_attempts. Leçon supprimée : `clear()` (signal post_delete) retire
+MEDIA_ROOT/masters/hls/<leçon>/.
+
+Chaque exécution écrit dans un dossier temporaire (.tmp-…) renommé en
+<version>/ une fois complet : une relance ou une exécution concurrente ne
+sert jamais un dossier à moitié écrit. La tâche est réservée pour
+`max_duration()` (voir masters.jobs), au-delà du délai de ffmpeg.
+
+Les processus ffmpeg passent par un pool borné (VIDEO_TRANSCODE_PROCESSES).
+Réglages :
+  - FFMPEG_BIN / FFPROBE_BIN ("ffmpeg" / "ffprobe")
+  - VIDEO_TRANSCODE_PROCESSES (2) : ffmpeg simultanés par worker
+  - VIDEO_TRANSCODE_THREADS (2)   : threads par processus ffmpeg
+  - VIDEO_TRANSCODE_TIMEOUT (3600): durée maximale d'un ffmpeg (s)
+"""
+import hashlib
+import json
+import math
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+from core.jobs import enqueue
+
+from ..models import Lesson
+
+HLS_ROOT = "masters/hls"
+SEGMENT_SECONDS = 6
+RENDITIONS = (
+    {"name": "240p", "height": 240, "video_kbps": 400, "audio_kbps": 64},
+    {"name": "360p", "height": 360, "video_kbps": 800, "audio_kbps": 96},
+    {"name": "720p", "height": 720, "video_kbps": 2500, "audio_kbps": 128},
+)
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+_executor = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Pool borné : chaque tâche du pool attend un processus ffmpeg."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_setting("VIDEO_TRANSCODE_PROCESSES", 2))
+    return _executor
+
+
+def max_duration() -> int:
+    """Durée maximale (s) d'un transcodage : ffprobe, puis les ffmpeg par lots de la taille du pool."""
+    rounds = math.ceil((len(RENDITIONS) + 1) / max(_setting("VIDEO_TRANSCODE_PROCESSES", 2), 1))
+    return 120 + rounds * _setting("VIDEO_TRANSCODE_TIMEOUT", 3600)
+
+
+def _run(cmd: list) -> None:
+    try:
+        subprocess.run(
+            cmd, check=True, capture_output=True, text=True,
+            timeout=_setting("VIDEO_TRANSCODE_TIMEOUT", 3600),
+        )
+    except subprocess.CalledProcessError as e:
+        raise TranscodeError((e.stderr or str(e)).strip()[-1000:]) from e
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise TranscodeError(str(e)) from e
+
+
+# ==========================================================
+# 🔎 ANALYSE
+# ==========================================================
+def probe(path) -> dict:
+    """{duration, width, height, has_audio} (largeur/hauteur après rotation)."""
+    try:
+        out = subprocess.run(
+            [_setting("FFPROBE_BIN", "ffprobe"), "-v", "error", "-print_format", "json",
+             "-show_format", "-show_streams", str(path)],
+            check=True, capture_output=True, text=True, timeout=120,
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        raise TranscodeError(f"ffprobe : {e}") from e
+    data = json.loads(out or "{}")
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise TranscodeError("Aucun flux vidéo")
+
+    width, height = int(video.get("width") or 0), int(video.get("height") or 0)
+    rotation = video.get("tags", {}).get("rotate") or next(
+        (sd.get("rotation") for sd in video.get("side_data_list", []) if "rotation" in sd), 0
+    )
+    if abs(int(float(rotation or 0))) % 180 == 90:
+        width, height = height, width  # vidéo de téléphone tenue verticalement
+
+    duration = data.get("format", {}).get("duration") or video.get("duration") or 0
+    return {
+        "duration": float(duration),
+        "width": width,
+        "height": height,
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+# ==========================================================
+# 🎞️ TRANSCODAGE
+# ==========================================================
+def select_renditions(height: int) -> list:
+    """Qualités ≤ hauteur source (au moins la plus basse)."""
+    return [r for r in RENDITIONS if r["height"] <= height] or [RENDITIONS[0]]
+
+
+def _rendition_cmd(src, out_dir: Path, rendition: dict, has_audio: bool) -> list:
+    target = out_dir / rendition["name"]
+    target.mkdir(parents=True, exist_ok=True)
+    kbps = rendition["video_kbps"]
+    cmd = [
+        _setting("FFMPEG_BIN", "ffmpeg"), "-hide_banner", "-loglevel", "error", "-y", "-i", str(src),
+        "-map", "0:v:0",
+        "-vf", f"scale=-2:{rendition['height']}",
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+        "-b:v", f"{kbps}k", "-maxrate", f"{int(kbps * 1.07)}k", "-bufsize", f"{kbps * 2}k",
+        # Images clés alignées sur les segments : bascule de qualité sans saut
+        "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})", "-sc_threshold", "0",
+        "-threads", str(_setting("VIDEO_TRANSCODE_THREADS", 2)),
+    ]
+    if has_audio:
+        cmd += ["-map", "0:a:0", "-c:a", "aac", "-b:a", f"{rendition['audio_kbps']}k", "-ac", "2"]
+    cmd += [
+        "-f", "hls", "-hls_time", str(SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", str(target / "seg_%04d.ts"),
+        str(target / "index.m3u8"),
+    ]
+    return cmd
+
+
+def _poster_cmd(src, out_dir: Path, at_seconds: float) -> list:
+    return [
+        _setting("FFMPEG_BIN", "ffmpeg"), "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{at_seconds:.2f}", "-i", str(src),
+        "-frames:v", "1", "-vf", "scale=-2:720", "-q:v", "3",
+        str(out_dir / "poster.jpg"),
+    ]
+
+
+def _master_playlist(renditions: list, info: dict) -> str:
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for r in renditions:
+        height = r["height"]
+        width = int(round(info["width"] * height / info["height"] / 2)) * 2 if info["height"] else 0
+        bandwidth = (r["video_kbps"] + (r["audio_kbps"] if info["has_audio"] else 0)) * 1100
+        resolution = f",RESOLUTION={width}x{height}" if width else ""
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth}{resolution}")
+        lines.append(f"{r['name']}/index.m3u8")
+    return "\n".join(lines) + "\n"
+
+
+def _move_into_place(tmp_dir: Path, out_dir: Path) -> None:
+    """Remplace out_dir par tmp_dir, complet, par renommage."""
+    previous = None
+    if out_dir.exists():
+        previous = out_dir.with_name(f".old-{out_dir.name}-{tmp_dir.name}")
+        out_dir.rename(previous)
+    try:
+        tmp_dir.rename(out_dir)
+    except OSError:
+        if not out_dir.exists():
+            raise
+        # Une exécution concurrente a publié la même version entre-temps : on garde la sienne
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def _version(video_name: str) -> str:
+    return hashlib.sha1(video_name.encode()).hexdigest()[:12]
+
+
+def _fail(lesson_id: int, message: str) -> TranscodeError:
+    """Marque la leçon FAILED et retourne l'erreur à lever (la file relance la tâche)."""
+    Lesson.objects.filter(pk=lesson_id).update(hls_status=Lesson.HLS_FAILED, hls_error=message[:2000])
+    print(f"[HLS] ⚠️ Leçon #{lesson_id} : {message[:200]}")
+    return TranscodeError(message)
+
+
+def transcode_lesson(lesson_id: int) -> bool:
+    """
+    Produit les renditions HLS de la vidéo courante de la leçon.
+    Retourne True si prête, False si plus rien à faire (leçon ou vidéo retirée,
+    vidéo remplacée entre-temps) ; lève TranscodeError en cas d'échec.
+    """
+    lesson = Lesson.objects.filter(pk=lesson_id).only("id", "video_file", "duration_seconds").first()
+    if not lesson or not lesson.video_file:
+        return False
+    if not shutil.which(_setting("FFMPEG_BIN", "ffmpeg")):
+        raise _fail(lesson_id, "ffmpeg introuvable sur le serveur")
+
+    video_name = lesson.video_file.name
+    version = _version(video_name)
+    rel_dir = f"{HLS_ROOT}/{lesson_id}/{version}"
+    out_dir = Path(settings.MEDIA_ROOT) / rel_dir
+    Lesson.objects.filter(pk=lesson_id).update(hls_status=Lesson.HLS_PROCESSING, hls_error="")
+
+    tmp_dir = None
+    try:
+        src = lesson.video_file.path
+        info = probe(src)
+        out_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=out_dir.parent))
+
+        renditions = select_renditions(info["height"])
+        commands = [_rendition_cmd(src, tmp_dir, r, info["has_audio"]) for r in renditions]
+        commands.append(_poster_cmd(src, tmp_dir, min(info["duration"] * 0.1, 10)))
+        for future in [_pool().submit(_run, cmd) for cmd in commands]:
+            future.result()
+        (tmp_dir / "master.m3u8").write_text(_master_playlist(renditions, info))
+        _move_into_place(tmp_dir, out_dir)
+    except (TranscodeError, OSError, ValueError) as e:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise _fail(lesson_id, str(e)) from e
+
+    fields = {
+        "hls_status": Lesson.HLS_READY,
+        "hls_playlist": f"{rel_dir}/master.m3u8",
+        "poster": f"{rel_dir}/poster.jpg",
+        "hls_error": "",
+    }
+    if not lesson.duration_seconds and info["duration"]:
+        fields["duration_seconds"] = int(round(info["duration"]))
+
+    # La vidéo a pu être remplacée pendant le transcodage : on ne publie que la bonne version
+    if not Lesson.objects.filter(pk=lesson_id, video_file=video_name).update(**fields):
+        shutil.rmtree(out_dir, ignore_errors=True)
+        return False
+
+    # Versions précédentes (pas les dossiers temporaires d'une exécution en cours)
+    for old in out_dir.parent.iterdir():
+        if old.name != version and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+    print(f"[HLS] Leçon #{lesson_id} → {', '.join(r['name'] for r in renditions)}")
+    return True
+
+
+# ==========================================================
+# 📥 PLANIFICATION
+# ==========================================================
+def clear(lesson_id: int) -> None:
+    """Vidéo retirée : plus de diffusion HLS."""
+    Lesson.objects.filter(pk=lesson_id).update(
+        hls_status=Lesson.HLS_NONE, hls_playlist="", poster="", hls_error=""
+    )
+    shutil.rmtree(Path(settings.MEDIA_ROOT) / HLS_ROOT / str(lesson_id), ignore_errors=True)
+
+
+def schedule(lesson: Lesson, force: bool = False) -> None:
+    """Met le transcodage en file (après COMMIT). Une tâche par version de vidéo, sauf `force`."""
+    if not lesson.video_file:
+        clear(lesson.pk)
+        return
+    Lesson.objects.filter(pk=lesson.pk).update(hls_status=Lesson.HLS_PENDING, hls_error="")
+    key = None if force else f"lesson:{lesson.pk}:hls:{_version(lesson.video_file.name)}"
+    enqueue("masters.transcode_lesson_video", {"lesson_id": lesson.pk}, key=key, max_attempts=2)
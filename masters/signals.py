@@ -1,17 +1,22 @@
 from datetime import timedelta
-from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
 from django.contrib.auth.models import Group
-from django.core.mail import send_mail
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.db.models import Exists, F, OuterRef, Q
+from django.db import transaction
 from django.dispatch import receiver
 from django.utils.crypto import get_random_string
 from django.utils import timezone
 
 from masters.models import (
-    MasterEnrollment, Cohort, ModuleUE, ModuleProgress,
-    Lesson, LessonProgress
+    MasterEnrollment, Cohort, Semester, ModuleUE, ModuleProgress,
+    Lesson, LessonProgress, InstructorAssignment, Exam, SemesterResult,
+    UserProfile, Assignment, Submission, ExamGrade, Chapter,
 )
+from core.jobs import enqueue
+from core.mail import queue_mail
+from masters.services import kpi_snapshot, results_kpis, results_engine, progress, lesson_fanout, video_pipeline
 from admissions.models import Admission
 from programs.models import Program
 
@@ -57,81 +62,120 @@ def auto_assign_role_and_group(sender, instance: User, created, **kwargs):
 
     print(f"[AUTO-ROLE] {instance.username} → {instance.role} ({[g.name for g in instance.groups.all()]})")
 
-    # 🔸 Envoi de mail de bienvenue (optionnel)
+    # 🔸 Mail de bienvenue (boîte d'envoi, voir core.mail)
     if instance.email:
-        try:
-            send_mail(
-                subject="Bienvenue sur la plateforme Master ESFé",
-                message=(
-                    f"Bonjour {instance.first_name or instance.username},\n\n"
-                    "Votre compte staff/enseignant a été créé sur la plateforme Master ESFé Mali.\n"
-                    f"Rôle attribué : {instance.get_role_display() or '—'}\n"
-                    f"Identifiant : {instance.username}\n\n"
-                    "Veuillez vous connecter pour accéder à votre tableau de bord.\n\n"
-                    "Cordialement,\nÉquipe ESFé Mali"
-                ),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[instance.email],
-                fail_silently=True,
-            )
-        except Exception as e:
-            print(f"[⚠️ MAIL NON ENVOYÉ] {e}")
+        queue_mail(
+            subject="Bienvenue sur la plateforme Master ESFé",
+            message=(
+                f"Bonjour {instance.first_name or instance.username},\n\n"
+                "Votre compte staff/enseignant a été créé sur la plateforme Master ESFé Mali.\n"
+                f"Rôle attribué : {instance.get_role_display() or '—'}\n"
+                f"Identifiant : {instance.username}\n\n"
+                "Veuillez vous connecter pour accéder à votre tableau de bord.\n\n"
+                "Cordialement,\nÉquipe ESFé Mali"
+            ),
+            recipient_list=[instance.email],
+            category="welcome",
+        )
 
 
 # ============================================================
 # 2️⃣ AUTO-LIAISON DES MODULES + LEÇONS À UN ÉTUDIANT
 # ============================================================
-def link_modules_and_lessons(enrollment: MasterEnrollment):
+LINK_BATCH_SIZE = 1000
+
+
+def _as_enrollment_ids(enrollments) -> list:
+    if isinstance(enrollments, MasterEnrollment):
+        return [enrollments.pk]
+    if isinstance(enrollments, int):
+        return [enrollments]
+    if hasattr(enrollments, "values_list"):
+        return list(enrollments.values_list("pk", flat=True))
+    return [e.pk if isinstance(e, MasterEnrollment) else e for e in enrollments]
+
+
+def _bulk_insert(model, rows, batch_size=LINK_BATCH_SIZE) -> int:
+    """Insère par lots (ignore_conflicts : les couples déjà présents sont ignorés)."""
+    created, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+    return created
+
+
+def link_modules_and_lessons(enrollments):
     """
-    Lie automatiquement les modules (UE) actifs du programme/cohorte
-    à l'étudiant, puis initialise les LessonProgress sur les leçons publiées.
-    Idempotent : utilise get_or_create → aucune duplication.
+    Lie les modules (UE) actifs du programme/cohorte aux inscriptions, puis
+    initialise les LessonProgress sur les leçons publiées.
+
+    Ensembliste : les couples manquants (inscription, module) et
+    (inscription, leçon) sont calculés par deux requêtes anti-jointure
+    (NOT EXISTS) puis insérés avec bulk_create(ignore_conflicts=True).
+    Accepte une inscription, un QuerySet ou une liste (instances ou ids) :
+    une cohorte entière se lie en quelques requêtes. Idempotent.
     """
-    student = enrollment.student
-    program = enrollment.program
-    cohort = enrollment.cohort
-
-    print(f"[LINK] Scan des modules pour {student.username} → {program.title} ({cohort.label})")
-
-    # 🔹 Récupération des modules de la cohorte correspondante
-    modules = (
-        ModuleUE.objects.filter(
-            semester__program=program,
-            semester__cohort=cohort,
-            is_active=True,
-        )
-        .select_related("semester")
-        .prefetch_related("chapters__lessons")
+    enrollment_ids = _as_enrollment_ids(enrollments)
+    if not enrollment_ids:
+        return 0, 0
+
+    enrollment_path = "semester__program__master_enrollments"
+    missing_modules = (
+        ModuleUE.objects
+        .filter(**{
+            "is_active": True,
+            f"{enrollment_path}__id__in": enrollment_ids,
+            "semester__cohort_id": F(f"{enrollment_path}__cohort_id"),
+        })
+        .annotate(enrollment_pk=F(f"{enrollment_path}__id"))
+        .filter(~Exists(ModuleProgress.objects.filter(
+            enrollment_id=OuterRef("enrollment_pk"), module_id=OuterRef("pk")
+        )))
+        .order_by()
+        .values_list("enrollment_pk", "pk")
     )
+    linked_enrollments = set()
 
-    if not modules.exists():
-        print(f"[INFO] Aucun module trouvé pour {program.title} ({cohort.label})")
-        return
+    def module_rows():
+        for enrollment_id, module_id in missing_modules.iterator():
+            linked_enrollments.add(enrollment_id)
+            yield ModuleProgress(enrollment_id=enrollment_id, module_id=module_id, percent=0)
 
-    created_modules = 0
-    created_lessons = 0
+    created_modules = _bulk_insert(ModuleProgress, module_rows())
 
-    for module in modules:
-        # ModuleProgress (init à 0%)
-        _, mp_created = ModuleProgress.objects.get_or_create(
-            enrollment=enrollment,
-            module=module,
-            defaults={"percent": 0.0},
-        )
-        if mp_created:
-            created_modules += 1
+    lesson_path = f"chapter__module__{enrollment_path}"
+    missing_lessons = (
+        Lesson.objects
+        .filter(**{
+            "is_published": True,
+            "chapter__module__is_active": True,
+            f"{lesson_path}__id__in": enrollment_ids,
+            "chapter__module__semester__cohort_id": F(f"{lesson_path}__cohort_id"),
+        })
+        .annotate(enrollment_pk=F(f"{lesson_path}__id"))
+        .filter(~Exists(LessonProgress.objects.filter(
+            enrollment_id=OuterRef("enrollment_pk"), lesson_id=OuterRef("pk")
+        )))
+        .order_by()
+        .values_list("enrollment_pk", "pk")
+    )
+    created_lessons = _bulk_insert(
+        LessonProgress,
+        (LessonProgress(enrollment_id=e, lesson_id=l) for e, l in missing_lessons.iterator()),
+    )
 
-        # LessonsProgress sur les leçons publiées
-        for chapter in module.chapters.all():
-            for lesson in chapter.lessons.filter(is_published=True):
-                _, lp_created = LessonProgress.objects.get_or_create(
-                    enrollment=enrollment,
-                    lesson=lesson,
-                )
-                if lp_created:
-                    created_lessons += 1
+    if linked_enrollments:
+        # compteurs de leçons des nouvelles lignes ModuleProgress
+        progress.reconcile(ModuleProgress.objects.filter(enrollment_id__in=linked_enrollments))
 
-    print(f"[AUTO-LINK] {student.username} → {created_modules} modules / {created_lessons} leçons liés.")
+    print(f"[AUTO-LINK] {len(enrollment_ids)} inscription(s) → {created_modules} modules / {created_lessons} leçons liés.")
+    return created_modules, created_lessons
 
 
 # ============================================================
@@ -162,15 +206,273 @@ def admission_to_master_sync(sender, instance: Admission, created, **kwargs):
     if instance.status != "PAIEMENT_OK":
         return
 
-    program = instance.program
-    if getattr(program, "cycle", "").upper() != "MASTER":
-        print(f"[SKIP] Admission {instance.id} ignorée — {program.title} n’est pas un programme MASTER.")
+    # Hors requête : voir masters.jobs.sync_admission
+    enqueue("masters.sync_admission", {"admission_id": instance.pk}, key=f"admission:{instance.pk}:master-sync")
+
+
+# ============================================================
+# 5️⃣ SNAPSHOT KPI : INCRÉMENTS SUR ÉCRITURE
+# ============================================================
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+def kpi_programs_changed(sender, instance, **kwargs):
+    kpi_snapshot.refresh_programs_count()
+
+
+_KPI_SIMPLE_FIELDS = {
+    Semester: "semesters_count",
+    ModuleUE: "modules_count",
+    Exam: "exams_count",
+}
+
+
+@receiver(post_save, sender=Semester)
+@receiver(post_save, sender=ModuleUE)
+@receiver(post_save, sender=Exam)
+def kpi_simple_created(sender, instance, created, **kwargs):
+    if created:
+        kpi_snapshot.bump(**{_KPI_SIMPLE_FIELDS[sender]: 1})
+
+
+@receiver(post_delete, sender=Semester)
+@receiver(post_delete, sender=ModuleUE)
+@receiver(post_delete, sender=Exam)
+def kpi_simple_deleted(sender, instance, **kwargs):
+    kpi_snapshot.bump(**{_KPI_SIMPLE_FIELDS[sender]: -1})
+
+
+@receiver(post_save, sender=MasterEnrollment)
+def kpi_enrollment_created(sender, instance: MasterEnrollment, created, **kwargs):
+    if not created:
+        return
+    first_for_student = not (
+        MasterEnrollment.objects.filter(student_id=instance.student_id).exclude(pk=instance.pk).exists()
+    )
+    kpi_snapshot.bump(enrollments_count=1, students_count=1 if first_for_student else 0)
+
+
+@receiver(post_delete, sender=MasterEnrollment)
+def kpi_enrollment_deleted(sender, instance: MasterEnrollment, **kwargs):
+    kpi_snapshot.bump(enrollments_count=-1)
+    kpi_snapshot.settle_distinct_on_commit("students_count", MasterEnrollment, "student_id")
+
+
+@receiver(post_save, sender=InstructorAssignment)
+def kpi_teaching_created(sender, instance: InstructorAssignment, created, **kwargs):
+    if not created:
+        return
+    if not InstructorAssignment.objects.filter(instructor_id=instance.instructor_id).exclude(pk=instance.pk).exists():
+        kpi_snapshot.bump(teachers_count=1)
+
+
+@receiver(post_delete, sender=InstructorAssignment)
+def kpi_teaching_deleted(sender, instance: InstructorAssignment, **kwargs):
+    kpi_snapshot.settle_distinct_on_commit("teachers_count", InstructorAssignment, "instructor_id")
+
+
+@receiver(pre_save, sender=SemesterResult)
+def kpi_result_before(sender, instance: SemesterResult, **kwargs):
+    """Mémorise l'état précédent pour calculer le delta en post_save."""
+    before = None
+    if instance.pk:
+        before = (
+            SemesterResult.objects.filter(pk=instance.pk)
+            .values("average_20", "decision")
+            .first()
+        )
+    instance._kpi_before = before
+
+
+@receiver(post_save, sender=SemesterResult)
+def kpi_result_saved(sender, instance: SemesterResult, **kwargs):
+    after = kpi_snapshot.result_contribution(instance.average_20, instance.decision)
+    before = getattr(instance, "_kpi_before", None)
+    if before:
+        previous = kpi_snapshot.result_contribution(before["average_20"], before["decision"])
+        after = {k: v - previous[k] for k, v in after.items()}
+    kpi_snapshot.bump(**after)
+    results_kpis.invalidate()
+
+
+@receiver(post_delete, sender=SemesterResult)
+def kpi_result_deleted(sender, instance: SemesterResult, **kwargs):
+    contribution = kpi_snapshot.result_contribution(instance.average_20, instance.decision)
+    kpi_snapshot.bump(**{k: -v for k, v in contribution.items()})
+    results_kpis.invalidate()
+
+
+# ============================================================
+# 6️⃣ CONNEXION : DRAPEAU "MOT DE PASSE À CHANGER" EN SESSION
+# ============================================================
+@receiver(user_logged_in)
+def cache_must_change_password(sender, request, user, **kwargs):
+    """Évite au middleware de relire UserProfile à chaque requête."""
+    if request is None or not hasattr(request, "session"):
+        return
+    from masters.middleware import MUST_CHANGE_PASSWORD_SESSION_KEY
+    flag = (
+        UserProfile.objects.filter(user=user)
+        .values_list("must_change_password", flat=True)
+        .first()
+    )
+    request.session[MUST_CHANGE_PASSWORD_SESSION_KEY] = bool(flag)
+
+
+# ============================================================
+# 7️⃣ RÉSULTATS : MARQUAGE INCRÉMENTAL (file ResultRecompute)
+# ============================================================
+_GRADE_FIELDS = {"note_20", "score_raw", "status"}
+
+
+def _touches_grades(update_fields) -> bool:
+    return update_fields is None or bool(_GRADE_FIELDS & set(update_fields))
+
+
+def _is_graded(note_20, status) -> bool:
+    return note_20 is not None or status == "GRADED"
+
+
+def _mark_dirty(student_id, semester_id, deleted: bool) -> None:
+    if deleted:
+        # Suppression en cascade (inscription / semestre en cours de suppression) : après COMMIT
+        transaction.on_commit(lambda: results_engine.mark_dirty(student_id, semester_id))
+    else:
+        results_engine.mark_dirty(student_id, semester_id)
+
+
+def _mark_semester_dirty(semester_id, deleted: bool) -> None:
+    if deleted:
+        transaction.on_commit(lambda: results_engine.mark_semester_dirty(semester_id))
+    else:
+        results_engine.mark_semester_dirty(semester_id)
+
+
+@receiver(pre_save, sender=Submission)
+def results_submission_before(sender, instance: Submission, **kwargs):
+    before = (
+        Submission.objects.filter(pk=instance.pk).values("note_20", "status").first()
+        if instance.pk else None
+    )
+    instance._was_graded = bool(before and _is_graded(before["note_20"], before["status"]))
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_delete, sender=Submission)
+def results_submission_changed(sender, instance: Submission, **kwargs):
+    deleted = "created" not in kwargs
+    if not deleted and not _touches_grades(kwargs.get("update_fields")):
+        return
+    # Notée avant OU après : une copie remise à "non notée" doit aussi sortir de la moyenne
+    if not _is_graded(instance.note_20, instance.status) and not getattr(instance, "_was_graded", False):
         return
+    semester_id = (
+        Assignment.objects.filter(pk=instance.assignment_id)
+        .values_list("module__semester_id", flat=True).first()
+    )
+    if semester_id:
+        _mark_dirty(instance.student_id, semester_id, deleted)
+
+
+@receiver(post_save, sender=ExamGrade)
+@receiver(post_delete, sender=ExamGrade)
+def results_exam_grade_changed(sender, instance: ExamGrade, **kwargs):
+    semester_id = Exam.objects.filter(pk=instance.exam_id).values_list("semester_id", flat=True).first()
+    if semester_id:
+        _mark_dirty(instance.student_id, semester_id, deleted="created" not in kwargs)
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def results_assignment_changed(sender, instance: Assignment, created=False, **kwargs):
+    if created:
+        return  # pas encore de notes
+    semester_id = ModuleUE.objects.filter(pk=instance.module_id).values_list("semester_id", flat=True).first()
+    if semester_id:
+        _mark_semester_dirty(semester_id, deleted="update_fields" not in kwargs)
+
 
-    enrollment = MasterEnrollment.objects.filter(admission=instance).first()
-    if not enrollment:
-        print(f"[WARN] Admission {instance.id} PAIEMENT_OK sans inscription Master correspondante.")
+@receiver(post_save, sender=Exam)
+@receiver(post_save, sender=ModuleUE)
+def results_coefficients_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        results_engine.mark_semester_dirty(instance.semester_id)
+
+
+@receiver(post_delete, sender=Exam)
+@receiver(post_delete, sender=ModuleUE)
+def results_component_deleted(sender, instance, **kwargs):
+    _mark_semester_dirty(instance.semester_id, deleted=True)
+
+
+# ============================================================
+# 8️⃣ PROGRESSION : COMPTEURS ModuleProgress
+# ============================================================
+@receiver(post_save, sender=LessonProgress)
+def progress_lesson_saved(sender, instance: LessonProgress, created, update_fields=None, **kwargs):
+    if update_fields is not None and "completed_at" not in update_fields:
         return
+    before = None if created else getattr(instance, "_loaded_completed_at", None)
+    instance._loaded_completed_at = instance.completed_at
+    if bool(before) == bool(instance.completed_at):
+        return
+    progress.lesson_completion_changed(
+        instance.enrollment_id, instance.lesson_id, 1 if instance.completed_at else -1
+    )
+
+
+@receiver(post_delete, sender=LessonProgress)
+def progress_lesson_deleted(sender, instance: LessonProgress, **kwargs):
+    if instance.completed_at:
+        progress.lesson_completion_changed(instance.enrollment_id, instance.lesson_id, -1)
+
+
+@receiver(pre_save, sender=Lesson)
+def progress_lesson_publication_before(sender, instance: Lesson, **kwargs):
+    instance._publication_before = (
+        Lesson.objects.filter(pk=instance.pk).values("is_published", "chapter__module_id", "video_file").first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def progress_lesson_publication_after(sender, instance: Lesson, **kwargs):
+    before = getattr(instance, "_publication_before", None)
+    was_published = bool(before and before["is_published"])
+    old_module_id = before["chapter__module_id"] if before else None
+    module_id = Chapter.objects.filter(pk=instance.chapter_id).values_list("module_id", flat=True).first()
+
+    if was_published and (not instance.is_published or old_module_id != module_id):
+        progress.lesson_publication_changed(instance.pk, old_module_id, published=False)
+    if instance.is_published and (not was_published or old_module_id != module_id):
+        progress.lesson_publication_changed(instance.pk, module_id, published=True)
+        # LessonProgress des inscriptions existantes : hors requête, après COMMIT
+        lesson_fanout.schedule(instance.pk)
+
+
+@receiver(pre_delete, sender=Lesson)
+def progress_lesson_removed(sender, instance: Lesson, **kwargs):
+    # Le numérateur est décrémenté par la suppression en cascade des LessonProgress
+    if instance.is_published:
+        module_id = Chapter.objects.filter(pk=instance.chapter_id).values_list("module_id", flat=True).first()
+        if module_id:
+            progress.adjust(Q(module_id=module_id), total=-1)
+
+
+# ============================================================
+# 9️⃣ VIDÉO : TRANSCODAGE HLS
+# ============================================================
+@receiver(post_save, sender=Lesson)
+def video_lesson_uploaded(sender, instance: Lesson, created, **kwargs):
+    before = getattr(instance, "_publication_before", None)
+    old_video = before["video_file"] if before else ""
+    if (instance.video_file.name or "") == (old_video or ""):
+        return
+    # ffmpeg tourne dans le worker `run_jobs`, jamais dans la requête
+    video_pipeline.schedule(instance)
+
 
-    # Lien des modules/leçons (idempotent)
-    link_modules_and_lessons(enrollment)
+@receiver(post_delete, sender=Lesson)
+def video_lesson_deleted(sender, instance: Lesson, **kwargs):
+    # hls_playlist / poster pointent dans masters/hls/<id>/ : django_cleanup ne retire pas le dossier
+    lesson_id = instance.pk
+    transaction.on_commit(lambda: video_pipeline.clear(lesson_id))
@@ -1,3 +1,328 @@
-from django.test import TestCase
+import datetime
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+import requests
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from admissions.models import Admission
+from core import jobs
+from core.jobs import run_pending
+from core.testing import MediaFilesMixin, Upstream
+from core.utils.http_range import ChunkCache, RangeProxy
+from core.models import Job
+from campuses.models import Campus
+from programs.models import Program
+
+from .models import (
+    Assignment, Chapter, Cohort, Exam, ExamGrade, InstructorAssignment, MasterEnrollment, Lesson, MasterKpiSnapshot,
+    ModuleUE, ResultRecompute, Semester, SemesterResult, Submission,
+)
+from .services import kpi_snapshot, results_engine, results_kpis, video_pipeline
+from .services.grade_matrix import build_grade_matrix
+from .views import media_proxy
+
+User = get_user_model()
+
+
+class ResultsEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        program = Program.objects.create(
+            title="Master Santé", slug="master-sante", cycle="MASTER", duration="2", entry_requirement="Licence"
+        )
+        campus = Campus.objects.create(name="Bamako", code="BKO")
+        today = datetime.date.today()
+        cohort = Cohort.objects.create(label="2026", start_date=today, end_date=today)
+        cls.semester = Semester.objects.create(program=program, cohort=cohort, name="S1")
+        cls.m1 = ModuleUE.objects.create(semester=cls.semester, code="M1", title="Épidémiologie", coefficient=2, credits=6)
+        cls.m2 = ModuleUE.objects.create(semester=cls.semester, code="M2", title="Statistiques", coefficient=1, credits=4)
+        cls.a1 = Assignment.objects.create(module=cls.m1, title="Devoir 1", coefficient=1)
+        cls.a2 = Assignment.objects.create(module=cls.m1, title="Devoir 2", coefficient=3)
+        cls.a3 = Assignment.objects.create(module=cls.m2, title="Devoir 3", coefficient=1)
+        cls.student = User.objects.create_user(username="etu", password="x", role="ETUDIANT")
+        admission = Admission.objects.create(program=program, campus=campus, nom="Etu", prenom="Etu", telephone="1")
+        cls.enrollment = MasterEnrollment.objects.create(
+            student=cls.student, program=program, cohort=cohort, admission=admission
+        )
+
+    def _grade(self, assignment, note):
+        return Submission.objects.create(assignment=assignment, student=self.student, status="GRADED", note_20=note)
+
+    def test_weighted_module_and_semester_average(self):
+        self._grade(self.a1, 8)
+        self._grade(self.a2, 12)  # module 1 : (8×1 + 12×3) / 4 = 11
+        self._grade(self.a3, 5)   # module 2 : 5
+        values = results_engine.compute_semester(self.semester)[self.enrollment.id]
+        self.assertEqual(values["average_20"], Decimal("9.00"))  # (11×2 + 5×1) / 3
+        self.assertEqual(values["decision"], "RAT")
+        self.assertEqual(values["credits_earned"], Decimal("6.00"))
+
+    def test_exam_block_best_attempt_and_rattrapage(self):
+        exam = Exam.objects.create(semester=self.semester, title="Examen", coefficient=1)
+        ra = Exam.objects.create(semester=self.semester, title="Rattrapage", eval_kind="RA", coefficient=1)
+        ExamGrade.objects.create(exam=exam, student=self.student, attempt_no=1, score_raw=14, note_20=14)
+        ExamGrade.objects.create(exam=exam, student=self.student, attempt_no=2, score_raw=6, note_20=6)
+        ExamGrade.objects.create(exam=ra, student=self.student, attempt_no=1, score_raw=9, note_20=9)
+        values = results_engine.compute_semester(self.semester)[self.enrollment.id]
+        self.assertEqual(values["average_20"], Decimal("14.00"))  # max(14, 9), rattrapage_take_max par défaut
+
+    def test_marking_creates_no_placeholder_result(self):
+        self._grade(self.a1, 15)
+        self.assertTrue(ResultRecompute.objects.filter(enrollment=self.enrollment, semester=self.semester).exists())
+        self.assertFalse(SemesterResult.objects.exists())
+        self.assertEqual(results_kpis.aggregate_results(SemesterResult.objects.all())["total"], 0)
+
+        results_engine.recompute_dirty()
+        self.assertFalse(ResultRecompute.objects.exists())
+        self.assertEqual(SemesterResult.objects.get().average_20, Decimal("15.00"))
+
+    def test_ungrading_marks_dirty(self):
+        submission = self._grade(self.a1, 15)
+        results_engine.recompute_dirty()
+        submission.note_20 = None
+        submission.status = "SUBMITTED"
+        submission.save()
+        self.assertTrue(ResultRecompute.objects.exists())
+        results_engine.recompute_dirty()
+        self.assertIsNone(SemesterResult.objects.get().average_20)
+
+    def test_grade_matrix_uses_engine_rules(self):
+        self._grade(self.a1, 8)
+        self._grade(self.a2, 12)
+        exam = Exam.objects.create(semester=self.semester, title="Examen", coefficient=1)
+        ExamGrade.objects.create(exam=exam, student=self.student, attempt_no=1, score_raw=14, note_20=14)
+        ExamGrade.objects.create(exam=exam, student=self.student, attempt_no=2, score_raw=6, note_20=6)
+        results_engine.recompute_dirty()
+
+        block = build_grade_matrix(self.enrollment).semester_blocks[0]
+        notes = {row["module"].id: row["final_note"] for row in block["rows"]}
+        self.assertEqual(notes[self.m1.id], 11.0)  # pondéré, pas (8 + 12) / 2
+        self.assertEqual(block["exam_average"], 14.0)  # meilleure tentative, pas la dernière
+
+
+class KpiSnapshotTests(TransactionTestCase):
+    # Transactions réelles : les callbacks on_commit s'exécutent au commit
+    def setUp(self):
+        program = Program.objects.create(
+            title="Master Santé", slug="master-sante", cycle="MASTER", duration="2", entry_requirement="Licence"
+        )
+        campus = Campus.objects.create(name="Bamako", code="BKO")
+        today = datetime.date.today()
+        cohort = Cohort.objects.create(label="2026", start_date=today, end_date=today)
+        self.enrollments = []
+        for i in range(2):
+            student = User.objects.create_user(username=f"etu{i}", password="x", role="ETUDIANT")
+            admission = Admission.objects.create(program=program, campus=campus, nom="Etu", prenom=str(i), telephone=str(i))
+            self.enrollments.append(MasterEnrollment.objects.create(
+                student=student, program=program, cohort=cohort, admission=admission
+            ))
+
+    def test_rolled_back_delete_does_not_block_later_settle(self):
+        kpi_snapshot.rebuild()
+        pk = self.enrollments[0].pk
+        try:
+            with transaction.atomic():
+                MasterEnrollment.objects.get(pk=pk).delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        MasterEnrollment.objects.get(pk=pk).delete()
+        self.assertEqual(kpi_snapshot.get_snapshot().students_count, 1)
+
+    def test_no_double_decrement_after_rebuild_in_transaction(self):
+        MasterKpiSnapshot.objects.all().delete()
+        self.enrollments[0].delete()  # bump() → rebuild() : l'étudiant est déjà décompté
+        snapshot = kpi_snapshot.get_snapshot()
+        self.assertEqual(snapshot.students_count, 1)
+        self.assertEqual(snapshot.enrollments_count, 1)
+
+    def test_delete_after_rebuild_in_transaction_still_settles(self):
+        MasterKpiSnapshot.objects.all().delete()
+        with transaction.atomic():
+            self.enrollments[0].delete()  # bump() → rebuild()
+            self.enrollments[1].delete()  # après le recompte : doit décrémenter
+        snapshot = kpi_snapshot.get_snapshot()
+        self.assertEqual((snapshot.students_count, snapshot.enrollments_count), (0, 0))
+
+    def test_cascade_settles_once_per_student(self):
+        kpi_snapshot.rebuild()
+        student = self.enrollments[0].student
+        other = MasterEnrollment.objects.create(
+            student=student, program=self.enrollments[1].program, cohort=Cohort.objects.create(
+                label="2027", start_date=datetime.date.today(), end_date=datetime.date.today()
+            ), admission=Admission.objects.create(
+                program=self.enrollments[1].program, campus=Campus.objects.get(), nom="Etu", prenom="bis", telephone="9"
+            ),
+        )
+        with transaction.atomic():
+            self.enrollments[0].delete()
+            other.delete()
+        self.assertEqual(kpi_snapshot.get_snapshot().students_count, 1)
+
+
+class VideoPipelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        program = Program.objects.create(
+            title="Master Santé", slug="master-sante", cycle="MASTER", duration="2", entry_requirement="Licence"
+        )
+        today = datetime.date.today()
+        cohort = Cohort.objects.create(label="2026", start_date=today, end_date=today)
+        semester = Semester.objects.create(program=program, cohort=cohort, name="S1")
+        module = ModuleUE.objects.create(semester=semester, code="M1", title="Épidémiologie")
+        cls.chapter = Chapter.objects.create(module=module, title="Chapitre 1")
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, FFMPEG_BIN="ffmpeg-introuvable")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_failure_is_retried_by_the_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = Lesson.objects.create(chapter=self.chapter, title="Intro", video_file="masters/videos/intro.mp4")
+        self.assertEqual(run_pending(), (0, 1))
+
+        job = Job.objects.get(name="masters.transcode_lesson_video")
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_PENDING, 1))  # relancée (max_attempts=2)
+        self.assertIn("TranscodeError", job.last_error)
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.hls_status, Lesson.HLS_FAILED)
+        with self.assertRaises(video_pipeline.TranscodeError):
+            video_pipeline.transcode_lesson(lesson.pk)
+
+    def test_delete_removes_hls_directory(self):
+        lesson = Lesson.objects.create(chapter=self.chapter, title="Intro")
+        hls_dir = os.path.join(self.media_root, video_pipeline.HLS_ROOT, str(lesson.pk), "abc")
+        os.makedirs(hls_dir)
+        open(os.path.join(hls_dir, "360p_000.ts"), "wb").close()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.delete()
+        self.assertFalse(os.path.exists(os.path.dirname(hls_dir)))
+
+    def test_job_lease_outlasts_ffmpeg(self):
+        with override_settings(VIDEO_TRANSCODE_TIMEOUT=3600, VIDEO_TRANSCODE_PROCESSES=2):
+            self.assertGreater(video_pipeline.max_duration(), 2 * 3600)
+        lease = jobs.lease_for("masters.transcode_lesson_video").total_seconds()
+        self.assertGreater(lease, video_pipeline.max_duration())
+
+    def test_output_replaced_by_rename(self):
+        out_dir = Path(self.media_root) / video_pipeline.HLS_ROOT / "1" / "abc"
+        (out_dir / "360p").mkdir(parents=True)
+        (out_dir / "360p" / "seg_0000.ts").write_bytes(b"ancien")
+        tmp_dir = out_dir.with_name(".tmp-1")
+        tmp_dir.mkdir()
+        (tmp_dir / "master.m3u8").write_text("#EXTM3U\n")
+
+        video_pipeline._move_into_place(tmp_dir, out_dir)
+        self.assertEqual(sorted(p.name for p in out_dir.iterdir()), ["master.m3u8"])
+        self.assertEqual([p.name for p in out_dir.parent.iterdir()], ["abc"])
+
+
+class MediaRulesTests(MediaFilesMixin, TestCase):
+    """Règles masters/… de core.media, via la vue protégée : un accès autorisé, un refusé, une remontée."""
+
+    @classmethod
+    def setUpTestData(cls):
+        program = Program.objects.create(
+            title="Master Santé", slug="master-sante", cycle="MASTER", duration="2", entry_requirement="Licence"
+        )
+        campus = Campus.objects.create(name="Bamako", code="BKO")
+        today = datetime.date.today()
+        cohort = Cohort.objects.create(label="2026", start_date=today, end_date=today)
+        semester = Semester.objects.create(program=program, cohort=cohort, name="S1")
+        module = ModuleUE.objects.create(semester=semester, code="M1", title="Épidémiologie")
+        chapter = Chapter.objects.create(module=module, title="Chapitre 1")
+        cls.lesson = Lesson.objects.create(
+            chapter=chapter, title="Intro", is_published=True,
+            video_file="masters/videos/intro.mp4", resource_file="masters/resources/intro.pdf",
+        )
+
+        cls.student = cls.make_user("etu", "ETUDIANT")
+        cls.outsider = cls.make_user("autre", "ETUDIANT")
+        cls.teacher = cls.make_user("prof", "ENSEIGNANT")
+        admission = Admission.objects.create(program=program, campus=campus, nom="Etu", prenom="Etu", telephone="1")
+        MasterEnrollment.objects.create(student=cls.student, program=program, cohort=cohort, admission=admission)
+        InstructorAssignment.objects.create(instructor=cls.teacher, module=module)
+
+        assignment = Assignment.objects.create(module=module, title="Devoir 1")
+        Submission.objects.create(assignment=assignment, student=cls.student, uploaded_file="masters/submissions/copie.pdf")
+
+    def test_lesson_video_and_resource(self):
+        for name in ("masters/videos/intro.mp4", "masters/resources/intro.pdf"):
+            self.media_file(name)
+            self.assertEqual(self.media_status(self.student, name), 200)
+            self.assertEqual(self.media_status(self.outsider, name), 403)
+            self.assertEqual(self.media_status(None, name), 302)
+            self.assertEqual(self.media_status(self.outsider, f"programs/../{name}"), 404)
+
+    def test_hls_segment(self):
+        name = self.media_file(f"masters/hls/{self.lesson.pk}/v1/360p_000.ts")
+        self.assertEqual(self.media_status(self.student, name), 200)
+        self.assertEqual(self.media_status(self.outsider, name), 403)
+        self.assertEqual(self.media_status(self.outsider, f"programs/%2e%2e/{name}"), 404)
+
+    def test_unpublished_lesson_hidden_from_students_not_teacher(self):
+        Lesson.objects.filter(pk=self.lesson.pk).update(is_published=False)
+        name = self.media_file(f"masters/hls/{self.lesson.pk}/v1/index.m3u8")
+        self.assertEqual(self.media_status(self.student, name), 403)
+        self.assertEqual(self.media_status(self.teacher, name), 200)
+
+    def test_submission(self):
+        name = self.media_file("masters/submissions/copie.pdf")
+        self.assertEqual(self.media_status(self.student, name), 200)
+        self.assertEqual(self.media_status(self.teacher, name), 200)
+        self.assertEqual(self.media_status(self.outsider, name), 403)
+        self.assertEqual(self.media_status(self.outsider, "masters/videos/../submissions/copie.pdf"), 404)
+
+
+class VideoProxyViewTests(TestCase):
+    """Relais vidéo contre un amont local (core.testing.Upstream) : 200, 206, 416, 502."""
+
+    def setUp(self):
+        self.url = Upstream.start(self)
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root, ignore_errors=True)
+        media_proxy._proxy = RangeProxy(cache=ChunkCache(root=cache_root), chunk_size=4, session=requests.Session())
+        self.addCleanup(setattr, media_proxy, "_proxy", None)
+        override = override_settings(VIDEO_PROXY_ALLOWED_HOSTS={self.url.split("/")[2]})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(MediaFilesMixin.make_user("etu", "ETUDIANT"))
+
+    def _get(self, url=None, **headers):
+        return self.client.get(reverse("masters:video_proxy"), {"url": url or self.url}, headers=headers)
+
+    def test_full_body_without_range(self):
+        resp = self._get()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b"".join(resp.streaming_content), b"abcdefghij")
+        self.assertEqual((resp["Content-Length"], resp["Accept-Ranges"]), ("10", "bytes"))
+
+    def test_partial_content(self):
+        resp = self._get(Range="bytes=2-5")
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(b"".join(resp.streaming_content), b"cdef")
+        self.assertEqual(resp["Content-Range"], "bytes 2-5/10")
+
+    def test_range_not_satisfiable(self):
+        resp = self._get(Range="bytes=20-")
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp["Content-Range"], "bytes */10")
+
+    def test_upstream_failure_is_bad_gateway(self):
+        self.assertEqual(self._get(self.url.replace("/video.mp4", "/missing")).status_code, 502)
+
+    def test_host_not_allowed(self):
+        self.assertEqual(self._get("http://exemple.org/video.mp4").status_code, 400)
@@ -1,55 +1,141 @@
 # masters/utils/roles.py
+"""
+Résolution unique des rôles Master (student | instructor | staff_admin).
 
-def user_role(user):
-    """
-    Retourne le rôle simplifié (student | instructor | staff_admin)
-    Compatible avec ton modèle CustomUser.role et les Groupes Django.
-    """
-    if not user.is_authenticated:
-        return None
+Le profil de rôle est calculé une fois puis :
+  - mémorisé sur l'objet user pendant la requête (middleware + vues + helpers),
+  - mis en cache entre requêtes, sous une clé qui contient `user.role_version`.
+`role_version` est incrémenté quand le rôle ou les groupes changent
+(voir users.models.CustomUser.save et users.signals), ce qui invalide le cache.
+"""
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
 
-    # 1️⃣ Priorité au champ 'role' (CustomUser)
-    if hasattr(user, "role") and user.role:
-        role_value = str(user.role).upper().strip()
-        role_map = {
-            "DIRECTEUR": "staff_admin",
-            "GESTIONNAIRE": "staff_admin",
-            "SECRETAIRE": "staff_admin",
-            "ADMIN": "staff_admin",
-            "AGENT_MARKETING": "staff_admin",
-            "ENSEIGNANT": "instructor",
-            "ETUDIANT": "student",
-        }
-        return role_map.get(role_value, "student")
+from django.conf import settings
+from django.core.cache import cache
+
+ROLE_CACHE_TIMEOUT = getattr(settings, "MASTERS_ROLE_CACHE_TIMEOUT", 60 * 60)
+
+ROLE_MAP = {
+    "DIRECTEUR": "staff_admin",
+    "GESTIONNAIRE": "staff_admin",
+    "SECRETAIRE": "staff_admin",
+    "ADMIN": "staff_admin",
+    "AGENT_MARKETING": "staff_admin",
+    "ENSEIGNANT": "instructor",
+    "ETUDIANT": "student",
+}
+
+STAFF_GROUPS = {
+    "directeur", "conseiller", "informaticien", "secretaire",
+    "gestionnaire", "administrateurs", "admin", "direction",
+}
+INSTRUCTOR_GROUPS = {"enseignant", "enseignants", "teacher", "instructor", "prof", "professeur"}
+STUDENT_GROUPS = {"etudiant", "etudiants", "students", "student"}
+
+DIRECTOR_ROLES = {"DIRECTEUR_ETUDES", "DIRECTEUR D'ÉTUDES", "DIRECTEUR DES ETUDES", "DIRECTEUR"}
+DIRECTOR_GROUPS = {"directeur", "staff_admin"}
+
+
+@dataclass(frozen=True)
+class RoleProfile:
+    role: Optional[str]            # student | instructor | staff_admin | None (anonyme)
+    raw_role: str = ""             # CustomUser.role normalisé (ex: "DIRECTEUR")
+    groups: FrozenSet[str] = frozenset()
+
+    @property
+    def is_student(self) -> bool:
+        return self.role == "student"
+
+    @property
+    def is_instructor(self) -> bool:
+        return self.role == "instructor" or bool(self.groups & INSTRUCTOR_GROUPS)
+
+    @property
+    def is_staff_admin(self) -> bool:
+        return self.role == "staff_admin"
+
+    @property
+    def is_director(self) -> bool:
+        return self.raw_role in DIRECTOR_ROLES or bool(self.groups & DIRECTOR_GROUPS)
+
+
+ANONYMOUS = RoleProfile(role=None)
 
+
+def _compute_profile(user) -> RoleProfile:
+    raw_role = str(getattr(user, "role", "") or "").upper().strip()
+    groups = frozenset(g.lower() for g in user.groups.values_list("name", flat=True))
+
+    # 1️⃣ Priorité au champ 'role' (CustomUser)
+    if raw_role:
+        role = ROLE_MAP.get(raw_role, "student")
     # 2️⃣ Fallback via les groupes Django (si role non défini)
-    names = {g.name.lower() for g in user.groups.all()}
+    elif groups & STAFF_GROUPS:
+        role = "staff_admin"
+    elif groups & INSTRUCTOR_GROUPS:
+        role = "instructor"
+    else:
+        role = "student"
+
+    return RoleProfile(role=role, raw_role=raw_role, groups=groups)
+
+
+def _cache_key(user, version) -> str:
+    return f"masters:roles:{user.pk}:{version}"
+
+
+def resolve_roles(user) -> RoleProfile:
+    """Profil de rôle mémorisé par requête et mis en cache par (user, role_version)."""
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+
+    version = getattr(user, "role_version", 0) or 0
+    memo = getattr(user, "_master_role_profile", None)
+    if memo and memo[0] == version:
+        return memo[1]
 
-    # Staff administratif
-    if names & {
-        "directeur", "conseiller", "informaticien", "secretaire",
-        "gestionnaire", "administrateurs", "admin", "direction"
-    }:
-        return "staff_admin"
+    key = _cache_key(user, version)
+    profile = cache.get(key)
+    if profile is None:
+        profile = _compute_profile(user)
+        cache.set(key, profile, ROLE_CACHE_TIMEOUT)
 
-    # Enseignant
-    if names & {"enseignant", "enseignants", "teacher", "instructor"}:
-        return "instructor"
+    user._master_role_profile = (version, profile)
+    return profile
 
-    # Étudiant
-    if names & {"etudiant", "etudiants", "students", "student"}:
-        return "student"
 
-    # Par défaut
-    return "student"
+def user_role(user):
+    """
+    Retourne le rôle simplifié (student | instructor | staff_admin)
+    Compatible avec ton modèle CustomUser.role et les Groupes Django.
+    """
+    return resolve_roles(user).role
 
 
 # Helpers pratiques
 def is_student(user):
-    return user_role(user) == "student"
+    return resolve_roles(user).is_student
 
 def is_instructor(user):
-    return user_role(user) == "instructor"
+    return resolve_roles(user).is_instructor
 
 def is_staff_admin(user):
-    return user_role(user) == "staff_admin"
+    return resolve_roles(user).is_staff_admin
+
+def is_director(user):
+    """Directeur des Études au sens strict (rôle DIRECTEUR ou groupe 'directeur')."""
+    return resolve_roles(user).is_director
+
+
+# Contrôles d'accès aux espaces (superuser inclus)
+def has_teacher_access(user):
+    if not user or not user.is_authenticated:
+        return False
+    return getattr(user, "is_superuser", False) or resolve_roles(user).is_instructor
+
+def has_director_access(user):
+    if not user or not user.is_authenticated:
+        return False
+    profile = resolve_roles(user)
+    return getattr(user, "is_superuser", False) or profile.is_staff_admin or profile.is_director
@@ -16,7 +16,9 @@ from ..models import (
     ModuleUE, Chapter, Lesson, Semester, InstructorAssignment,
     Exam, ExamGrade, SemesterResult,
 )
-from ..utils.roles import user_role
+from ..utils.roles import is_student, is_instructor, has_director_access
+from ..services import kpi_snapshot
+from ..services.grade_matrix import build_grade_matrix
 
 
 # ==========================================================
@@ -30,20 +32,6 @@ def _json(request):
         return {}
 
 
-def _is_student(user):
-    return (user_role(user) or "").lower() == "student"
-
-
-def _is_instructor(user):
-    role = (user_role(user) or "").lower()
-    return role in {"instructor", "enseignant", "teacher", "prof", "professeur"}
-
-
-def _is_director(user):
-    role = (user_role(user) or "").lower()
-    return role in {"directeur", "directeur_etudes", "staff_admin"}
-
-
 # ==========================================================
 # 🎓 API ÉTUDIANT — progression & cours
 # ==========================================================
@@ -52,7 +40,7 @@ def _is_director(user):
 @transaction.atomic
 def mark_lesson_complete(request):
     """Marque une leçon comme terminée (progression étudiante)."""
-    if not _is_student(request.user):
+    if not is_student(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé aux étudiants."}, status=403)
 
     data = _json(request)
@@ -66,12 +54,8 @@ def mark_lesson_complete(request):
         enrollment_id=enrollment_id, lesson_id=lesson_id
     )
 
-    # Compatibilité: si le modèle n'a pas mark_completed(), on pose completed_at manuellement
-    if hasattr(lp, "mark_completed") and callable(lp.mark_completed):
-        lp.mark_completed()
-    else:
-        lp.completed_at = timezone.now()
-        lp.save(update_fields=["completed_at"])
+    # Idempotent ; ModuleProgress est ajusté par signal (services/progress.py)
+    lp.mark_completed()
 
     return JsonResponse({
         "ok": True,
@@ -82,7 +66,7 @@ def mark_lesson_complete(request):
 @login_required
 def api_student_modules(request):
     """Liste des modules (UE) accessibles à l’étudiant connecté (cohorte & cycle MASTER pris en compte)."""
-    if not _is_student(request.user):
+    if not is_student(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé aux étudiants."}, status=403)
 
     # Inscription MASTER active la plus récente
@@ -147,7 +131,7 @@ def api_student_modules(request):
 @login_required
 def api_student_lessons(request, module_id: int):
     """Retourne les chapitres + leçons publiées d’un module (compat champs réels)."""
-    if not _is_student(request.user):
+    if not is_student(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé aux étudiants."}, status=403)
 
     module = get_object_or_404(ModuleUE.objects.select_related("semester", "semester__program"), pk=module_id)
@@ -174,12 +158,15 @@ def api_student_lessons(request, module_id: int):
         lessons_list = []
         for l in ch.lessons.filter(is_published=True).order_by("order", "id"):
             # Champs réels dans models: duration_seconds, external_url, video_file
-            video_url = l.external_url or (l.video_file.url if getattr(l, "video_file", None) else None)
+            # HLS (multi-débits) dès que le transcodage est terminé
+            video_url = l.hls_url or l.external_url or (l.video_file.url if getattr(l, "video_file", None) else None)
             lessons_list.append({
                 "id": l.id,
                 "title": l.title,
                 "duration_seconds": getattr(l, "duration_seconds", 0) or 0,
                 "video_url": video_url,
+                "hls_url": l.hls_url,
+                "poster_url": l.poster_url,
             })
 
         data.append({
@@ -199,7 +186,7 @@ def api_student_lessons(request, module_id: int):
 @transaction.atomic
 def save_note(request):
     """Permet à un enseignant de noter une soumission."""
-    if not _is_instructor(request.user):
+    if not is_instructor(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé aux enseignants."}, status=403)
 
     data = _json(request)
@@ -232,7 +219,7 @@ def save_note(request):
 @transaction.atomic
 def create_assignment(request):
     """Crée un nouveau devoir pour un module."""
-    if not _is_instructor(request.user):
+    if not is_instructor(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé aux enseignants."}, status=403)
 
     data = _json(request)
@@ -265,19 +252,15 @@ def create_assignment(request):
 @login_required
 def api_director_overview(request):
     """Fournit des statistiques générales sur les Masters (Directeur des Études)."""
-    if not _is_director(request.user):
+    if not has_director_access(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé au Directeur des Études."}, status=403)
 
-    total_students = MasterEnrollment.objects.values("student").distinct().count()
-    total_teachers = InstructorAssignment.objects.values("instructor").distinct().count()
-    total_exams = Exam.objects.count()
-    avg_success_rate = SemesterResult.objects.aggregate(avg=Avg("average_20"))["avg"]
-
+    snapshot = kpi_snapshot.get_snapshot()
     stats = {
-        "students": total_students,
-        "teachers": total_teachers,
-        "exams": total_exams,
-        "average": round(float(avg_success_rate or 0.0), 2),
+        "students": snapshot.students_count,
+        "teachers": snapshot.teachers_count,
+        "exams": snapshot.exams_count,
+        "average": snapshot.avg_success,
     }
 
     return JsonResponse({"ok": True, "stats": stats})
@@ -295,7 +278,7 @@ def api_student_overview(request):
       - crédits validés
       - dernières activités (devoirs, examens, notes)
     """
-    if not _is_student(request.user):
+    if not is_student(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès réservé aux étudiants."}, status=403)
 
     # 🔹 Inscription MASTER active
@@ -313,22 +296,18 @@ def api_student_overview(request):
     # =====================================================
     # 1️⃣ Progression moyenne (ModuleProgress)
     # =====================================================
-    avg_progress = 0
-    try:
-        from ..models import ModuleProgress
-        progresses = ModuleProgress.objects.filter(enrollment=enrollment)
-        if progresses.exists():
-            avg_progress = round(sum(float(p.percent or 0) for p in progresses) / progresses.count(), 2)
-    except Exception:
-        avg_progress = 0
+    # pourcentages précalculés (compteurs ModuleProgress) : une seule agrégation
+    from ..models import ModuleProgress
+    avg_progress = ModuleProgress.objects.filter(enrollment=enrollment).aggregate(avg=Avg("percent"))["avg"]
+    avg_progress = round(float(avg_progress), 2) if avg_progress is not None else 0
 
     # =====================================================
     # 2️⃣ Moyenne générale & crédits validés
     # =====================================================
-    results = SemesterResult.objects.filter(enrollment=enrollment)
-    avg_values = [float(r.average_20) for r in results if r.average_20 is not None]
-    moyenne_generale = round(sum(avg_values) / len(avg_values), 2) if avg_values else 0
-    credits_total = sum(float(r.credits_earned or 0) for r in results)
+    matrix = build_grade_matrix(enrollment, with_grades=False)
+    summary = matrix.summary
+    moyenne_generale = summary["avg_global"] or 0
+    credits_total = summary["credits_total"]
 
     # =====================================================
     # 3️⃣ Dernières activités (3 plus récentes)
@@ -368,7 +347,9 @@ def api_student_overview(request):
         })
 
     # Derniers résultats publiés
-    latest_results = results.order_by("-computed_at")[:3]
+    latest_results = sorted(
+        (r for r in matrix.results if r.computed_at), key=lambda r: r.computed_at, reverse=True
+    )[:3]
     for r in latest_results:
         recent_acts.append({
             "id": f"r{r.id}",
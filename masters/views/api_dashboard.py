@@ -4,38 +4,7 @@ from django.db.models import Count
 from django.contrib.auth.models import Group
 
 from ..models import ModuleUE, Lesson, Chapter, InstructorAssignment
-from ..utils.roles import user_role
-
-# --- Rôle enseignant robuste (accepte plusieurs libellés/groupes) ---
-def _is_instructor(user):
-    if not user or not user.is_authenticated:
-        return False
-    if getattr(user, "is_superuser", False):
-        return True  # superuser a tous les droits
-    # 1) via helper si déjà en place
-    try:
-        from ..utils.roles import is_instructor as _is_inst
-        if _is_inst(user):
-            return True
-    except Exception:
-        pass
-    # 2) via user_role() string
-    try:
-        role = user_role(user) or ""
-    except Exception:
-        role = ""
-    role = str(role).lower()
-    if role in {"instructor", "enseignant", "teacher", "prof", "professeur"}:
-        return True
-    # 3) via groupes
-    try:
-        names = set(g.name.lower() for g in user.groups.all())
-        if names & {"instructor", "enseignant", "teacher", "prof", "professeur"}:
-            return True
-    except Exception:
-        pass
-    return False
-
+from ..utils.roles import has_teacher_access
 
 @login_required
 def api_teacher_modules(request):
@@ -43,7 +12,7 @@ def api_teacher_modules(request):
     Liste des modules assignés à l’enseignant connecté (JSON).
     Utilisée par courselist.html (AJAX).
     """
-    if not _is_instructor(request.user):
+    if not has_teacher_access(request.user):
         return JsonResponse({"ok": False, "error": "⛔ Accès refusé (rôle)"}, status=403)
 
     assignments = (
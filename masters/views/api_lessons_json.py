@@ -7,38 +7,18 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
 
 from ..models import Lesson, Chapter, ModuleUE, InstructorAssignment
-from ..utils.roles import user_role
+from ..utils.roles import has_teacher_access
 from ..services.drive_service import drive_delete
 
 # ============================================================
 # 🔐 Vérifications de rôle et d’accès
 # ============================================================
 
-def _is_instructor(user):
-    if not user or not user.is_authenticated:
-        return False
-    if getattr(user, "is_superuser", False):
-        return True
-    try:
-        role = (user_role(user) or "").lower()
-    except Exception:
-        role = ""
-    if role in {"instructor", "enseignant", "teacher", "prof", "professeur"}:
-        return True
-    try:
-        names = set(g.name.lower() for g in user.groups.all())
-        if names & {"instructor", "enseignant", "teacher", "prof", "professeur"}:
-            return True
-    except Exception:
-        pass
-    return False
-
-
 def _has_access(user, module):
     """Accès = superuser OU (enseignant ET affectation active au module)."""
     if getattr(user, "is_superuser", False):
         return True
-    if not _is_instructor(user):
+    if not has_teacher_access(user):
         return False
     return InstructorAssignment.objects.filter(
         instructor=user, module=module, is_active=True
@@ -79,6 +59,8 @@ class LessonAPIView(View):
                 "order": l.order,
                 "external_url": l.external_url,
                 "video_file": l.video_file.url if l.video_file else None,
+                "hls_url": l.hls_url,
+                "poster_url": l.poster_url,
                 "resource_file": l.resource_file.url if getattr(l, "resource_file", None) else None,
             }
             for l in lessons
@@ -3,13 +3,7 @@ from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import reverse
 from django.shortcuts import redirect
 
-def _role(user):
-    names = {g.name.lower() for g in user.groups.all()}
-    if {"directeur","conseiller","informaticien"} & names:
-        return "staff_admin"
-    if "enseignant" in names:
-        return "instructor"
-    return "student"
+from ..utils.roles import user_role
 
 class MasterLoginView(LoginView):
     template_name = "masters/login.html"  # ton template Master
@@ -21,7 +15,7 @@ class MasterLoginView(LoginView):
         if next_url:
             return next_url
         # Sinon, on route par rôle vers le dashboard Master
-        role = _role(self.request.user)
+        role = user_role(self.request.user)
         return reverse("masters:dashboard")
 
 from django.contrib.auth.views import LogoutView
@@ -54,6 +48,7 @@ def change_password(request):
             user.userprofile.must_change_password = False
             user.userprofile.save()
             update_session_auth_hash(request, user)
+            request.session[MUST_CHANGE_PASSWORD_SESSION_KEY] = False
             return redirect("masters:dashboard")
     else:
         form = PasswordChangeForm(request.user)
@@ -67,6 +62,8 @@ from django.contrib.auth import update_session_auth_hash
 from django.shortcuts import render, redirect
 from django.contrib.auth.forms import PasswordChangeForm
 
+from ..middleware import MUST_CHANGE_PASSWORD_SESSION_KEY
+
 @login_required
 def force_password_change(request):
     """
@@ -74,6 +71,7 @@ def force_password_change(request):
     """
     user_profile = getattr(request.user, "userprofile", None)
     if user_profile and not user_profile.must_change_password:
+        request.session[MUST_CHANGE_PASSWORD_SESSION_KEY] = False
         return redirect("masters:dashboard")
 
     if request.method == "POST":
@@ -84,6 +82,7 @@ def force_password_change(request):
             if user_profile:
                 user_profile.must_change_password = False
                 user_profile.save(update_fields=["must_change_password"])
+            request.session[MUST_CHANGE_PASSWORD_SESSION_KEY] = False
             messages.success(request, "✅ Mot de passe modifié avec succès.")
             return redirect("masters:dashboard")
     else:
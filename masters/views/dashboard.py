@@ -3,7 +3,9 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.utils import timezone
 from django.db.models import Count, Avg, Sum, Q
-from ..utils.roles import user_role  # ✅ source unique pour le rôle
+from ..utils.roles import user_role, is_director  # ✅ source unique pour le rôle
+from ..services import kpi_snapshot
+from ..services.grade_matrix import build_grade_matrix
 
 # ====== MODELS (Master) ======
 from ..models import (
@@ -135,15 +137,12 @@ def _student_context(user):
         for g in ExamGrade.objects.filter(student=user, exam__in=exams)
     }
 
-    # Résultats consolidés
-    results = (
-        SemesterResult.objects
-        .filter(enrollment=enrollment)
-        .select_related("semester")
-        .order_by("semester__order")
-    )
-    moyenne_generale = results.aggregate(avg=Avg("average_20"))["avg"] or 0.0
-    credits_total = results.aggregate(total=Sum("credits_earned"))["total"] or 0.0
+    # Résultats consolidés (matrice partagée avec le fragment "results" et l'API)
+    grade_matrix = build_grade_matrix(enrollment, with_grades=False)
+    results = grade_matrix.results
+    summary = grade_matrix.summary
+    moyenne_generale = summary["avg_global"] or 0.0
+    credits_total = summary["credits_total"]
 
     # Prochains événements utiles
     now = timezone.now()
@@ -233,17 +232,8 @@ def _instructor_context(user):
 
 def _staff_context(user):
     """Contexte générique Staff Admin (hors Directeur)."""
-    # KPIs généraux Master
-    nb_programs_master = (
-        Program.objects.filter(cycle="MASTER").count()
-        if Program else 0
-    )
-    nb_semesters = Semester.objects.count()
-    nb_modules = ModuleUE.objects.count()
-    nb_students = MasterEnrollment.objects.values("student").distinct().count()
-    nb_enrollments = MasterEnrollment.objects.count()
-    nb_teachers = InstructorAssignment.objects.values("instructor").distinct().count()
-    nb_exams = Exam.objects.count()
+    # KPIs généraux Master (snapshot : 1 requête)
+    snapshot = kpi_snapshot.get_snapshot()
 
     last_exams = Exam.objects.order_by("-start_at")[:8]
     last_assignments = Assignment.objects.order_by("-created_at")[:8]
@@ -263,13 +253,14 @@ def _staff_context(user):
     }
 
     return {
-        "nb_programs_master": nb_programs_master,
-        "nb_semesters": nb_semesters,
-        "nb_modules": nb_modules,
-        "nb_students": nb_students,
-        "nb_enrollments": nb_enrollments,
-        "nb_teachers": nb_teachers,
-        "nb_exams": nb_exams,
+        "kpi_snapshot": snapshot,
+        "nb_programs_master": snapshot.programs_count,
+        "nb_semesters": snapshot.semesters_count,
+        "nb_modules": snapshot.modules_count,
+        "nb_students": snapshot.students_count,
+        "nb_enrollments": snapshot.enrollments_count,
+        "nb_teachers": snapshot.teachers_count,
+        "nb_exams": snapshot.exams_count,
 
         "last_exams": last_exams,
         "last_assignments": last_assignments,
@@ -307,10 +298,8 @@ def _director_context(user):
         .order_by("semester__name")
     )
 
-    # Taux de réussite approximatif (si computed_at rempli + decision)
-    total_results = SemesterResult.objects.exclude(decision__isnull=True).count()
-    admitted = SemesterResult.objects.filter(decision="ADM").count()
-    success_rate = round((admitted / total_results) * 100.0, 2) if total_results else 0.0
+    # Taux de réussite (snapshot déjà chargé par _staff_context)
+    success_rate = ctx["kpi_snapshot"].success_rate
 
     ctx.update({
         "programs_breakdown": by_program,
@@ -345,15 +334,7 @@ def dashboard_router(request):
         return teacher_dashboard(request)
     if role == "staff_admin":
         # détection sous-rôle directeur
-        staff_role = (getattr(request.user, "role", "") or "").upper().strip()
-        group_names = {g.name.lower() for g in request.user.groups.all()}
-        is_director = (
-            staff_role in {
-                "DIRECTEUR_ETUDES", "DIRECTEUR D'ÉTUDES",
-                "DIRECTEUR DES ETUDES", "DIRECTEUR"
-            } or "directeur" in group_names
-        )
-        return director_dashboard(request) if is_director else staff_dashboard(request)
+        return director_dashboard(request) if is_director(request.user) else staff_dashboard(request)
 
     # fallback
     return render(request, "masters/dashboard.html", {"role": role})
@@ -456,15 +437,7 @@ def director_dashboard(request):
     if role != "staff_admin":
         return dashboard_router(request)
 
-    staff_role = (getattr(request.user, "role", "") or "").upper().strip()
-    group_names = {g.name.lower() for g in request.user.groups.all()}
-    is_director = (
-        staff_role in {
-            "DIRECTEUR_ETUDES", "DIRECTEUR D'ÉTUDES",
-            "DIRECTEUR DES ETUDES", "DIRECTEUR"
-        } or "directeur" in group_names
-    )
-    if not is_director:
+    if not is_director(request.user):
         return redirect("masters:staff_dashboard")
 
     sections = {
@@ -7,7 +7,8 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Prefetch, Q, Count, Sum, Avg
 from urllib.parse import unquote
 
-from ..utils.roles import user_role
+from ..utils.roles import is_student, has_teacher_access
+from ..services.grade_matrix import build_grade_matrix
 from ..models import (
     MasterEnrollment, Semester, ModuleUE, Chapter, Lesson,
     InstructorAssignment, Assignment, Submission, Exam, ExamGrade,
@@ -37,7 +38,7 @@ def _render_fragment(request, template_path, ctx=None):
 @login_required
 def student_fragment_switch(request, section: str):
     """Sert les fragments AJAX du dashboard étudiant."""
-    if (user_role(request.user) or "").lower() != "student":
+    if not is_student(request.user):
         return HttpResponseBadRequest("⛔ Accès refusé — réservé aux étudiants.")
 
     template_map = {
@@ -85,10 +86,6 @@ def student_fragment_switch(request, section: str):
     # === MES COURS ===
     # === MES COURS ===
     if section == "courses":
-        # 🧠 Si aucun module n’existe encore pour cet étudiant (cas rare après création auto)
-        # on tente de relier automatiquement les modules disponibles à son programme/cohorte.
-        from ..signals import link_modules_and_lessons
-
         modules_qs = (
             ModuleUE.objects
             .filter(semester__in=semesters_qs, is_active=True)
@@ -99,12 +96,7 @@ def student_fragment_switch(request, section: str):
             .order_by("semester__order", "order", "id")
         )
 
-        # 🧩 Si aucun module lié, mais que des modules existent en base, on relie automatiquement
-        if not ModuleProgress.objects.filter(enrollment=enrollment).exists() and modules_qs.exists():
-            print(f"[AUTO-LINK:Dashboard] Aucun ModuleProgress pour {enrollment.student.username}, initialisation...")
-            link_modules_and_lessons(enrollment)
-
-        # Recharger la progression après liaison
+        # Progression maintenue par les signaux (liaison à l'inscription, diffusion des leçons publiées)
         progress_qs = ModuleProgress.objects.filter(enrollment=enrollment, module__in=modules_qs)
         progress_map = {p.module_id: float(p.percent or 0) for p in progress_qs}
 
@@ -166,35 +158,13 @@ def student_fragment_switch(request, section: str):
 
     # === RÉSULTATS ===
     elif section == "results":
-        results_qs = (
-            SemesterResult.objects
-            .filter(enrollment=enrollment)
-            .select_related("semester__program", "semester__cohort")
-            .order_by("semester__order", "semester__name")
-        )
-        avg_values = [float(sr.average_20) for sr in results_qs if sr.average_20 is not None]
-        avg_global = round(sum(avg_values) / len(avg_values), 2) if avg_values else None
-        credits_total = sum(float(sr.credits_earned or 0) for sr in results_qs)
-        decision_finale = next((sr.get_decision_display() for sr in results_qs[::-1] if sr.decision), None)
-
-        semester_blocks = []
-        for sr in results_qs:
-            mods = ModuleUE.objects.filter(semester=sr.semester)
-            graded_subs = Submission.objects.filter(
-                assignment__module__in=mods, student=request.user, status="GRADED"
-            ).select_related("assignment", "assignment__module")
-
-            subs_by_module = {}
-            for s in graded_subs:
-                subs_by_module.setdefault(s.assignment.module_id, []).append(s)
-
-            rows = []
-            for m in mods:
-                notes = [float(s.note_20) for s in subs_by_module.get(m.id, []) if s.note_20]
-                final_note = round(sum(notes) / len(notes), 2) if notes else None
-                rows.append({"module": m, "final_note": final_note})
-
-            semester_blocks.append({"sr": sr, "rows": rows})
+        # Matrice semestre × module (requêtes groupées, mêmes chiffres que le dashboard et l'API)
+        matrix = build_grade_matrix(enrollment)
+        semester_blocks = matrix.semester_blocks
+        summary = matrix.summary
+        avg_global = summary["avg_global"]
+        credits_total = summary["credits_total"]
+        decision_finale = summary["decision_finale"]
 
         ctx.update({
             "semester_blocks": semester_blocks,
@@ -208,34 +178,13 @@ def student_fragment_switch(request, section: str):
     return _render_fragment(request, tpl, ctx)
 
 
-# ==========================================================
-# 👨‍🏫 DASHBOARD ENSEIGNANT — fragments
-# ==========================================================
-def _is_instructor(user):
-    """Vérifie si l’utilisateur est enseignant (rôle ou groupe)."""
-    if not user or not user.is_authenticated:
-        return False
-    if getattr(user, "is_superuser", False):
-        return True
-    role = (user_role(user) or "").lower()
-    if role in {"instructor", "enseignant", "teacher", "prof", "professeur"}:
-        return True
-    try:
-        names = {g.name.lower() for g in user.groups.all()}
-        if names & {"instructor", "enseignant", "teacher", "prof", "professeur"}:
-            return True
-    except Exception:
-        pass
-    return False
-
-
 # ==========================================================
 # 🔁 ROUTER ENSEIGNANT
 # ==========================================================
 @login_required
 def teacher_fragment_switch(request, section: str):
     """Router AJAX enseignant (Tailwind + Alpine.js)."""
-    if not _is_instructor(request.user):
+    if not has_teacher_access(request.user):
         return HttpResponseBadRequest("⛔ Accès réservé aux enseignants.")
 
     templates = {
@@ -274,7 +223,7 @@ def teacher_fragment_switch(request, section: str):
 @login_required
 def student_course_view(request, course_id: int):
     """Vue détaillée du cours (chapitres + vidéos) — côté étudiant."""
-    if (user_role(request.user) or "").lower() != "student":
+    if not is_student(request.user):
         return HttpResponseBadRequest("⛔ Accès réservé aux étudiants.")
 
     module = get_object_or_404(ModuleUE, pk=course_id)
@@ -13,7 +13,11 @@ from django.db.models import (
 )
 from django.shortcuts import get_object_or_404
 
-from ..utils.roles import user_role
+from core.utils.pagination import keyset_paginate
+
+from ..utils.roles import has_director_access
+from ..services import kpi_snapshot
+from ..services.results_kpis import results_kpis
 from ..models import (
     MasterProgram, Cohort, Semester, ModuleUE,
     Chapter, Lesson,
@@ -49,29 +53,6 @@ def _render_fragment(request, template_path: str, ctx: Optional[Dict[str, Any]]
         logger.exception(f"[DirectorFragment] Erreur de rendu pour '{template_path}': {e}")
         return HttpResponseBadRequest(f"Erreur de chargement du fragment.")
 
-def _is_director(user) -> bool:
-    """
-    Vérifie que l’utilisateur est Directeur des Études / staff_admin (comme ton routeur).
-    - Rôle explicite,
-    - ou appartenance à un groupe.
-    """
-    if not user or not user.is_authenticated:
-        return False
-    if getattr(user, "is_superuser", False):
-        return True
-
-    role = (user_role(user) or "").lower().strip()
-    if role in {"directeur", "directeur_etudes", "staff_admin"}:
-        return True
-
-    try:
-        names = {g.name.lower() for g in user.groups.all()}
-        if "directeur" in names or "staff_admin" in names:
-            return True
-    except Exception:
-        pass
-    return False
-
 def _get_int(request, name: str, default: Optional[int] = None) -> Optional[int]:
     val = request.GET.get(name)
     if val is None or val == "":
@@ -85,32 +66,13 @@ def _get_str(request, name: str, default: str = "") -> str:
     val = (request.GET.get(name) or "").strip()
     return val if val else default
 
-def _paginate(qs, page: int, page_size: int) -> Tuple[Iterable, Dict[str, Any]]:
+def _paginate(qs, page: int, page_size: int, cursor: str = "") -> Tuple[Iterable, Dict[str, Any]]:
     """
-    Pagination simple, côté serveur, sans dépendance externe.
+    Pagination par curseur (keyset), voir core.utils.pagination.
     Renvoie (items, meta)
-    meta: {page, page_size, total, pages, has_next, has_prev}
-    """
-    # Supporte QuerySet et list
-    total = qs.count() if hasattr(qs, "count") else len(qs)  # type: ignore
-    page = max(1, page or 1)
-    page_size = max(1, min(page_size or 20, 100))
-
-    start = (page - 1) * page_size
-    end = start + page_size
-    # Slicing marche sur QuerySet et list
-    items = qs[start:end]
-
-    pages = (total // page_size) + (1 if total % page_size else 0)
-    meta = {
-        "page": page,
-        "page_size": page_size,
-        "total": total,
-        "pages": pages,
-        "has_next": page < pages,
-        "has_prev": page > 1,
-    }
-    return items, meta
+    meta: {page, page_size, total, pages, has_next, has_prev, next_cursor, prev_cursor}
+    """
+    return keyset_paginate(qs, page, page_size, cursor=cursor)
 
 
 # ============================================================================
@@ -121,16 +83,8 @@ def _overview_context() -> Dict[str, Any]:
     Statistiques globales pour le DDE.
     Compatible avec un composant Preline (cards KPI + chart).
     """
-    nb_programs = Program.objects.filter(cycle="MASTER").count() if Program else 0
-    nb_semesters = Semester.objects.count()
-    nb_modules = ModuleUE.objects.count()
-    nb_students = MasterEnrollment.objects.values("student").distinct().count()
-    nb_teachers = InstructorAssignment.objects.values("instructor").distinct().count()
-    nb_exams = Exam.objects.count()
-
-    # Taux réussite approximatif (moyenne des moyennes, en attendant un calcul métier final)
-    avg_success = SemesterResult.objects.aggregate(avg=Avg("average_20"))["avg"] or 0.0
-    avg_success = round(float(avg_success), 2)
+    # KPI lus depuis le snapshot (1 requête, indépendant du volume des tables)
+    snapshot = kpi_snapshot.get_snapshot()
 
     # Top 8 modules par volume de devoirs (utile pour une table)
     # ⚠️ nécessite related_name="assignments" dans Assignment(module=...)
@@ -160,13 +114,13 @@ def _overview_context() -> Dict[str, Any]:
 
     return {
         "kpis": {
-            "nb_programs": nb_programs,
-            "nb_semesters": nb_semesters,
-            "nb_modules": nb_modules,
-            "nb_students": nb_students,
-            "nb_teachers": nb_teachers,
-            "nb_exams": nb_exams,
-            "avg_success": avg_success,
+            "nb_programs": snapshot.programs_count,
+            "nb_semesters": snapshot.semesters_count,
+            "nb_modules": snapshot.modules_count,
+            "nb_students": snapshot.students_count,
+            "nb_teachers": snapshot.teachers_count,
+            "nb_exams": snapshot.exams_count,
+            "avg_success": snapshot.avg_success,
         },
         "top_modules_by_assignments": top_modules,
         "exam_load": exam_load,
@@ -185,6 +139,7 @@ def _teachers_context(request) -> Dict[str, Any]:
     cohort_id = _get_int(request, "cohort_id")
     page = _get_int(request, "page", 1)
     page_size = _get_int(request, "page_size", 20)
+    cursor = _get_str(request, "cursor")
 
     qs = (
         InstructorAssignment.objects
@@ -207,7 +162,7 @@ def _teachers_context(request) -> Dict[str, Any]:
         )
 
     qs = qs.order_by("instructor__last_name", "instructor__first_name", "module__code")
-    items, meta = _paginate(qs, page, page_size)
+    items, meta = _paginate(qs, page, page_size, cursor)
 
     # programmes & cohortes (pour filtres dropdown)
     programs = Program.objects.filter(cycle="MASTER").order_by("title") if Program else []
@@ -231,6 +186,7 @@ def _students_context(request) -> Dict[str, Any]:
     status = _get_str(request, "status")  # ACTIVE / SUSPENDED / WITHDRAWN / COMPLETED
     page = _get_int(request, "page", 1)
     page_size = _get_int(request, "page_size", 20)
+    cursor = _get_str(request, "cursor")
 
     qs = (
         MasterEnrollment.objects
@@ -251,7 +207,7 @@ def _students_context(request) -> Dict[str, Any]:
             Q(student__email__icontains=search)
         )
 
-    items, meta = _paginate(qs, page, page_size)
+    items, meta = _paginate(qs, page, page_size, cursor)
 
     programs = Program.objects.filter(cycle="MASTER").order_by("title") if Program else []
     cohorts = Cohort.objects.order_by("-start_date")
@@ -273,6 +229,7 @@ def _programs_context(request) -> Dict[str, Any]:
     search = _get_str(request, "q")
     page = _get_int(request, "page", 1)
     page_size = _get_int(request, "page_size", 20)
+    cursor = _get_str(request, "cursor")
 
     if Program:
         qs = (
@@ -286,9 +243,12 @@ def _programs_context(request) -> Dict[str, Any]:
         )
         if search:
             qs = qs.filter(Q(title__icontains=search) | Q(code__icontains=search))
-        items, meta = _paginate(qs, page, page_size)
+        items, meta = _paginate(qs, page, page_size, cursor)
     else:
-        items, meta = [], {"page": 1, "page_size": 20, "total": 0, "pages": 0, "has_next": False, "has_prev": False}
+        items, meta = [], {
+            "page": 1, "page_size": 20, "total": 0, "pages": 0, "has_next": False, "has_prev": False,
+            "next_cursor": "", "prev_cursor": "",
+        }
 
     return {"programs": items, "meta": meta, "filters": {"q": search}}
 
@@ -302,6 +262,7 @@ def _modules_context(request) -> Dict[str, Any]:
     semester_id = _get_int(request, "semester_id")
     page = _get_int(request, "page", 1)
     page_size = _get_int(request, "page_size", 20)
+    cursor = _get_str(request, "cursor")
 
     qs = (
         ModuleUE.objects
@@ -325,7 +286,7 @@ def _modules_context(request) -> Dict[str, Any]:
             Q(semester__name__icontains=search) | Q(semester__program__title__icontains=search)
         )
 
-    items, meta = _paginate(qs, page, page_size)
+    items, meta = _paginate(qs, page, page_size, cursor)
 
     # Filtres
     programs = Program.objects.filter(cycle="MASTER").order_by("title") if Program else []
@@ -350,6 +311,7 @@ def _exams_context(request) -> Dict[str, Any]:
     cohort_id = _get_int(request, "cohort_id")
     page = _get_int(request, "page", 1)
     page_size = _get_int(request, "page_size", 20)
+    cursor = _get_str(request, "cursor")
 
     now = timezone.now()
 
@@ -366,7 +328,7 @@ def _exams_context(request) -> Dict[str, Any]:
     if search:
         qs = qs.filter(Q(title__icontains=search) | Q(semester__name__icontains=search))
 
-    items, meta = _paginate(qs, page, page_size)
+    items, meta = _paginate(qs, page, page_size, cursor)
 
     upcoming = [e for e in items if (e.start_at and e.start_at >= now)]
     past = [e for e in items if (not e.start_at) or (e.start_at < now)]
@@ -394,6 +356,7 @@ def _results_context(request) -> Dict[str, Any]:
     decision = _get_str(request, "decision")  # ADM / AJ / RAT / EXC
     page = _get_int(request, "page", 1)
     page_size = _get_int(request, "page_size", 20)
+    cursor = _get_str(request, "cursor")
 
     qs = (
         SemesterResult.objects
@@ -408,13 +371,10 @@ def _results_context(request) -> Dict[str, Any]:
     if decision:
         qs = qs.filter(decision=decision)
 
-    items, meta = _paginate(qs, page, page_size)
+    items, meta = _paginate(qs, page, page_size, cursor)
 
-    # KPIs rapides
-    total = qs.count()
-    admitted = qs.filter(decision="ADM").count()
-    success_rate = round((admitted / total) * 100.0, 2) if total else 0.0
-    avg_global = qs.aggregate(avg=Avg("average_20"))["avg"] or 0.0
+    # KPIs rapides (1 aggregate, mis en cache par combinaison de filtres)
+    kpis = results_kpis(program_id=program_id, cohort_id=cohort_id, decision=decision)
 
     programs = Program.objects.filter(cycle="MASTER").order_by("title") if Program else []
     cohorts = Cohort.objects.order_by("-start_date")
@@ -423,7 +383,7 @@ def _results_context(request) -> Dict[str, Any]:
     return {
         "results": items,
         "meta": meta,
-        "kpis": {"success_rate": success_rate, "avg_global": round(float(avg_global), 2)},
+        "kpis": {"success_rate": kpis["success_rate"], "avg_global": kpis["avg_global"]},
         "programs": programs,
         "cohorts": cohorts,
         "decisions": decisions,
@@ -623,7 +583,7 @@ def director_fragment_switch(request, section: str) -> HttpResponse:
     Utilisation front :
       fetch(`/master/director/fragment/overview/`).then(html => ...)
     """
-    if not _is_director(request.user):
+    if not has_director_access(request.user):
         return HttpResponseBadRequest("⛔ Accès réservé au Directeur des Études.")
 
     templates = {
@@ -712,15 +672,8 @@ def director_fragment_switch(request, section: str) -> HttpResponse:
         """
         from django.db.models import Count, Avg
 
-        # Indicateurs principaux
-        nb_students = MasterEnrollment.objects.count()
-        nb_teachers = InstructorAssignment.objects.values("instructor").distinct().count()
-        nb_modules = ModuleUE.objects.count()
-        nb_exams = Exam.objects.count()
-
-        # Moyenne de réussite (basée sur les résultats de semestre)
-        avg_success = SemesterResult.objects.aggregate(avg=Avg("average_20"))["avg"] or 0
-        avg_success = round(float(avg_success), 2)
+        # Indicateurs principaux (snapshot KPI)
+        snapshot = kpi_snapshot.get_snapshot()
 
         # Répartition des examens par semestre
         exams_by_semester = (
@@ -736,11 +689,11 @@ def director_fragment_switch(request, section: str) -> HttpResponse:
         )
 
         ctx.update({
-            "nb_students": nb_students,
-            "nb_teachers": nb_teachers,
-            "nb_modules": nb_modules,
-            "nb_exams": nb_exams,
-            "avg_success": avg_success,
+            "nb_students": snapshot.enrollments_count,
+            "nb_teachers": snapshot.teachers_count,
+            "nb_modules": snapshot.modules_count,
+            "nb_exams": snapshot.exams_count,
+            "avg_success": snapshot.avg_success,
             "exams_by_semester": exams_by_semester,
             "top_modules": top_modules,
         })
@@ -1,9 +1,37 @@
 # masters/views/media_proxy.py
-import requests
+"""
+Relais des vidéos de leçons hébergées chez un tiers.
+
+Le client envoie `Range` (lecture, seek) : on répond 206 avec la plage
+demandée, lue bloc par bloc depuis le cache disque (core.utils.http_range).
+Les vues répétées d'une même vidéo sont servies localement ; l'amont n'est
+sollicité qu'une fois par bloc, via une session HTTP partagée.
+"""
 from urllib.parse import urlparse
-from django.http import StreamingHttpResponse, HttpResponseBadRequest
 
-ALLOWED_VIDEO_HOSTS = {"www.w3schools.com", "your.cdn.com"}  # à compléter
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+
+from core.utils.http_range import RangeNotSatisfiable, RangeProxy, UpstreamError, parse_range
+
+ALLOWED_VIDEO_HOSTS = {"www.w3schools.com", "your.cdn.com"}  # à compléter (ou VIDEO_PROXY_ALLOWED_HOSTS)
+
+_proxy = None
+
+
+def get_proxy() -> RangeProxy:
+    global _proxy
+    if _proxy is None:
+        _proxy = RangeProxy()
+    return _proxy
+
+
+def _cors(resp):
+    # autoriser ton front
+    resp["Access-Control-Allow-Origin"] = "*"
+    resp["Access-Control-Expose-Headers"] = "Content-Length, Content-Range, Accept-Ranges"
+    return resp
+
 
 def video_proxy(request):
     url = request.GET.get("url", "")
@@ -11,23 +39,43 @@ def video_proxy(request):
         return HttpResponseBadRequest("missing url")
 
     host = urlparse(url).netloc.lower()
-    if host not in ALLOWED_VIDEO_HOSTS:
+    if host not in getattr(settings, "VIDEO_PROXY_ALLOWED_HOSTS", ALLOWED_VIDEO_HOSTS):
         return HttpResponseBadRequest("host not allowed")
 
+    proxy = get_proxy()
     try:
-        r = requests.get(url, stream=True, timeout=15, headers={"User-Agent":"ESFe/1.0"})
-    except Exception:
-        return HttpResponseBadRequest("upstream error")
+        info = proxy.info(url)
+    except UpstreamError:
+        return _cors(HttpResponse("upstream error", status=502, content_type="text/plain"))
+    content_type = info["content_type"] or "video/mp4"
+    size = info["size"]
 
-    resp = StreamingHttpResponse(r.iter_content(chunk_size=64*1024),
-                                 status=r.status_code, content_type=r.headers.get("Content-Type","video/mp4"))
-    # autoriser ton front
-    resp["Access-Control-Allow-Origin"] = "*"
-    # permettre le seek
-    if "Content-Length" in r.headers:
-        resp["Content-Length"] = r.headers["Content-Length"]
-    if "Accept-Ranges" in r.headers:
-        resp["Accept-Ranges"] = r.headers["Accept-Ranges"]
+    # Amont sans plages : simple relais, pas de seek possible
+    if not info["ranges"]:
+        resp = StreamingHttpResponse(proxy.iter_all(url), content_type=content_type)
+        if size is not None:
+            resp["Content-Length"] = str(size)
+        resp["Accept-Ranges"] = "none"
+        return _cors(resp)
+
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except RangeNotSatisfiable:
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+        return _cors(resp)
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
     else:
-        resp["Accept-Ranges"] = "bytes"
-    return resp
+        (start, end), status = byte_range, 206
+
+    resp = StreamingHttpResponse(
+        proxy.iter_range(url, start, end) if size else iter(()),
+        status=status, content_type=content_type,
+    )
+    resp["Content-Length"] = str(end - start + 1 if size else 0)
+    resp["Accept-Ranges"] = "bytes"
+    if status == 206:
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return _cors(resp)
@@ -1,6 +1,40 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import post_migrate
+
+
+def ensure_message_fts(using="default", **kwargs):
+    """Après chaque `migrate` : triggers FTS recréés si une reconstruction de table les a supprimés."""
+    from django.db import connections
+    from .fts import ensure_fts
+
+    restored = ensure_fts(connections[using])
+    if restored:
+        print(f"[FTS] Triggers recréés et index reconstruit : {', '.join(restored)}")
+
+
+def check_message_fts(app_configs=None, databases=None, **kwargs):
+    from django.db import connections
+    from .fts import missing_triggers
+
+    errors = []
+    for alias in databases or []:
+        missing = missing_triggers(connections[alias])
+        if missing:
+            errors.append(checks.Error(
+                f"Triggers FTS absents sur messenger_message ({', '.join(missing)}) : "
+                "les nouveaux messages ne sont plus indexés.",
+                hint="Lancer `python manage.py migrate` (le signal post_migrate les recrée).",
+                id="messenger.E001",
+            ))
+    return errors
 
 
 class MessengerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'messenger'
+
+    def ready(self):
+        import messenger.signals
+        post_migrate.connect(ensure_message_fts, sender=self)
+        checks.register(check_message_fts, checks.Tags.database)
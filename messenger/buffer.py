@@ -0,0 +1,228 @@
+# messenger/buffer.py
+"""
+Écriture différée (write-behind) des messages de chat reçus par WebSocket.
+
+Le consumer diffuse le message au groupe immédiatement (un seul saut de
+channel layer), puis le confie à ce tampon par processus. Le tampon écrit
+par lots avec bulk_create toutes les MESSENGER_FLUSH_MS millisecondes ou dès
+MESSENGER_FLUSH_SIZE messages, puis :
+  - diffuse {"event": "ack", "ids": {client_id: id}} aux conversations
+    concernées (les clients connaissent alors l'id en base, utile au "sync") ;
+  - met en file la tâche "messenger.notify_new_messages" (notifications hors
+    du chemin critique).
+
+(expéditeur, client_id) est unique : un message renvoyé par un client après
+coupure n'est pas dupliqué, et le client_id d'un autre utilisateur ne masque rien. Un arrêt brutal du processus peut perdre au plus la
+fenêtre en cours (quelques millisecondes de messages).
+
+Les accusés de lecture ("seen") suivent le même principe : un seul
+horodatage retenu par (conversation, utilisateur), écrit toutes les
+MESSENGER_RECEIPT_FLUSH_SECONDS secondes en un UPDATE groupé de
+ConversationParticipant.last_read_at.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DateTimeField, Q, Value, When
+
+from core.jobs import enqueue
+from .models import ConversationParticipant, Message
+
+MAX_FLUSH_ATTEMPTS = 3
+
+
+def _valid_rows(rows: list) -> tuple:
+    """Écarte les lignes dont la conversation ou l'expéditeur (participant) a disparu depuis la diffusion."""
+    members = set(
+        ConversationParticipant.objects.filter(
+            conversation_id__in={row["conversation_id"] for row in rows},
+            user_id__in={row["sender_id"] for row in rows},
+        ).values_list("conversation_id", "user_id")
+    )
+    valid, dropped = [], []
+    for row in rows:
+        key = (uuid.UUID(str(row["conversation_id"])), row["sender_id"])
+        (valid if key in members else dropped).append(row)
+    return valid, dropped
+
+
+def _insert(rows: list) -> list:
+    """bulk_create du lot ; sur IntegrityError (suppression concurrente), ligne par ligne. Retourne les rejetées."""
+    messages = [
+        Message(
+            conversation_id=row["conversation_id"],
+            sender_id=row["sender_id"],
+            text=row["text"],
+            client_id=row["client_id"],
+        )
+        for row in rows
+    ]
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(messages, ignore_conflicts=True)
+        return []
+    except IntegrityError:
+        pass
+    rejected = []
+    for row, message in zip(rows, messages):
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create([message], ignore_conflicts=True)
+        except IntegrityError:
+            rejected.append(row)
+    return rejected
+
+
+def _sent_by(rows: list):
+    """Messages déjà écrits pour les couples (expéditeur, client_id) du lot."""
+    pairs = Q()
+    for row in rows:
+        pairs |= Q(sender_id=row["sender_id"], client_id=row["client_id"])
+    return Message.objects.filter(pairs)
+
+
+def persist_batch(rows: list) -> dict:
+    """Insère le lot et retourne {conversation_id: {client_id: id}} (synchrone)."""
+    # Renvois d'un client (même expéditeur, même client_id) : acquittés mais pas renotifiés
+    known = set(_sent_by(rows).values_list("sender_id", "client_id"))
+    fresh, dropped = _valid_rows([row for row in rows if (row["sender_id"], row["client_id"]) not in known])
+    # Une ligne invalide ne doit pas faire perdre les autres messages du lot
+    dropped += _insert(fresh) if fresh else []
+    if dropped:
+        print(
+            f"[CHAT-BUFFER] ⚠️ {len(dropped)} message(s) écarté(s) (conversation ou participant supprimé) : "
+            + ", ".join(f"{row['client_id']} (conv {row['conversation_id']}, user {row['sender_id']})" for row in dropped)
+        )
+    saved = _sent_by(rows).values_list("conversation_id", "sender_id", "client_id", "id")
+
+    acks = defaultdict(dict)
+    message_ids = []
+    for conversation_id, sender_id, client_id, message_id in saved:
+        acks[str(conversation_id)][str(client_id)] = message_id
+        if (sender_id, client_id) not in known:
+            message_ids.append(message_id)
+
+    if message_ids:
+        enqueue("messenger.notify_new_messages", {"message_ids": message_ids})
+    return dict(acks)
+
+
+class MessageWriteBuffer:
+    def __init__(self, flush_ms: int, max_size: int):
+        self.flush_ms = flush_ms
+        self.max_size = max_size
+        self._pending = []
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, conversation_id, sender_id, text, client_id) -> None:
+        """Chemin critique : aucune E/S, seulement la planification du prochain lot."""
+        self._pending.append({
+            "conversation_id": conversation_id,
+            "sender_id": sender_id,
+            "text": text,
+            "client_id": uuid.UUID(str(client_id)),
+            "attempts": 0,
+        })
+        if len(self._pending) >= self.max_size:
+            asyncio.ensure_future(self.flush())
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_ms / 1000, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        try:
+            acks = await database_sync_to_async(persist_batch)(batch)
+        except Exception as e:
+            retry = [row for row in batch if row["attempts"] + 1 < MAX_FLUSH_ATTEMPTS]
+            lost = [str(row["client_id"]) for row in batch if row["attempts"] + 1 >= MAX_FLUSH_ATTEMPTS]
+            for row in retry:
+                row["attempts"] += 1
+            self._pending[:0] = retry
+            print(f"[CHAT-BUFFER] ⚠️ Écriture du lot impossible ({len(batch)} msg, {len(retry)} remis) : {e}")
+            if lost:
+                print(f"[CHAT-BUFFER] ⚠️ Messages abandonnés après {MAX_FLUSH_ATTEMPTS} essais : {', '.join(lost)}")
+            if self._pending and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.flush_ms / 1000 * 10, lambda: asyncio.ensure_future(self.flush())
+                )
+            return
+
+        layer = get_channel_layer()
+        for conversation_id, ids in acks.items():
+            await layer.group_send(
+                f"chat_{conversation_id}",
+                {"type": "chat_event", "payload": {"event": "ack", "ids": ids}},
+            )
+
+
+def persist_receipts(receipts: dict) -> int:
+    """{(conversation_id, user_id): datetime} → un seul UPDATE (synchrone)."""
+    match = Q()
+    whens = []
+    for (conversation_id, user_id), seen_at in receipts.items():
+        match |= Q(conversation_id=conversation_id, user_id=user_id)
+        whens.append(When(conversation_id=conversation_id, user_id=user_id, then=Value(seen_at)))
+    return ConversationParticipant.objects.filter(match).update(
+        last_read_at=Case(*whens, default="last_read_at", output_field=DateTimeField())
+    )
+
+
+class ReadReceiptBuffer:
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._pending = {}
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def mark(self, conversation_id, user_id, seen_at) -> None:
+        """Chemin critique : le dernier "seen" d'un utilisateur remplace le précédent."""
+        key = (str(conversation_id), user_id)
+        if key not in self._pending or self._pending[key] < seen_at:
+            self._pending[key] = seen_at
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_seconds, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        try:
+            await database_sync_to_async(persist_receipts)(batch)
+        except Exception as e:
+            # Non critique : un "seen" plus récent remplacera celui-ci
+            for key, seen_at in batch.items():
+                if key not in self._pending:
+                    self._pending[key] = seen_at
+            print(f"[CHAT-BUFFER] ⚠️ Accusés de lecture non écrits ({len(batch)}) : {e}")
+
+
+write_buffer = MessageWriteBuffer(
+    flush_ms=getattr(settings, "MESSENGER_FLUSH_MS", 50),
+    max_size=getattr(settings, "MESSENGER_FLUSH_SIZE", 100),
+)
+
+receipt_buffer = ReadReceiptBuffer(
+    flush_seconds=getattr(settings, "MESSENGER_RECEIPT_FLUSH_SECONDS", 3),
+)
@@ -1,8 +1,12 @@
 import json
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from .models import ConversationParticipant, Message
+from django.utils import timezone
+from .buffer import receipt_buffer, write_buffer
+from .models import ConversationParticipant
+from .utils import messages_since, serialize_message
 
 
 @database_sync_to_async
@@ -13,21 +17,26 @@ def is_member(conv_id, user_id):
 
 
 @database_sync_to_async
-def create_message(conv_id, user, text):
-    m = Message.objects.create(conversation_id=conv_id, sender=user, text=text)
-    return {
-        "id": m.id,
-        "text": m.text,
-        "sender_id": user.id,
-        "sender_name": user.get_full_name() or user.username,
-        "created_at": m.created_at.isoformat(),
-    }
+def missed_messages(conv_id, last_id):
+    rows, truncated = messages_since(conv_id, last_id)
+    return [serialize_message(m) for m in rows], truncated
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     """
     WebSocket /ws/chat/<conversation_id>/
-    Diffuse les messages + peut servir pour le “seen”
+    Diffuse les messages, les accusés de lecture et l'indicateur de saisie
+    {"type": "sync", "last_id": N} → {"event": "sync", "messages": [...], "truncated": bool}
+
+    Envoi : {"type": "message", "text": "...", "client_id": "<uuid>"} est diffusé
+    tout de suite (id = null), puis écrit par lots (voir messenger.buffer) ;
+    {"event": "ack", "ids": {client_id: id}} suit l'écriture.
+    L'appartenance est vérifiée à la connexion, puis révoquée par poussée
+    (suppression du ConversationParticipant → fermeture 4003).
+
+    {"type": "typing"} → {"event": "typing", "user_id", "sender_name"} relayé sans base.
+    {"type": "seen", "last_id": N} → {"event": "seen", "user_id", "last_id"} relayé ;
+    last_read_at est écrit par lots (voir messenger.buffer.receipt_buffer).
     """
 
     async def connect(self):
@@ -44,11 +53,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close(code=4003)
             return
 
+        self.user = user
+        self.sender_name = user.get_full_name() or user.username
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
     async def disconnect(self, code):
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        # Ne pas laisser dormir les messages de ce client dans le tampon
+        if len(write_buffer):
+            await write_buffer.flush()
+        if len(receipt_buffer):
+            await receipt_buffer.flush()
 
     async def receive(self, text_data=None, bytes_data=None):
         data = json.loads(text_data or "{}")
@@ -58,17 +74,67 @@ class ChatConsumer(AsyncWebsocketConsumer):
             text = (data.get("text") or "").strip()
             if not text:
                 return
-            user = self.scope["user"]
-            payload = await create_message(self.conv_id, user, text)
-            payload["event"] = "message"
+            try:
+                client_id = str(uuid.UUID(str(data.get("client_id"))))
+            except ValueError:
+                client_id = str(uuid.uuid4())
+
+            # 1) diffusion immédiate  2) écriture différée par lots
+            payload = {
+                "event": "message",
+                "id": None,
+                "client_id": client_id,
+                "text": text,
+                "sender_id": self.user.id,
+                "sender_name": self.sender_name,
+                "created_at": timezone.now().isoformat(),
+                "file": "",
+            }
             await self.channel_layer.group_send(
                 self.group_name,
                 {"type": "chat_event", "payload": payload}
             )
+            write_buffer.add(self.conv_id, self.user.id, text, client_id)
+
+        elif msg_type == "typing":
+            await self.channel_layer.group_send(self.group_name, {
+                "type": "chat_event",
+                "payload": {"event": "typing", "user_id": self.user.id, "sender_name": self.sender_name},
+            })
+
+        elif msg_type == "seen":
+            receipt_buffer.mark(self.conv_id, self.user.id, timezone.now())
+            try:
+                last_id = int(data.get("last_id"))
+            except (TypeError, ValueError):
+                last_id = None
+            await self.channel_layer.group_send(self.group_name, {
+                "type": "chat_event",
+                "payload": {"event": "seen", "user_id": self.user.id, "last_id": last_id},
+            })
+
+        elif msg_type == "sync":
+            # Reconnexion : uniquement les messages manqués depuis le dernier vu
+            try:
+                last_id = int(data.get("last_id"))
+            except (TypeError, ValueError):
+                return
+            messages, truncated = await missed_messages(self.conv_id, last_id)
+            await self.send(text_data=json.dumps({
+                "event": "sync",
+                "messages": messages,
+                "truncated": truncated,
+            }))
 
     async def chat_event(self, event):
         await self.send(text_data=json.dumps(event["payload"]))
 
+    async def membership_revoked(self, event):
+        """Poussé par messenger.signals quand un participant est retiré."""
+        if event.get("user_id") == self.user.id:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self.close(code=4003)
+
 
 # Pour la signalisation WebRTC
 class CallSignalingConsumer(AsyncWebsocketConsumer):
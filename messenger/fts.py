@@ -0,0 +1,81 @@
+# messenger/fts.py
+"""
+Index plein texte des messages (SQLite FTS5) : table `messenger_message_fts`
+à contenu externe, tenue à jour par trois triggers sur `messenger_message`.
+
+Attention : sous SQLite, un AlterField sur Message reconstruit la table
+(copie + DROP + RENAME) et supprime silencieusement ses triggers. D'où :
+  - `ensure_fts()` appelé par toute migration qui modifie Message, après
+    l'opération (voir 0005) ;
+  - un contrôle après chaque `migrate` (signal post_migrate, apps.py) qui
+    recrée ce qui manque et reconstruit l'index ;
+  - un contrôle système (messenger.E001) si les triggers manquent.
+Sur un autre moteur, rien n'est fait (messenger.search se replie sur icontains).
+"""
+FTS_TABLE = "messenger_message_fts"
+
+TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        content='messenger_message',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+# Triggers : couvrent aussi bulk_create (tampon d'écriture) et les UPDATE en masse
+TRIGGERS_SQL = {
+    "messenger_message_fts_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS messenger_message_fts_ai AFTER INSERT ON messenger_message BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+    "messenger_message_fts_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS messenger_message_fts_ad AFTER DELETE ON messenger_message BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """,
+    "messenger_message_fts_au": f"""
+        CREATE TRIGGER IF NOT EXISTS messenger_message_fts_au AFTER UPDATE OF text ON messenger_message BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END
+    """,
+}
+
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def _tables(connection) -> set:
+    return set(connection.introspection.table_names())
+
+
+def missing_triggers(connection) -> list:
+    """Triggers absents (liste vide hors SQLite ou si la table Message n'existe pas encore)."""
+    if connection.vendor != "sqlite" or "messenger_message" not in _tables(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'messenger_message'"
+        )
+        present = {row[0] for row in cursor.fetchall()}
+    return [name for name in TRIGGERS_SQL if name not in present]
+
+
+def ensure_fts(connection, rebuild: bool = False) -> list:
+    """
+    Recrée la table FTS et les triggers manquants ; reconstruit l'index si
+    quelque chose manquait (messages écrits sans trigger) ou si `rebuild`.
+    Retourne les triggers recréés.
+    """
+    if connection.vendor != "sqlite" or "messenger_message" not in _tables(connection):
+        return []
+    missing = missing_triggers(connection)
+    table_missing = FTS_TABLE not in _tables(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(TABLE_SQL)
+        for name in missing:
+            cursor.execute(TRIGGERS_SQL[name])
+        if missing or table_missing or rebuild:
+            cursor.execute(REBUILD_SQL)
+    return missing
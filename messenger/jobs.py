@@ -0,0 +1,48 @@
+# messenger/jobs.py
+"""
+Tâches de la file core.Job pour la messagerie (exécutées par `manage.py run_jobs`).
+"""
+from django.urls import reverse
+
+from core.jobs import job
+from notifications.models import Notification
+from .models import ConversationParticipant, Message
+
+
+@job("messenger.notify_new_messages")
+def notify_new_messages(message_ids):
+    """
+    Une notification par (destinataire, conversation) pour un lot de messages :
+    l'expéditeur et les participants en sourdine ne sont pas notifiés.
+    """
+    messages = (
+        Message.objects
+        .filter(pk__in=message_ids)
+        .select_related("sender")
+        .order_by("conversation_id", "-created_at")
+    )
+    # Dernier message de chaque conversation + expéditeurs du lot
+    latest, senders = {}, {}
+    for m in messages:
+        latest.setdefault(m.conversation_id, m)
+        senders.setdefault(m.conversation_id, set()).add(m.sender_id)
+    if not latest:
+        return
+
+    participants = (
+        ConversationParticipant.objects
+        .filter(conversation_id__in=latest.keys(), is_muted=False)
+        .values_list("conversation_id", "user_id")
+    )
+    for conversation_id, user_id in participants:
+        if user_id in senders[conversation_id]:
+            continue
+        m = latest[conversation_id]
+        name = (m.sender.get_full_name() or m.sender.username) if m.sender else "Quelqu'un"
+        Notification.objects.create(
+            recipient_id=user_id,
+            sender_id=m.sender_id,
+            message=f"{name} : {m.text[:120]}" if m.text else f"{name} a envoyé un fichier",
+            notif_type="info",
+            url=reverse("messenger:chat_room", args=[conversation_id]),
+        )
@@ -0,0 +1,87 @@
+# messenger/management/commands/bench_message_search.py
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from messenger.fts import missing_triggers
+from messenger.models import Conversation, ConversationParticipant, Message
+from messenger.search import search_messages
+
+User = get_user_model()
+
+WORDS = (
+    "cours examen note module leçon devoir stage mémoire soutenance planning salle "
+    "professeur étudiant inscription paiement bibliothèque"
+).split()
+QUERIES = ["examen", "soutenance mém", "w12345", "zzzz", "cours"]
+BENCH_PREFIX = "bench-search"
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge un corpus de messages (défaut : 1 000 000) puis mesure messenger.search. "
+        "À lancer sur une base jetable : les données restent sauf --cleanup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1_000_000, help="Messages à créer.")
+        parser.add_argument("--conversations", type=int, default=2000, help="Conversations du corpus.")
+        parser.add_argument("--member-of", type=int, default=50, help="Conversations de l'utilisateur mesuré.")
+        parser.add_argument("--batch", type=int, default=10_000, help="Taille des lots bulk_create.")
+        parser.add_argument("--runs", type=int, default=5, help="Mesures par requête (médiane).")
+        parser.add_argument("--cleanup", action="store_true", help="Supprime le corpus à la fin.")
+
+    def handle(self, *args, **options):
+        if missing_triggers(connection):
+            self.stderr.write(self.style.ERROR("Triggers FTS absents : lancer `migrate` d'abord."))
+            return
+
+        reader, _ = User.objects.get_or_create(username=f"{BENCH_PREFIX}-reader", defaults={"role": "SECRETAIRE"})
+        writer, _ = User.objects.get_or_create(username=f"{BENCH_PREFIX}-writer", defaults={"role": "SECRETAIRE"})
+        convs = Conversation.objects.bulk_create(
+            [Conversation(title=f"{BENCH_PREFIX} {i}") for i in range(options["conversations"])]
+        )
+        ConversationParticipant.objects.bulk_create(
+            [ConversationParticipant(conversation=c, user=reader) for c in convs[:options["member_of"]]]
+        )
+
+        # Insertions par bulk_create : même chemin que le tampon d'écriture (triggers FTS)
+        started = time.perf_counter()
+        remaining = options["count"]
+        with transaction.atomic():
+            while remaining > 0:
+                size = min(options["batch"], remaining)
+                Message.objects.bulk_create([
+                    Message(
+                        conversation=random.choice(convs),
+                        sender=writer,
+                        text=" ".join(random.choices(WORDS, k=8)) + f" w{random.randint(0, 99999)}",
+                    )
+                    for _ in range(size)
+                ])
+                remaining -= size
+        self.stdout.write(f"Corpus : {options['count']} message(s) en {time.perf_counter() - started:.1f} s")
+
+        for query in QUERIES:
+            first, second, hits = [], [], 0
+            for _ in range(options["runs"]):
+                t = time.perf_counter()
+                results, cursor = search_messages(reader, query)
+                first.append((time.perf_counter() - t) * 1000)
+                hits = len(results)
+                if cursor:
+                    t = time.perf_counter()
+                    search_messages(reader, query, cursor=cursor)
+                    second.append((time.perf_counter() - t) * 1000)
+            line = f"{query!r:18} {hits:3} résultat(s)  page 1 : {sorted(first)[len(first) // 2]:7.1f} ms"
+            if second:
+                line += f"  page 2 : {sorted(second)[len(second) // 2]:7.1f} ms"
+            self.stdout.write(line)
+
+        if options["cleanup"]:
+            Conversation.objects.filter(title__startswith=BENCH_PREFIX).delete()
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            self.stdout.write("Corpus supprimé.")
@@ -0,0 +1,22 @@
+# messenger/media_rules.py
+"""Pièces jointes et enregistrements d'appel : participants de la conversation (voir core.media)."""
+from core.media import media_rule
+from .models import CallSession, ConversationParticipant, Message
+
+
+@media_rule("messenger/files/")
+def message_file_access(user, name):
+    return ConversationParticipant.objects.filter(
+        user=user,
+        conversation_id__in=Message.objects.filter(file=name).values("conversation_id"),
+    ).exists()
+
+
+@media_rule("messenger/records/")
+def call_record_access(user, name):
+    calls = CallSession.objects.filter(local_file=name)
+    if calls.filter(host=user).exists():
+        return True
+    return ConversationParticipant.objects.filter(
+        user=user, conversation_id__in=calls.values("conversation_id")
+    ).exists()
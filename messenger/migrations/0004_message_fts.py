@@ -0,0 +1,61 @@
+# Index plein texte des messages (SQLite FTS5), tenu à jour par triggers.
+# Sur un autre moteur, la migration ne fait rien (voir messenger.search).
+
+from django.db import migrations
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messenger_message_fts USING fts5(
+        text,
+        content='messenger_message',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Triggers : couvrent aussi bulk_create (tampon d'écriture) et les UPDATE en masse
+    """
+    CREATE TRIGGER IF NOT EXISTS messenger_message_fts_ai AFTER INSERT ON messenger_message BEGIN
+        INSERT INTO messenger_message_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messenger_message_fts_ad AFTER DELETE ON messenger_message BEGIN
+        INSERT INTO messenger_message_fts(messenger_message_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messenger_message_fts_au AFTER UPDATE OF text ON messenger_message BEGIN
+        INSERT INTO messenger_message_fts(messenger_message_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO messenger_message_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    # Messages existants
+    "INSERT INTO messenger_message_fts(messenger_message_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS messenger_message_fts_au",
+    "DROP TRIGGER IF EXISTS messenger_message_fts_ad",
+    "DROP TRIGGER IF EXISTS messenger_message_fts_ai",
+    "DROP TABLE IF EXISTS messenger_message_fts",
+]
+
+
+def _run(statements):
+    def apply(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0003_message_client_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FTS_SQL), _run(DROP_SQL)),
+    ]
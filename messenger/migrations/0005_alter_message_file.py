@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:45
+
+import core.storage
+from django.db import migrations, models
+
+
+def restore_fts(apps, schema_editor):
+    # SQLite : l'AlterField reconstruit messenger_message et supprime les triggers FTS
+    from messenger.fts import ensure_fts
+
+    ensure_fts(schema_editor.connection, rebuild=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0004_message_fts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='file',
+            field=models.FileField(blank=True, storage=core.storage.DedupStorage(), upload_to='messenger/files/'),
+        ),
+        migrations.RunPython(restore_fts, migrations.RunPython.noop),
+    ]
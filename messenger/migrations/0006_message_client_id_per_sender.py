@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0005_alter_message_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='client_id',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='message',
+            unique_together={('sender', 'client_id')},
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from core.storage import dedup_storage
+
 User = settings.AUTH_USER_MODEL
 
 
@@ -83,6 +85,8 @@ class ConversationParticipant(models.Model):
 
 class Message(models.Model):
     """Messages échangés dans une conversation."""
+    # SQLite : toute migration qui modifie ce modèle reconstruit la table et perd les
+    # triggers FTS → terminer la migration par RunPython(ensure_fts) (voir messenger/fts.py)
     conversation = models.ForeignKey(
         Conversation,
         on_delete=models.CASCADE,
@@ -94,12 +98,17 @@ class Message(models.Model):
         related_name="sent_messages"
     )
     text = models.TextField(blank=True)
-    file = models.FileField(upload_to="messenger/files/", blank=True)
+    file = models.FileField(upload_to="messenger/files/", blank=True, storage=dedup_storage)
+    # Identifiant généré par le client (WebSocket) : idempotence de l'écriture différée,
+    # unique par expéditeur (un client ne peut pas écraser ni masquer le message d'un autre)
+    client_id = models.UUIDField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["created_at", "id"]
+        indexes = [models.Index(fields=["conversation", "created_at"])]
+        unique_together = (("sender", "client_id"),)
 
     def __str__(self):
         return f"{self.sender}: {self.text[:40]}"
@@ -0,0 +1,130 @@
+# messenger/search.py
+"""
+Recherche plein texte dans les messages, limitée aux conversations de
+l'utilisateur.
+
+SQLite : table virtuelle FTS5 `messenger_message_fts` (migration 0004),
+alimentée par triggers — y compris pour les insertions en masse du tampon
+d'écriture. Les extraits surlignés viennent de snippet() ; le texte est
+échappé avant d'insérer les <mark>.
+Autre moteur : repli sur icontains (même contrat, extrait calculé en Python).
+
+Résultats du plus récent au plus ancien ; curseur opaque (signé) sur l'id.
+"""
+import re
+
+from django.core import signing
+from django.db import connection
+from django.utils.html import escape
+
+from .models import ConversationParticipant, Message
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+MIN_QUERY_LENGTH = 2
+CURSOR_SALT = "messenger.search.cursor"
+SNIPPET_TOKENS = 12
+
+# Délimiteurs temporaires (zone à usage privé) : jamais présents dans un message
+_HL_START, _HL_END = "\ue000", "\ue001"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_query(query: str) -> str:
+    """Saisie libre → requête FTS5 sûre : chaque mot en préfixe, tous requis."""
+    return " ".join(f'"{word}"*' for word in _WORD.findall(query)[:8])
+
+
+def _highlight(raw: str) -> str:
+    return escape(raw).replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+def _python_snippet(text: str, query: str) -> str:
+    words = _WORD.findall(query)
+    lowered = text.lower()
+    pos = min((p for p in (lowered.find(w.lower()) for w in words) if p >= 0), default=0)
+    start = max(0, pos - 40)
+    excerpt = ("…" if start else "") + text[start:start + 160] + ("…" if start + 160 < len(text) else "")
+    for word in words:
+        excerpt = re.sub(f"(?i)({re.escape(word)}\\w*)", f"{_HL_START}\\1{_HL_END}", excerpt)
+    return _highlight(excerpt)
+
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return int(signing.loads(cursor, salt=CURSOR_SALT))
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def _fts_page(user_id, query, before_id, limit):
+    """[(message_id, extrait)] via FTS5 : parcours de l'index par rowid décroissant."""
+    before = "AND messenger_message_fts.rowid < %s" if before_id else ""
+    sql = f"""
+        SELECT m.id, snippet(messenger_message_fts, 0, %s, %s, '…', {SNIPPET_TOKENS})
+        FROM messenger_message_fts
+        JOIN messenger_message m ON m.id = messenger_message_fts.rowid
+        WHERE messenger_message_fts MATCH %s
+          AND m.conversation_id IN (
+              SELECT conversation_id FROM messenger_conversationparticipant WHERE user_id = %s
+          )
+          {before}
+        ORDER BY messenger_message_fts.rowid DESC
+        LIMIT %s
+    """
+    params = [_HL_START, _HL_END, _fts_query(query), user_id]
+    if before_id:
+        params.append(before_id)
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(message_id, _highlight(raw or "")) for message_id, raw in cursor.fetchall()]
+
+
+def _fallback_page(user_id, query, before_id, limit):
+    qs = Message.objects.filter(
+        conversation_id__in=ConversationParticipant.objects.filter(user_id=user_id).values("conversation_id")
+    )
+    for word in _WORD.findall(query)[:8]:
+        qs = qs.filter(text__icontains=word)
+    if before_id:
+        qs = qs.filter(pk__lt=before_id)
+    rows = qs.order_by("-id").values_list("id", "text")[:limit]
+    return [(message_id, _python_snippet(text, query)) for message_id, text in rows]
+
+
+def search_messages(user, query, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Retourne (résultats, curseur suivant ou "").
+    Résultat : {id, conversation_id, conversation_title, sender_id, sender_name, created_at, snippet}
+    """
+    query = (query or "").strip()
+    if len(query) < MIN_QUERY_LENGTH or not _WORD.search(query):
+        return [], ""
+    limit = max(1, min(int(limit), MAX_SEARCH_PAGE_SIZE))
+    before_id = _decode_cursor(cursor)
+
+    page = _fts_page if connection.vendor == "sqlite" else _fallback_page
+    rows = page(user.id, query, before_id, limit + 1)
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    messages = Message.objects.select_related("sender", "conversation").in_bulk([r[0] for r in rows])
+    results = []
+    for message_id, snippet in rows:
+        m = messages.get(message_id)
+        if m is None:
+            continue
+        results.append({
+            "id": m.id,
+            "conversation_id": str(m.conversation_id),
+            "conversation_title": m.conversation.title,
+            "sender_id": m.sender_id,
+            "sender_name": m.sender.get_full_name() or m.sender.username,
+            "created_at": m.created_at.isoformat(),
+            "snippet": snippet,
+        })
+    next_cursor = signing.dumps(rows[-1][0], salt=CURSOR_SALT) if has_next else ""
+    return results, next_cursor
@@ -1,38 +1,44 @@
+# messenger/signals.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from django.contrib.auth import get_user_model
-from notifications.signals import notify
-from .models import Message, ConversationParticipant
 
-User = get_user_model()
+from core.jobs import enqueue
+from .models import ConversationParticipant, Message
 
 
 @receiver(post_save, sender=Message)
 def notify_new_message(sender, instance: Message, created, **kwargs):
     """
-    À chaque nouveau message :
-    - on notifie les autres membres de la conversation
-    - ça pourra être repris par ton consumer de notification
+    Messages créés un par un (envoi HTTP, pièces jointes) : notification des
+    autres membres mise en file. Les messages WebSocket passent par
+    messenger.buffer (bulk_create, sans post_save) qui met la même tâche en file.
     """
     if not created:
         return
+    enqueue("messenger.notify_new_messages", {"message_ids": [instance.pk]})
 
-    conv = instance.conversation
-    sender_user = instance.sender
 
-    recipients = [
-        p.user for p in ConversationParticipant.objects.filter(
-            conversation=conv
-        ).exclude(user=sender_user)
-    ]
+@receiver(post_delete, sender=ConversationParticipant)
+def revoke_membership(sender, instance: ConversationParticipant, **kwargs):
+    """
+    L'appartenance n'est vérifiée qu'à la connexion du ChatConsumer : on pousse
+    la révocation aux sockets ouverts de la conversation (fermeture 4003).
+    """
+    conversation_id, user_id = instance.conversation_id, instance.user_id
 
-    if not recipients:
-        return
+    def _push():
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        try:
+            async_to_sync(layer.group_send)(
+                f"chat_{conversation_id}",
+                {"type": "membership_revoked", "user_id": user_id},
+            )
+        except Exception as e:
+            print(f"[CHAT] ⚠️ Révocation non poussée ({conversation_id}, user {user_id}) : {e}")
 
-    notify.send(
-        sender_user,
-        recipient_list=recipients,
-        verb="a envoyé un message",
-        description=instance.text[:120],
-        target=conv,
-    )
+    transaction.on_commit(_push)
@@ -1,3 +1,170 @@
-from django.test import TestCase
+import uuid
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.testing import MediaFilesMixin
+
+from .buffer import _insert, persist_batch
+from .fts import ensure_fts, missing_triggers
+from .models import CallSession, Conversation, ConversationParticipant, Message
+from .search import search_messages
+
+User = get_user_model()
+
+
+class MessageSearchTests(TestCase):
+    """L'index FTS suit toutes les écritures (ORM, bulk_create, UPDATE, DELETE)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x", role="SECRETAIRE")
+        cls.bob = User.objects.create_user(username="bob", password="x", role="SECRETAIRE")
+        cls.conv = Conversation.objects.create(title="Scolarité")
+        ConversationParticipant.objects.create(conversation=cls.conv, user=cls.alice)
+        cls.other = Conversation.objects.create(title="Privée")
+
+    def _ids(self, query, user=None):
+        results, _ = search_messages(user or self.alice, query)
+        return [r["id"] for r in results]
+
+    def test_triggers_present_after_migrate(self):
+        self.assertEqual(missing_triggers(connection), [])
+
+    def test_orm_create_is_searchable(self):
+        m = Message.objects.create(conversation=self.conv, sender=self.bob, text="Soutenance de mémoire jeudi")
+        self.assertEqual(self._ids("soutenance"), [m.id])
+        self.assertEqual(self._ids("memoire"), [m.id])  # accents ignorés
+
+    def test_bulk_create_is_searchable(self):
+        Message.objects.bulk_create([
+            Message(conversation=self.conv, sender=self.bob, text="Planning des examens"),
+            Message(conversation=self.conv, sender=self.bob, text="Examen de rattrapage"),
+        ])
+        self.assertEqual(len(self._ids("exam")), 2)
+
+    def test_update_and_delete_follow_index(self):
+        m = Message.objects.create(conversation=self.conv, sender=self.bob, text="Salle 12")
+        Message.objects.filter(pk=m.pk).update(text="Amphithéâtre B")
+        self.assertEqual(self._ids("salle"), [])
+        self.assertEqual(self._ids("amphitheatre"), [m.id])
+        m.delete()
+        self.assertEqual(self._ids("amphitheatre"), [])
+
+    def test_only_own_conversations(self):
+        Message.objects.create(conversation=self.other, sender=self.bob, text="Paiement confidentiel")
+        self.assertEqual(self._ids("paiement"), [])
+
+    def test_pagination_cursor(self):
+        Message.objects.bulk_create([
+            Message(conversation=self.conv, sender=self.bob, text=f"inscription {i}") for i in range(5)
+        ])
+        first, cursor = search_messages(self.alice, "inscription", limit=3)
+        second, end = search_messages(self.alice, "inscription", cursor=cursor, limit=3)
+        self.assertEqual((len(first), len(second), end), (3, 2, ""))
+        self.assertTrue(first[-1]["id"] > second[0]["id"])
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 : SQLite uniquement")
+    def test_ensure_fts_restores_dropped_triggers(self):
+        # Simule la reconstruction de table d'un AlterField sous SQLite
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER messenger_message_fts_ai")
+        Message.objects.create(conversation=self.conv, sender=self.bob, text="Bibliothèque fermée")
+        self.assertEqual(self._ids("bibliotheque"), [])
+
+        self.assertEqual(ensure_fts(connection), ["messenger_message_fts_ai"])
+        self.assertEqual(len(self._ids("bibliotheque")), 1)  # rattrapé par la reconstruction
+        m = Message.objects.create(conversation=self.conv, sender=self.bob, text="Bibliothèque ouverte")
+        self.assertIn(m.id, self._ids("bibliotheque"))
+
+
+class WriteBufferTests(TestCase):
+    """Écriture différée : une ligne invalide ne fait pas perdre le reste du lot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x", role="SECRETAIRE")
+        cls.bob = User.objects.create_user(username="bob", password="x", role="SECRETAIRE")
+        cls.conv = Conversation.objects.create(title="Scolarité")
+        ConversationParticipant.objects.create(conversation=cls.conv, user=cls.alice)
+
+    def _row(self, conversation_id, sender_id, text):
+        return {
+            "conversation_id": str(conversation_id), "sender_id": sender_id,
+            "text": text, "client_id": uuid.uuid4(), "attempts": 0,
+        }
+
+    def test_deleted_conversation_or_sender_only_drops_bad_rows(self):
+        gone = Conversation.objects.create(title="Supprimée")
+        ConversationParticipant.objects.create(conversation=gone, user=self.alice)
+        rows = [
+            self._row(self.conv.id, self.alice.id, "valide"),
+            self._row(gone.id, self.alice.id, "conversation supprimée"),
+            self._row(self.conv.id, self.bob.id, "non participant"),
+        ]
+        gone.delete()
+        with self.captureOnCommitCallbacks():
+            acks = persist_batch(rows)
+        self.assertEqual(list(Message.objects.values_list("text", flat=True)), ["valide"])
+        self.assertEqual(list(acks[str(self.conv.id)]), [str(rows[0]["client_id"])])
+
+    def test_resend_is_idempotent(self):
+        row = self._row(self.conv.id, self.alice.id, "une fois")
+        persist_batch([row])
+        persist_batch([dict(row)])
+        self.assertEqual(Message.objects.filter(text="une fois").count(), 1)
+
+    def test_client_id_is_scoped_to_sender(self):
+        ConversationParticipant.objects.create(conversation=self.conv, user=self.bob)
+        row = self._row(self.conv.id, self.alice.id, "d'Alice")
+        persist_batch([row])
+        acks = persist_batch([{**self._row(self.conv.id, self.bob.id, "de Bob"), "client_id": row["client_id"]}])
+
+        bob_message = Message.objects.get(sender=self.bob)
+        self.assertEqual(bob_message.text, "de Bob")
+        self.assertEqual(acks[str(self.conv.id)], {str(row["client_id"]): bob_message.id})
+
+
+class WriteBufferIntegrityTests(TransactionTestCase):
+    """Contrainte violée à l'insertion (suppression entre filtrage et écriture) : repli ligne par ligne."""
+
+    def test_integrity_error_keeps_valid_rows(self):
+        alice = User.objects.create_user(username="alice", password="x", role="SECRETAIRE")
+        conv = Conversation.objects.create(title="Scolarité")
+        rows = [
+            {"conversation_id": str(conv.id), "sender_id": alice.id, "text": "valide", "client_id": uuid.uuid4()},
+            {"conversation_id": str(conv.id), "sender_id": alice.id + 999, "text": "orphelin", "client_id": uuid.uuid4()},
+        ]
+        rejected = _insert(rows)
+        self.assertEqual([row["text"] for row in rejected], ["orphelin"])
+        self.assertEqual(list(Message.objects.values_list("text", flat=True)), ["valide"])
+
+
+class MessengerMediaRuleTests(MediaFilesMixin, TestCase):
+    """Pièces jointes et enregistrements : participants (et hôte de l'appel) uniquement."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = cls.make_user("membre", "ENSEIGNANT")
+        cls.host = cls.make_user("hote", "ENSEIGNANT")
+        cls.outsider = cls.make_user("autre", "ETUDIANT")
+        conv = Conversation.objects.create(title="Jury")
+        ConversationParticipant.objects.create(conversation=conv, user=cls.member)
+        Message.objects.create(conversation=conv, sender=cls.member, file="messenger/files/pv.pdf")
+        CallSession.objects.create(conversation=conv, host=cls.host, room_name="jury-1",
+                                   local_file="messenger/records/jury-1.webm")
+
+    def test_message_file(self):
+        name = self.media_file("messenger/files/pv.pdf")
+        self.assertEqual(self.media_status(self.member, name), 200)
+        self.assertEqual(self.media_status(self.outsider, name), 403)
+        self.assertEqual(self.media_status(self.outsider, f"news/../{name}"), 404)
+
+    def test_call_record(self):
+        name = self.media_file("messenger/records/jury-1.webm")
+        self.assertEqual(self.media_status(self.host, name), 200)
+        self.assertEqual(self.media_status(self.member, name), 200)
+        self.assertEqual(self.media_status(self.outsider, name), 403)
+        self.assertEqual(self.media_status(self.outsider, f"gallery/%2E%2E/{name}"), 404)
@@ -11,6 +11,10 @@ urlpatterns = [
     # 💬 Conversation (lecture / envoi)
     path("conversation/<uuid:pk>/", views.chat_room, name="chat_room"),
     path("conversation/<uuid:pk>/send/", views.send_message, name="send_message"),
+    path("conversation/<uuid:pk>/history/", views.history_api, name="history"),
+
+    # 🔎 Recherche plein texte (JSON)
+    path("search/", views.search_api, name="search"),
 
     # ➕ Création conversation
     path("create/", views.create_conversation, name="create_conversation"),
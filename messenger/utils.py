@@ -1,4 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.db.models import (
+    CharField, Count, DateTimeField, IntegerField, OuterRef, Q, Subquery, Value,
+)
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+
+from core.utils.pagination import keyset_paginate
+from users.directory import TYPEAHEAD_LIMIT, search_users
+from .models import ConversationParticipant, Message
 
 User = get_user_model()
 
@@ -10,9 +18,134 @@ def is_ajax(request):
     )
 
 
-def user_queryset_for_messenger(current_user):
+def user_queryset_for_messenger(current_user, query=""):
+    """
+    Premières suggestions de "Nouvelle conversation" (hors utilisateur courant).
+    La suite est chargée à la frappe par users:user_search (voir users.directory).
+    """
+    return (
+        search_users(query, exclude=current_user.id)
+        .order_by("search_text", "id")[:TYPEAHEAD_LIMIT]
+    )
+
+
+def inbox_queryset(user):
+    """
+    Boîte de réception en une requête : une ligne ConversationParticipant par
+    conversation de `user`, annotée par sous-requêtes corrélées :
+      - last_message_text / last_message_at : dernier message
+      - last_activity : dernier message, sinon création de la conversation
+      - display_name : titre, sinon nom de l'autre participant
+      - unread : messages des autres depuis last_read_at
+    Triée par activité récente (compatible keyset_paginate).
+    """
+    last_message = (
+        Message.objects
+        .filter(conversation_id=OuterRef("conversation_id"))
+        .order_by("-created_at", "-id")
+    )
+    other_name = (
+        ConversationParticipant.objects
+        .filter(conversation_id=OuterRef("conversation_id"))
+        .exclude(user_id=OuterRef("user_id"))
+        .annotate(full_name=Coalesce(
+            NullIf(Trim(Concat("user__first_name", Value(" "), "user__last_name")), Value("")),
+            "user__username",
+            output_field=CharField(),
+        ))
+        .order_by("joined_at", "id")
+        .values("full_name")[:1]
+    )
+    unread = (
+        Message.objects
+        .filter(
+            conversation_id=OuterRef("conversation_id"),
+            created_at__gt=Coalesce(OuterRef("last_read_at"), OuterRef("conversation__created_at")),
+        )
+        .exclude(sender_id=OuterRef("user_id"))
+        .order_by().values("conversation_id")
+        .annotate(n=Count("id")).values("n")[:1]
+    )
+
+    return (
+        ConversationParticipant.objects
+        .filter(user=user)
+        .select_related("conversation")
+        .annotate(
+            last_message_text=Subquery(last_message.values("text")[:1], output_field=CharField()),
+            last_message_at=Subquery(last_message.values("created_at")[:1], output_field=DateTimeField()),
+        )
+        .annotate(
+            last_activity=Coalesce("last_message_at", "conversation__created_at", output_field=DateTimeField()),
+            display_name=Coalesce(
+                NullIf("conversation__title", Value("")),
+                Subquery(other_name, output_field=CharField()),
+                Value("Conversation"),
+                output_field=CharField(),
+            ),
+            unread=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+        )
+        .order_by("-last_activity", "-id")
+    )
+
+
+# ==============================
+# 📜 Historique des messages
+# ==============================
+HISTORY_PAGE_SIZE = 50
+SYNC_MAX_MESSAGES = 200
+
+
+def serialize_message(m) -> dict:
+    """Forme JSON commune (WebSocket, API d'historique, synchro)."""
+    sender = m.sender
+    return {
+        "id": m.id,
+        "client_id": str(m.client_id) if m.client_id else None,
+        "text": m.text,
+        "sender_id": m.sender_id,
+        "sender_name": sender.get_full_name() or sender.username,
+        "created_at": m.created_at.isoformat(),
+        "file": m.file.url if m.file else "",
+    }
+
+
+def history_page(conversation_id, cursor=None, page_size=HISTORY_PAGE_SIZE):
     """
-    Retourne les utilisateurs qu'on peut lister dans "Nouvelle conversation".
-    On enlève juste l'utilisateur courant.
+    Une page d'historique en remontant le temps, curseur keyset sur (created_at, id).
+    Retourne (messages en ordre chronologique, curseur de la page plus ancienne ou "").
     """
-    return User.objects.exclude(id=current_user.id).order_by("first_name", "last_name", "username")
+    qs = (
+        Message.objects
+        .filter(conversation_id=conversation_id)
+        .select_related("sender")
+        .order_by("-created_at", "-id")
+    )
+    items, meta = keyset_paginate(qs, page_size=page_size, cursor=cursor, count=False)
+    return items[::-1], meta["next_cursor"]
+
+
+def messages_since(conversation_id, last_id, limit=SYNC_MAX_MESSAGES):
+    """
+    Messages postérieurs à `last_id` (synchro après reconnexion), en ordre chronologique.
+    Retourne (messages, tronqué) — tronqué : le client doit recharger l'historique.
+    """
+    anchor = (
+        Message.objects
+        .filter(conversation_id=conversation_id, pk=last_id)
+        .values("created_at", "id")
+        .first()
+    )
+    if not anchor:
+        return [], True
+    rows = list(
+        Message.objects
+        .filter(conversation_id=conversation_id)
+        .filter(
+            Q(created_at__gt=anchor["created_at"])
+            | Q(created_at=anchor["created_at"], id__gt=anchor["id"])
+        )
+        .select_related("sender")
+        .order_by("created_at", "id")[: limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
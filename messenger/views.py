@@ -12,10 +12,17 @@ from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from .models import Conversation, ConversationParticipant, Message, CallSession
-from .utils import is_ajax, user_queryset_for_messenger
+from core.utils.pagination import keyset_paginate
+from .utils import (
+    is_ajax, user_queryset_for_messenger, inbox_queryset,
+    history_page, serialize_message,
+)
+from .search import SEARCH_PAGE_SIZE, search_messages
 
 User = get_user_model()
 
+INBOX_PAGE_SIZE = 30
+
 
 # ==============================
 # 🔐 sécurité
@@ -35,17 +42,23 @@ def inbox(request):
     """
     - si appelé en AJAX → on envoie juste le fragment (pour dashboard)
     - si appelé direct → page complète (utile si on ouvre /messenger/ direct)
+    - avec ?cursor=… (AJAX) → seulement les conversations suivantes ("Voir plus")
+    Liste construite en une requête (voir utils.inbox_queryset), par activité récente.
     """
-    convs = (
-        ConversationParticipant.objects.filter(user=request.user)
-        .select_related("conversation")
-        .order_by("-conversation__created_at")
+    convs, meta = keyset_paginate(
+        inbox_queryset(request.user),
+        page_size=INBOX_PAGE_SIZE,
+        cursor=request.GET.get("cursor") or None,
+        count=False,
     )
-    users = user_queryset_for_messenger(request.user)
+
+    if request.GET.get("cursor") and is_ajax(request):
+        return render(request, "messenger/_conv_items.html", {"convs": convs, "meta": meta})
 
     ctx = {
         "convs": convs,
-        "users": users,
+        "meta": meta,
+        "users": user_queryset_for_messenger(request.user),
         "me": request.user,
     }
 
@@ -62,7 +75,8 @@ def chat_room(request, pk):
     conv = get_object_or_404(Conversation, pk=pk)
     ensure_member(request.user, conv)
 
-    messages = conv.messages.select_related("sender").order_by("created_at")[:500]
+    # Dernière page seulement (les plus anciens via history_api)
+    messages, older_cursor = history_page(conv.pk)
 
     # on met à jour la dernière lecture
     ConversationParticipant.objects.filter(
@@ -72,6 +86,7 @@ def chat_room(request, pk):
     ctx = {
         "conv": conv,
         "messages": messages,
+        "older_cursor": older_cursor,
         "self_id": request.user.id,
     }
 
@@ -80,6 +95,45 @@ def chat_room(request, pk):
     return render(request, "messenger/chat_room_page.html", ctx)
 
 
+# ==============================
+# 📜 Historique (pages plus anciennes, JSON)
+# ==============================
+@login_required
+def history_api(request, pk):
+    """
+    GET ?cursor=<curseur> → {messages: [...] (ordre chronologique), next_cursor: "..."}
+    `next_cursor` vide : début de la conversation atteint.
+    """
+    conv = get_object_or_404(Conversation, pk=pk)
+    ensure_member(request.user, conv)
+
+    messages, older_cursor = history_page(conv.pk, cursor=request.GET.get("cursor") or None)
+    return JsonResponse({
+        "messages": [serialize_message(m) for m in messages],
+        "next_cursor": older_cursor,
+    })
+
+
+# ==============================
+# 🔎 Recherche dans les messages (JSON)
+# ==============================
+@login_required
+def search_api(request):
+    """
+    GET ?q=<texte>&cursor=<curseur>&limit=<n>
+    → {results: [{id, conversation_id, …, snippet}], next_cursor: "..."}
+    Limitée aux conversations de l'utilisateur ; `snippet` est du HTML sûr (<mark>).
+    """
+    try:
+        limit = int(request.GET.get("limit") or SEARCH_PAGE_SIZE)
+    except ValueError:
+        limit = SEARCH_PAGE_SIZE
+    results, next_cursor = search_messages(
+        request.user, request.GET.get("q", ""), cursor=request.GET.get("cursor") or None, limit=limit
+    )
+    return JsonResponse({"results": results, "next_cursor": next_cursor})
+
+
 # ==============================
 # 🆕 Création conversation (AJAX)
 # ==============================
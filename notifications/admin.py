@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Notification
+from . import counters, push
 
 
 @admin.register(Notification)
@@ -13,13 +14,19 @@ class NotificationAdmin(admin.ModelAdmin):
     actions = ["mark_as_read", "mark_as_unread"]
 
     def mark_as_read(self, request, queryset):
+        users = set(queryset.values_list("recipient_id", flat=True))
         updated = queryset.update(is_read=True)
+        counters.recount(users)
+        push.schedule_unread(*users)
         self.message_user(request, f"{updated} notifications marquées comme lues ✅")
 
     mark_as_read.short_description = "Marquer comme lues"
 
     def mark_as_unread(self, request, queryset):
+        users = set(queryset.values_list("recipient_id", flat=True))
         updated = queryset.update(is_read=False)
+        counters.recount(users)
+        push.schedule_unread(*users)
         self.message_user(request, f"{updated} notifications marquées comme non lues 🔄")
 
     mark_as_unread.short_description = "Marquer comme non lues"
@@ -0,0 +1,45 @@
+import json
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
+
+from .counters import unread_count
+from .push import user_group
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket /ws/notifications/
+    Rejoint le groupe de l'utilisateur connecté et reçoit :
+      - {"event": "notification", "notification": {...}, "unread": N}
+      - {"event": "unread", "unread": N}
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or isinstance(user, AnonymousUser) or not user.is_authenticated:
+            await self.close(code=4001)
+            return
+
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # État initial : le client n'a plus besoin d'interroger le serveur
+        unread = await database_sync_to_async(unread_count)(user.id)
+        await self.send(text_data=json.dumps({"event": "unread", "unread": unread}))
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "{}")
+        except ValueError:
+            return  # trame illisible : ignorée, la connexion reste ouverte
+        if isinstance(data, dict) and data.get("type") == "ping":
+            await self.send(text_data=json.dumps({"event": "pong"}))
+
+    async def notif_event(self, event):
+        await self.send(text_data=json.dumps(event["payload"]))
@@ -1,11 +1,22 @@
 # notifications/context_processors.py
-from .models import Notification
+from .counters import unread_count
+
 
 def unread_notifications_count(request):
-    if request.user.is_authenticated:
-        return {
-            "notif_unread_count": Notification.objects.filter(
-                recipient=request.user, is_read=False
-            ).count()
-        }
-    return {}
+    """
+    `notif_unread_count` est un appelable : le moteur de templates ne l'évalue
+    que si un template l'utilise (les fragments AJAX ne paient rien), et la
+    valeur est lue une seule fois par rendu depuis NotificationCounter.
+    """
+    user = getattr(request, "user", None)
+    if not (user and user.is_authenticated):
+        return {}
+
+    cache = {}
+
+    def notif_unread_count():
+        if "value" not in cache:
+            cache["value"] = unread_count(user.pk)
+        return cache["value"]
+
+    return {"notif_unread_count": notif_unread_count}
@@ -0,0 +1,66 @@
+# notifications/counters.py
+"""
+Compteur de notifications non lues par utilisateur (NotificationCounter).
+
+Maintenu de façon atomique (UPDATE … SET unread = unread ± n) par :
+  - la création / suppression d'une notification non lue (signaux)
+  - la bascule lu / non lu d'une notification (signal, vues mark_as_read / mark_all_as_read)
+Les mises à jour en masse (admin) appellent `recount()`.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Notification, NotificationCounter
+
+
+def _real_count(user_id) -> int:
+    return Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+
+
+def _ensure(user_id) -> int:
+    """Crée le compteur manquant à partir des lignes (une seule fois par utilisateur)."""
+    try:
+        with transaction.atomic():
+            counter = NotificationCounter.objects.create(user_id=user_id, unread=_real_count(user_id))
+        return counter.unread
+    except IntegrityError:
+        return NotificationCounter.objects.filter(user_id=user_id).values_list("unread", flat=True).first() or 0
+
+
+def adjust(user_id, delta: int, create: bool = True) -> None:
+    """unread += delta (borné à 0), en une requête. `create=False` : pas de création (suppressions)."""
+    if not delta:
+        return
+    updated = NotificationCounter.objects.filter(user_id=user_id).update(
+        unread=Greatest(F("unread") + delta, Value(0))
+    )
+    if not updated and create:
+        # Premier événement pour cet utilisateur : le compteur part des lignes (delta déjà inclus)
+        _ensure(user_id)
+
+
+def unread_count(user_id) -> int:
+    value = NotificationCounter.objects.filter(user_id=user_id).values_list("unread", flat=True).first()
+    if value is None:
+        return _ensure(user_id)
+    return value
+
+
+def recount(user_ids=None) -> int:
+    """Recalcule les compteurs depuis les notifications (une requête UPDATE)."""
+    qs = NotificationCounter.objects.all()
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        missing = user_ids - set(qs.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+        for user_id in missing:
+            _ensure(user_id)
+        qs = qs.filter(user_id__in=user_ids)
+    unread_sq = Subquery(
+        Notification.objects
+        .filter(recipient_id=OuterRef("user_id"), is_read=False)
+        .order_by().values("recipient_id")
+        .annotate(n=Count("id")).values("n")[:1],
+        output_field=IntegerField(),
+    )
+    return qs.update(unread=Coalesce(unread_sq, Value(0)))
@@ -0,0 +1,42 @@
+# notifications/jobs.py
+"""
+Tâches de la file core.Job pour les notifications (exécutées par `manage.py run_jobs`).
+"""
+from django.contrib.auth import get_user_model
+
+from admissions.models import Admission
+from core.jobs import job
+from .models import Notification
+
+User = get_user_model()
+
+
+@job("notifications.new_admission")
+def notify_new_admission(admission_id, event):
+    """Notification quand une admission est créée (`event="created"`) ou validée (`event="ready"`)"""
+    instance = Admission.objects.filter(pk=admission_id).first()
+    if not instance:
+        return
+
+    recipient = (
+        instance.assigned_to
+        or User.objects.filter(is_staff=True).first()
+        or User.objects.filter(is_superuser=True).first()
+    )
+    if not recipient:
+        return
+
+    if event == "created":
+        Notification.objects.create(
+            recipient=recipient,
+            message=f"Nouvelle candidature reçue : {instance.nom} {instance.prenom}",
+            notif_type="info",
+            url=f"/admin/admissions/admission/{instance.id}/change/",
+        )
+    elif event == "ready":
+        Notification.objects.create(
+            recipient=recipient,
+            message=f"Candidature validée et prête pour paiement : {instance.nom} {instance.prenom}",
+            notif_type="success",
+            url=f"/admissions/{instance.id}/",
+        )
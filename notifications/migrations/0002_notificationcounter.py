@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_unread_counters(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationCounter = apps.get_model("notifications", "NotificationCounter")
+    rows = (
+        Notification.objects.filter(is_read=False)
+        .values("recipient_id").annotate(n=models.Count("id")).order_by()
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=r["recipient_id"], unread=r["n"]) for r in rows],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -28,3 +28,22 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"Notif {self.notif_type} pour {self.recipient} : {self.message[:30]}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valeur chargée : permet au signal de détecter une bascule lu / non lu
+        instance._loaded_is_read = instance.__dict__.get("is_read")
+        return instance
+
+
+class NotificationCounter(models.Model):
+    """Compteur dénormalisé des notifications non lues (lu par le context processor)."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="notification_counter"
+    )
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} : {self.unread} non lue(s)"
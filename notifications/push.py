@@ -0,0 +1,61 @@
+# notifications/push.py
+"""
+Poussée temps réel des notifications (Channels) vers le groupe de l'utilisateur.
+
+Les envois partent après COMMIT (transaction.on_commit) : le client ne reçoit
+jamais une notification annulée. Si la couche Channels est indisponible
+(Redis arrêté, etc.), l'erreur est journalisée et la requête n'échoue pas.
+"""
+from asgiref.sync import async_to_sync
+from django.db import transaction
+
+from .counters import unread_count
+
+
+def user_group(user_id) -> str:
+    return f"notif_user_{user_id}"
+
+
+def serialize(notification) -> dict:
+    """Même forme que `notifications_json`."""
+    return {
+        "id": notification.id,
+        "message": notification.message,
+        "type": notification.notif_type,
+        "is_read": notification.is_read,
+        "created": notification.created_at.strftime("%d/%m/%Y %H:%M"),
+        "url": notification.url or "",
+    }
+
+
+def _send(user_id, payload: dict) -> None:
+    try:
+        from channels.layers import get_channel_layer
+
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        async_to_sync(layer.group_send)(user_group(user_id), {"type": "notif_event", "payload": payload})
+    except Exception as e:
+        print(f"[NOTIF-PUSH] ⚠️ Envoi impossible pour l'utilisateur {user_id} : {e}")
+
+
+def push_unread(user_id) -> None:
+    _send(user_id, {"event": "unread", "unread": unread_count(user_id)})
+
+
+def push_notification(notification) -> None:
+    _send(notification.recipient_id, {
+        "event": "notification",
+        "notification": serialize(notification),
+        "unread": unread_count(notification.recipient_id),
+    })
+
+
+def schedule_unread(*user_ids) -> None:
+    for user_id in set(user_ids):
+        transaction.on_commit(lambda user_id=user_id: push_unread(user_id))
+
+
+def schedule_notification(notification) -> None:
+    transaction.on_commit(lambda: push_notification(notification))
@@ -1,42 +1,28 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from admissions.models import Admission, PaymentTransaction
+from core.jobs import enqueue
 from .models import Notification
+from . import counters, push
 
 User = get_user_model()
 
 
 @receiver(post_save, sender=Admission)
 def notify_new_admission(sender, instance, created, **kwargs):
-    """Notification quand une admission est créée ou validée"""
+    """Notification quand une admission est créée ou validée (mise en file, voir notifications.jobs)"""
     if created:
-        recipient = (
-            instance.assigned_to
-            or User.objects.filter(is_staff=True).first()
-            or User.objects.filter(is_superuser=True).first()
-        )
-        if recipient:
-            Notification.objects.create(
-                recipient=recipient,
-                message=f"Nouvelle candidature reçue : {instance.nom} {instance.prenom}",
-                notif_type="info",
-                url=f"/admin/admissions/admission/{instance.id}/change/",
-            )
-
+        event = "created"
     elif instance.status == "PRET_PAIEMENT":
-        recipient = (
-            instance.assigned_to
-            or User.objects.filter(is_staff=True).first()
-            or User.objects.filter(is_superuser=True).first()
-        )
-        if recipient:
-            Notification.objects.create(
-                recipient=recipient,
-                message=f"Candidature validée et prête pour paiement : {instance.nom} {instance.prenom}",
-                notif_type="success",
-                url=f"/admissions/{instance.id}/",
-            )
+        event = "ready"
+    else:
+        return
+    enqueue(
+        "notifications.new_admission",
+        {"admission_id": instance.pk, "event": event},
+        key=f"admission:{instance.pk}:notify:{event}",
+    )
 
 
 @receiver(post_save, sender=PaymentTransaction)
@@ -56,3 +42,31 @@ def notify_payment(sender, instance, created, **kwargs):
                 notif_type="success",
                 url=f"/admissions/{instance.admission.id}/",
             )
+
+
+# ============================================================
+# 🔢 COMPTEUR DE NON LUES (NotificationCounter) + POUSSÉE TEMPS RÉEL
+# ============================================================
+@receiver(post_save, sender=Notification)
+def unread_counter_on_save(sender, instance, created, **kwargs):
+    """+1 à la création d'une non lue ; ±1 quand une notification bascule lu / non lu"""
+    if created:
+        delta = 0 if instance.is_read else 1
+    else:
+        before = getattr(instance, "_loaded_is_read", None)
+        delta = 0 if before is None or before == instance.is_read else (-1 if instance.is_read else 1)
+    instance._loaded_is_read = instance.is_read
+    counters.adjust(instance.recipient_id, delta)
+
+    # 📡 Poussée WebSocket après COMMIT (voir notifications.push)
+    if created:
+        push.schedule_notification(instance)
+    elif delta:
+        push.schedule_unread(instance.recipient_id)
+
+
+@receiver(post_delete, sender=Notification)
+def unread_counter_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        counters.adjust(instance.recipient_id, -1, create=False)
+        push.schedule_unread(instance.recipient_id)
@@ -1,3 +1,51 @@
-from django.test import TestCase
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
 
-# Create your tests here.
+from .consumers import NotificationConsumer
+from .models import Notification
+
+User = get_user_model()
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class NotificationConsumerTests(TransactionTestCase):
+    # Transactions réelles : le consumer lit la base depuis un autre thread
+    def setUp(self):
+        self.user = User.objects.create_user(username="etu", password="x", role="ETUDIANT")
+        Notification.objects.create(recipient=self.user, message="Dossier reçu")
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), "/ws/notifications/")
+        communicator.scope["user"] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_initial_unread_then_push(self):
+        communicator = await self._connect()
+        self.assertEqual(await communicator.receive_json_from(), {"event": "unread", "unread": 1})
+
+        notification = await database_sync_to_async(Notification.objects.create)(
+            recipient=self.user, message="Paiement validé"
+        )
+        event = await communicator.receive_json_from()
+        self.assertEqual((event["event"], event["unread"]), ("notification", 2))
+        self.assertEqual(event["notification"]["id"], notification.id)
+        await communicator.disconnect()
+
+    async def test_invalid_frame_is_ignored(self):
+        communicator = await self._connect()
+        await communicator.receive_json_from()
+        await communicator.send_to(text_data="pas du json")
+        await communicator.send_to(text_data="[]")
+        await communicator.send_json_to({"type": "ping"})
+        self.assertEqual(await communicator.receive_json_from(), {"event": "pong"})
+        await communicator.disconnect()
+
+    async def test_anonymous_is_refused(self):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), "/ws/notifications/")
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4001)
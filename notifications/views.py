@@ -1,14 +1,28 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render
 from django.http import JsonResponse
+from core.utils.pagination import keyset_paginate
 from .models import Notification
+from . import counters, push
+
+NOTIFICATIONS_PAGE_SIZE = 20
 
 
 @login_required
 def list_notifications(request):
-    """Affiche toutes les notifications de l'utilisateur (vue classique)"""
-    notifications = request.user.notifications.all()
-    return render(request, "notifications/list.html", {"notifications": notifications})
+    """Affiche les notifications de l'utilisateur, par pages (curseur keyset sur created_at, id)"""
+    try:
+        page = int(request.GET.get("page") or 1)
+    except ValueError:
+        page = 1
+    notifications, meta = keyset_paginate(
+        request.user.notifications.order_by("-created_at", "-id"),
+        page=page,
+        page_size=NOTIFICATIONS_PAGE_SIZE,
+        cursor=request.GET.get("cursor") or None,
+        count=False,
+    )
+    return render(request, "notifications/list.html", {"notifications": notifications, "meta": meta})
 
 
 @login_required
@@ -41,8 +55,10 @@ def mark_as_read(request, notif_id):
     """Marquer une notif comme lue (AJAX)"""
     if request.method == "POST":
         notif = get_object_or_404(Notification, id=notif_id, recipient=request.user)
-        notif.is_read = True
-        notif.save()
+        # UPDATE conditionnel : le compteur ne baisse que si la notif était non lue
+        if Notification.objects.filter(pk=notif.pk, is_read=False).update(is_read=True):
+            counters.adjust(request.user.pk, -1)
+            push.schedule_unread(request.user.pk)
         return JsonResponse({"success": True, "notif_id": notif.id})
     return JsonResponse({"success": False}, status=400)
 
@@ -52,5 +68,8 @@ def mark_all_as_read(request):
     """Marquer toutes les notifs comme lues (AJAX)"""
     if request.method == "POST":
         count = request.user.notifications.filter(is_read=False).update(is_read=True)
+        counters.adjust(request.user.pk, -count)
+        if count:
+            push.schedule_unread(request.user.pk)
         return JsonResponse({"success": True, "updated": count})
     return JsonResponse({"success": False}, status=400)
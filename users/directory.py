@@ -0,0 +1,74 @@
+# users/directory.py
+"""
+Annuaire des utilisateurs : recherche dans la table UserSearchToken (un mot
+par ligne, en minuscules sans accents, tenue à jour par CustomUser.save()).
+
+Chaque mot saisi doit correspondre au DÉBUT d'un mot de l'utilisateur :
+"aiss dia" trouve "Aïssata Diallo". Un préfixe est une plage sur l'index
+`token` (>= "dia", < "dia" + U+10FFFF), et non un LIKE '% dia%' qui parcourt
+toute la table. Email et téléphone ne sont cherchés que pour le staff
+(`can_search_contacts`). `search_text` ne sert plus qu'à l'ordre alphabétique.
+Utilisé par :
+  - users.views.user_search : typeahead JSON (messagerie, formulaires)
+  - users.views.user_list   : console d'administration (pagination keyset)
+"""
+from core.utils.text import fold
+from .models import User, UserSearchToken
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 25
+MAX_TERMS = 5
+PREFIX_END = "\U0010ffff"
+
+STAFF_ROLES = {
+    User.Role.ADMIN, User.Role.DIRECTEUR, User.Role.GESTIONNAIRE,
+    User.Role.SECRETAIRE, User.Role.AGENT_MARKETING,
+}
+
+
+def can_search_contacts(user) -> bool:
+    """Recherche par email / téléphone : réservée au staff."""
+    return bool(user and user.is_authenticated and (user.is_superuser or user.is_staff or user.role in STAFF_ROLES))
+
+
+def search_users(query="", role=None, annexe=None, exclude=None, active_only=True, contacts=False):
+    """
+    QuerySet filtré (non trié) ; `exclude` : id d'utilisateur à écarter (soi-même) ;
+    `contacts` : chercher aussi dans l'email et le téléphone.
+    """
+    qs = User.objects.all()
+    if active_only:
+        qs = qs.filter(is_active=True)
+    kinds = ["name", "contact"] if contacts else ["name"]
+    for term in fold(query).split()[:MAX_TERMS]:
+        term = term[:UserSearchToken.TOKEN_MAX_LENGTH]
+        qs = qs.filter(pk__in=UserSearchToken.objects.filter(
+            token__gte=term, token__lt=term + PREFIX_END, kind__in=kinds,
+        ).values("user_id"))
+    if role:
+        qs = qs.filter(role=role)
+    if annexe:
+        qs = qs.filter(annexe=annexe)
+    if exclude is not None:
+        qs = qs.exclude(pk=exclude)
+    return qs
+
+
+def typeahead(query, limit=TYPEAHEAD_LIMIT, **scope) -> list:
+    """Au plus `limit` résultats par ordre alphabétique (index sur search_text)."""
+    limit = max(1, min(int(limit or TYPEAHEAD_LIMIT), TYPEAHEAD_MAX_LIMIT))
+    rows = (
+        search_users(query, **scope)
+        .order_by("search_text", "id")
+        .values("id", "username", "first_name", "last_name", "role", "annexe")[:limit]
+    )
+    return [
+        {
+            "id": row["id"],
+            "name": f"{row['first_name']} {row['last_name']}".strip() or row["username"],
+            "username": row["username"],
+            "role": row["role"] or "",
+            "annexe": row["annexe"] or "",
+        }
+        for row in rows
+    ]
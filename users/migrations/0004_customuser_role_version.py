@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='role_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incrémenté à chaque changement de rôle ou de groupes (invalide le cache des rôles)'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:58
+
+from django.db import migrations, models
+
+from core.utils.text import fold
+
+
+def fill_search_text(apps, schema_editor):
+    User = apps.get_model("users", "CustomUser")
+    rows = []
+    for user in User.objects.only("first_name", "last_name", "username", "email", "phone").iterator(chunk_size=1000):
+        parts = [user.first_name, user.last_name, user.username, user.email, user.phone]
+        user.search_text = fold(" ".join(p for p in parts if p))[:512]
+        rows.append(user)
+    User.objects.bulk_update(rows, ["search_text"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_customuser_role_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='search_text',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Nom, identifiant, email et téléphone en minuscules sans accents (recherche)', max_length=512),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from core.utils.text import fold
+
+
+def fill_search_tokens(apps, schema_editor):
+    User = apps.get_model("users", "CustomUser")
+    UserSearchToken = apps.get_model("users", "UserSearchToken")
+    groups = (("name", ("first_name", "last_name", "username")), ("contact", ("email", "phone")))
+    rows = []
+    for user in User.objects.only("first_name", "last_name", "username", "email", "phone").iterator(chunk_size=1000):
+        tokens = {
+            (kind, word[:64])
+            for kind, fields in groups
+            for word in fold(" ".join(getattr(user, f) or "" for f in fields)).split()
+        }
+        rows.extend(UserSearchToken(user_id=user.pk, kind=kind, token=token) for kind, token in tokens)
+    UserSearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customuser_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=8)),
+                ('token', models.CharField(max_length=64)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'kind'], name='users_users_token_5c4677_idx')],
+            },
+        ),
+        migrations.RunPython(fill_search_tokens, migrations.RunPython.noop),
+    ]
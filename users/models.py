@@ -2,6 +2,13 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.utils.text import fold
+
+# Champs repris dans `search_text` et UserSearchToken (annuaire, voir users.directory)
+NAME_FIELDS = ("first_name", "last_name", "username")
+CONTACT_FIELDS = ("email", "phone")
+SEARCH_FIELDS = NAME_FIELDS + CONTACT_FIELDS
+
 class CustomUser(AbstractUser):
     class Role(models.TextChoices):
         AGENT_MARKETING = "AGENT_MARKETING", "Agent marketing"
@@ -33,6 +40,63 @@ class CustomUser(AbstractUser):
         help_text="Numéro de téléphone"
     )
 
+    role_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incrémenté à chaque changement de rôle ou de groupes (invalide le cache des rôles)"
+    )
+
+    search_text = models.CharField(
+        max_length=512,
+        blank=True,
+        default="",
+        editable=False,
+        db_index=True,
+        help_text="Nom, identifiant, email et téléphone en minuscules sans accents (recherche)"
+    )
+
+    def build_search_text(self) -> str:
+        # Le nom d'abord : l'ordre alphabétique de la colonne suit celui des noms
+        parts = [self.first_name, self.last_name, self.username, self.email, self.phone]
+        return fold(" ".join(p for p in parts if p))[:512]
+
+    def build_search_tokens(self) -> set:
+        """{(kind, mot)} : un mot par jeton, "name" (nom, identifiant) ou "contact" (email, téléphone)."""
+        tokens = set()
+        for kind, fields in (("name", NAME_FIELDS), ("contact", CONTACT_FIELDS)):
+            for word in fold(" ".join(getattr(self, f) or "" for f in fields)).split():
+                tokens.add((kind, word[:UserSearchToken.TOKEN_MAX_LENGTH]))
+        return tokens
+
+    def sync_search_tokens(self) -> None:
+        tokens = self.build_search_tokens()
+        UserSearchToken.objects.filter(user=self).delete()
+        UserSearchToken.objects.bulk_create(
+            [UserSearchToken(user=self, kind=kind, token=token) for kind, token in tokens]
+        )
+
+    def save(self, *args, **kwargs):
+        # Toute sauvegarde complète ou touchant au rôle invalide le cache des rôles
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"role", "is_superuser"} & set(update_fields):
+            self.role_version = (self.role_version or 0) + 1
+            if update_fields is not None:
+                kwargs["update_fields"] = update_fields = {*update_fields, "role_version"}
+        # Colonne de recherche tenue à jour avec les champs sources
+        search_changed = update_fields is None or bool(set(SEARCH_FIELDS) & set(update_fields))
+        if search_changed:
+            self.search_text = self.build_search_text()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_text"}
+        super().save(*args, **kwargs)
+        if search_changed:
+            self.sync_search_tokens()
+
+    def bump_role_version(self):
+        """Invalide le cache des rôles sans réécrire le reste de la ligne."""
+        type(self).objects.filter(pk=self.pk).update(role_version=models.F("role_version") + 1)
+        self.role_version = (self.role_version or 0) + 1
+
     def is_admin(self):
         return self.is_superuser or self.role == self.Role.ADMIN
 
@@ -40,5 +104,21 @@ class CustomUser(AbstractUser):
         return f"{self.username} ({self.get_role_display() if self.role else 'Sans rôle'})"
 
 
+class UserSearchToken(models.Model):
+    """
+    Mot de l'annuaire (minuscules sans accents) : la recherche par préfixe
+    devient un parcours de plage sur l'index `token` (token >= "dia" AND
+    token < "dia" + U+10FFFF), quelle que soit la position du mot.
+    """
+    TOKEN_MAX_LENGTH = 64
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="search_tokens")
+    kind = models.CharField(max_length=8)  # "name" | "contact" (email, téléphone : staff uniquement)
+    token = models.CharField(max_length=TOKEN_MAX_LENGTH)
+
+    class Meta:
+        indexes = [models.Index(fields=["token", "kind"])]
+
+
 # ✅ Alias pour compatibilité avec les autres apps
 User = CustomUser
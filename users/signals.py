@@ -1,5 +1,6 @@
 # users/signals.py
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
@@ -41,3 +42,23 @@ def assign_default_role_and_group(sender, instance, created, **kwargs):
     if group_name:
         group, _ = Group.objects.get_or_create(name=group_name)
         instance.groups.add(group)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def bump_role_version_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Ajout / retrait de groupes → le rôle résolu peut changer :
+    on incrémente role_version pour invalider le cache des rôles (masters.utils.roles).
+    """
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.bump_role_version()
+        return
+
+    if action == "pre_clear":
+        # group.user_set.clear() : pk_set n'est pas fourni, on vise les membres avant vidage
+        User.objects.filter(groups=instance).update(role_version=F("role_version") + 1)
+    elif action in ("post_add", "post_remove") and pk_set:
+        # group.user_set.add(...) / remove
+        User.objects.filter(pk__in=pk_set).update(role_version=F("role_version") + 1)
@@ -1,3 +1,58 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from masters.models import UserProfile
+
+from . import directory
+from .models import User, UserSearchToken
+
+
+class DirectorySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.aissata = User.objects.create_user(
+            username="adiallo", first_name="Aïssata", last_name="Diallo",
+            email="aissata@exemple.ml", phone="+223 76 00 11 22", password="x", role="ETUDIANT",
+        )
+        cls.moussa = User.objects.create_user(
+            username="mkeita", first_name="Moussa", last_name="Keïta", password="x", role="ETUDIANT",
+        )
+        cls.staff = User.objects.create_user(username="secretaire", password="x", role="SECRETAIRE")
+        UserProfile.objects.filter(user__in=[cls.moussa, cls.staff]).update(must_change_password=False)
+
+    def _ids(self, query, **scope):
+        return set(directory.search_users(query, **scope).values_list("id", flat=True))
+
+    def test_prefix_of_any_word_without_accents(self):
+        self.assertEqual(self._ids("aiss dia"), {self.aissata.id})
+        self.assertEqual(self._ids("KEI"), {self.moussa.id})
+        self.assertEqual(self._ids("iallo"), set())
+
+    def test_tokens_follow_profile_changes(self):
+        self.moussa.last_name = "Traoré"
+        self.moussa.save(update_fields=["last_name"])
+        self.assertEqual(self._ids("traore"), {self.moussa.id})
+        self.assertEqual(self._ids("keita"), set())
+
+    def test_contacts_only_when_requested(self):
+        self.assertEqual(self._ids("aissata@"), set())
+        self.assertEqual(self._ids("76"), set())
+        self.assertEqual(self._ids("aissata@", contacts=True), {self.aissata.id})
+        self.assertEqual(self._ids("+223", contacts=True), {self.aissata.id})
+
+    def test_prefix_query_is_a_range_not_like(self):
+        with CaptureQueriesContext(connection) as ctx:
+            list(directory.search_users("dia"))
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn("LIKE", sql.upper())
+        self.assertIn(UserSearchToken._meta.db_table, sql)
+
+    def test_user_search_hides_contacts_from_non_staff(self):
+        url = reverse("users:user_search")
+        self.client.force_login(self.moussa)
+        self.assertEqual(self.client.get(url, {"q": "aissata@"}).json()["results"], [])
+        self.client.force_login(self.staff)
+        results = self.client.get(url, {"q": "aissata@"}).json()["results"]
+        self.assertEqual([r["id"] for r in results], [self.aissata.id])
@@ -34,6 +34,9 @@ urlpatterns = [
     path("profile/", views.profile, name="profile"),
     path("profile/edit/", views.edit_profile, name="edit_profile"),
 
+    # Annuaire (typeahead JSON)
+    path("search/", views.user_search, name="user_search"),
+
     # Console admin (superuser/admin role)
     path("manage/", views.user_list, name="user_list"),
     path("manage/create/", views.user_create, name="user_create"),
@@ -5,10 +5,11 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.contrib import messages
-from django.db.models import Q
 
+from core.utils.pagination import keyset_paginate
+from . import directory
 from .models import User
 from .forms import (
     CustomUserCreationForm, CustomUserChangeForm,
@@ -54,17 +55,40 @@ def change_password(request: HttpRequest) -> HttpResponse:
 
 
 # -------- Console Admin/Marketing Users Management --------
+USER_LIST_PAGE_SIZE = 50
+
+
 @user_passes_test(is_superadmin)
 def user_list(request: HttpRequest) -> HttpResponse:
     q = request.GET.get("q", "").strip()
-    qs = User.objects.all().order_by("-date_joined")
-    if q:
-        qs = qs.filter(
-            Q(username__icontains=q) |
-            Q(email__icontains=q) |
-            Q(phone__icontains=q)
-        )
-    return render(request, "users/user_list.html", {"users": qs, "q": q})
+    role = request.GET.get("role") or None
+    annexe = request.GET.get("annexe") or None
+    qs = directory.search_users(
+        q, role=role, annexe=annexe, active_only=False, contacts=True
+    ).order_by("-date_joined", "-id")
+    users, meta = keyset_paginate(qs, page_size=USER_LIST_PAGE_SIZE, cursor=request.GET.get("cursor") or None)
+    return render(request, "users/user_list.html", {
+        "users": users, "meta": meta, "q": q, "role": role or "", "annexe": annexe or "",
+        "roles": User.Role.choices,
+    })
+
+
+@login_required
+def user_search(request: HttpRequest) -> JsonResponse:
+    """Typeahead : ?q=…&limit=…&role=…&annexe=… → {"results": [...]} (soi-même exclu)."""
+    try:
+        limit = int(request.GET.get("limit") or directory.TYPEAHEAD_LIMIT)
+    except ValueError:
+        limit = directory.TYPEAHEAD_LIMIT
+    results = directory.typeahead(
+        request.GET.get("q", ""),
+        limit=limit,
+        role=request.GET.get("role") or None,
+        annexe=request.GET.get("annexe") or None,
+        exclude=request.user.pk,
+        contacts=directory.can_search_contacts(request.user),
+    )
+    return JsonResponse({"results": results})
 
 
 @user_passes_test(is_superadmin)